@@ -0,0 +1,237 @@
+"""
+Ack Watcher
+===========
+Background watcher for Unity's tcp_ack.json.
+
+TCPHotController writes tcp_ack.json when the TCP reaches a target:
+  {"completed": true, "position": {"x": .., "y": .., "z": .., "gripper_position": ..},
+   "timestamp": "2025-01-01T12:00:00.0000000-08:00"}
+
+AckWatcher parses each ack as it lands and keeps the *confirmed* position
+(where Unity says the TCP is) next to the commanded one the entry points
+track.  On Linux it blocks on inotify events for the ack's directory (via
+ctypes, no extra dependency) and treats every finished write as a new ack;
+elsewhere, or if inotify is unavailable, it polls the file and takes an ack
+whose content differs from the last one as new.  Modification times are not
+used: on filesystems with coarse timestamps two acks can share one.
+
+  watcher = AckWatcher(ACK_FILE, on_ack=callback).start()
+  n = watcher.ack_count                    # before publishing target
+  watcher.note_commanded(target)           # when a target is published
+  watcher.wait_for_position(target, 5.0, after_count=n)   # blocks on a condition, no polling
+  watcher.confirmed_position()
+  watcher.completions                      # recent moves with their durations
+
+on_ack(ack, detected_at) is called on the watcher thread with
+detected_at = time.monotonic().
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+ACK_POLL_INTERVAL_SECS = 0.02
+# Unity writes floats; an ack matches a target within this distance per axis
+ACK_MATCH_TOLERANCE = 1e-3
+MAX_COMPLETIONS = 256
+MAX_COMMANDED = 64
+
+# inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def read_ack(path: str):
+    """Parse tcp_ack.json; returns None if missing, empty or half-written."""
+    try:
+        with open(path, 'r') as f:
+            content = f.read().strip()
+        if not content:
+            return None
+        ack = json.loads(content)
+    except (OSError, ValueError):
+        return None
+    pos = ack.get("position") if isinstance(ack, dict) else None
+    if not pos or not all(k in pos for k in ("x", "y", "z")):
+        return None
+    return ack
+
+
+def positions_match(a: dict, b: dict, tolerance: float = ACK_MATCH_TOLERANCE) -> bool:
+    return all(abs(a[axis] - b[axis]) <= tolerance for axis in ("x", "y", "z"))
+
+
+def _open_inotify(directory: str):
+    """inotify fd watching directory for finished writes/renames, or None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class AckWatcher:
+    def __init__(self, path: str, on_ack=None, poll_interval: float = ACK_POLL_INTERVAL_SECS,
+                 use_inotify: bool = True):
+        self.path = path
+        self.on_ack = on_ack
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_ack = None
+        self._wake_r = self._wake_w = None
+
+        self._cond = threading.Condition()
+        self._confirmed = None        # last acked position
+        self._confirmed_at = None     # time.monotonic() of that ack
+        self.ack_count = 0
+        self._commanded = deque(maxlen=MAX_COMMANDED)  # (published_at, target)
+        self.completions = deque(maxlen=MAX_COMPLETIONS)
+
+    def start(self):
+        # Acks already on disk belong to earlier moves; they only seed the
+        # confirmed position
+        ack = self._last_ack = read_ack(self.path)
+        if ack is not None:
+            self._confirmed = {a: ack["position"][a] for a in ("x", "y", "z")}
+
+        fd = None
+        if self.use_inotify:
+            fd = _open_inotify(os.path.dirname(os.path.abspath(self.path)))
+        if fd is not None:
+            self.backend = "inotify"
+            self._wake_r, self._wake_w = os.pipe()
+            target, args = self._watch_inotify, (fd,)
+        else:
+            self.backend = "poll"
+            target, args = self._poll, ()
+        self._thread = threading.Thread(target=target, args=args, name="ack-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    # ── backends ─────────────────────────────────────────────────────
+
+    def _watch_inotify(self, fd):
+        name = os.path.basename(self.path).encode()
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if fd not in ready:
+                    continue
+                try:
+                    data = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                seen = False
+                offset = 0
+                while offset < len(data):
+                    _, _, _, length = _IN_EVENT.unpack_from(data, offset)
+                    offset += _IN_EVENT.size
+                    if data[offset:offset + length].rstrip(b"\0") == name:
+                        seen = True
+                    offset += length
+                if seen:
+                    self._check(signalled=True)
+        finally:
+            os.close(fd)
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self._check()
+
+    def _check(self, signalled=False):
+        """Handle the ack on disk; signalled means an inotify event said it is new."""
+        ack = read_ack(self.path)
+        if ack is None:
+            return  # half-written; the next event / poll retries
+        if not signalled and ack == self._last_ack:
+            return
+        self._last_ack = ack
+        self._handle(ack, time.monotonic())
+
+    # ── state ────────────────────────────────────────────────────────
+
+    def _handle(self, ack, detected_at):
+        position = {a: ack["position"][a] for a in ("x", "y", "z")}
+        with self._cond:
+            self._confirmed = position
+            self._confirmed_at = detected_at
+            self.ack_count += 1
+            commanded_at = None
+            for i, (published_at, target) in enumerate(self._commanded):
+                if positions_match(position, target):
+                    commanded_at = published_at
+                    # Targets before this one were superseded or passed through
+                    for _ in range(i + 1):
+                        self._commanded.popleft()
+                    break
+            self.completions.append({
+                "position": position,
+                "reached_at": detected_at,
+                "move_secs": None if commanded_at is None else round(detected_at - commanded_at, 4),
+                "unity_timestamp": ack.get("timestamp"),
+            })
+            self._cond.notify_all()
+        if self.on_ack:
+            self.on_ack(ack, detected_at)
+
+    def note_commanded(self, target: dict) -> None:
+        """Record a published target so its ack can be timed."""
+        with self._cond:
+            self._commanded.append((time.monotonic(), {a: target[a] for a in ("x", "y", "z")}))
+
+    def confirmed_position(self):
+        """Last position Unity acked (or the ack on disk at start), else None."""
+        with self._cond:
+            return None if self._confirmed is None else dict(self._confirmed)
+
+    def wait_for_position(self, target: dict, timeout: float = None,
+                          tolerance: float = ACK_MATCH_TOLERANCE, after_count: int = None) -> bool:
+        """Block until the confirmed position matches target.
+
+        With after_count (ack_count read before publishing), only an ack
+        newer than that counts; otherwise a target equal to the position
+        already confirmed would match at once.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: (self._confirmed is not None
+                         and (after_count is None or self.ack_count > after_count)
+                         and positions_match(self._confirmed, target, tolerance)),
+                timeout,
+            )
+
+    def wait_for_ack(self, after_count: int, timeout: float = None) -> bool:
+        """Block until more than after_count acks have been seen."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.ack_count > after_count, timeout)
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"\0")
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
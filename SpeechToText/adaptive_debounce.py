@@ -0,0 +1,209 @@
+"""
+Adaptive Debounce
+=================
+Debounce policies for MicToAzureStream's partial and and-timeout timers.
+
+  FixedDebounce    -- the constant PARTIAL_DEBOUNCE_SECS / AND_COMMAND_TIMEOUT_SECS
+  AdaptiveDebounce -- picks the wait per command shape from how partials of
+                      that shape were later revised
+
+A command shape is the partial's token kinds without filler words, e.g.
+"move right 5" -> "dir num", "go left a bit and up" -> "dir qual and dir".
+
+Every partial that arms a timer is a candidate. When the final arrives each
+candidate is reconciled the same way _on_recognized reconciles
+executed_in_partial: it was *safe* to execute if the final equals it or only
+appends a separate ("then") command, and *unsafe* if the final extends it
+with "and ..." (a missed combination) or says something different. The
+candidate's hold time is how long its text stayed unchanged.
+
+For a shape, waiting d seconds executes a candidate wrongly only if it was
+unsafe and held for at least d. AdaptiveDebounce picks the smallest d on a
+grid whose observed false-execution rate is at or below the target, and
+falls back to the fixed delay until a shape has enough samples.
+
+Both policies keep the decisions they made for the current utterance
+(decisions_for_utterance) so they can go into the ASR log and be compared
+across replayed sessions.
+"""
+
+import json
+import os
+from collections import deque
+
+from command_journal import atomic_write_json
+from command_parser import AND, DIR, NUM, QUAL, THEN, UNIT, normalize_command, tokenize
+
+PARTIAL = "partial"
+AND_TIMEOUT = "and_timeout"
+
+DEFAULT_TARGET_FALSE_RATE = 0.05
+MIN_SAMPLES = 8
+MAX_SAMPLES_PER_SHAPE = 200
+DELAY_STEP_SECS = 0.05
+# (min, max) wait per timer kind
+DELAY_BOUNDS = {
+    PARTIAL: (0.15, 1.0),
+    AND_TIMEOUT: (0.6, 3.0),
+}
+
+_KIND_NAMES = {NUM: "num", DIR: "dir", UNIT: "unit", QUAL: "qual", AND: "and", THEN: "then"}
+
+
+def command_shape(text: str) -> str:
+    kinds = []
+    for token in tokenize(text.lower()):
+        name = _KIND_NAMES.get(token.kind)
+        if name and (not kinds or kinds[-1] != name):
+            kinds.append(name)
+    return " ".join(kinds) or "-"
+
+
+def is_safe_to_execute(candidate: str, final: str) -> bool:
+    """Would executing `candidate` early have matched what the final says?"""
+    # Finals are punctuated ("Move left, then down 3."), partials are not
+    executed = normalize_command(candidate.replace(",", " "))
+    final_text = normalize_command(final.replace(",", " "))
+    # Token boundary: "move right 1" is not a prefix of "move right 15"
+    if not final_text.startswith(executed) or final_text[len(executed):len(executed) + 1] not in ("", " "):
+        return False
+    remaining = final_text[len(executed):].strip()
+    # "X" then final "X and Y": Y should have been combined into one move
+    return not remaining.startswith('and ')
+
+
+class _Candidate:
+    __slots__ = ("text", "kind", "shape", "armed_at", "changed_at")
+
+    def __init__(self, text, kind, shape, armed_at):
+        self.text = text
+        self.kind = kind
+        self.shape = shape
+        self.armed_at = armed_at
+        self.changed_at = None
+
+
+class FixedDebounce:
+    """Constant delays; still records candidates and decisions."""
+
+    adaptive = False
+
+    def __init__(self, partial_secs: float, and_timeout_secs: float):
+        self.defaults = {PARTIAL: partial_secs, AND_TIMEOUT: and_timeout_secs}
+        self._candidates = []
+        self._decisions = []
+
+    def delay_for(self, text: str, kind: str, now: float) -> float:
+        """Delay for a timer about to be armed for `text`; records the decision."""
+        shape = command_shape(text)
+        delay, samples, rate = self._choose(kind, shape)
+        self._candidates.append(_Candidate(text, kind, shape, now))
+        self._decisions.append({
+            "kind": kind,
+            "text": text,
+            "shape": shape,
+            "delay_secs": round(delay, 3),
+            "samples": samples,
+            "est_false_rate": None if rate is None else round(rate, 3),
+            "adaptive": self.adaptive and samples >= MIN_SAMPLES,
+        })
+        return delay
+
+    def _choose(self, kind, shape):
+        return self.defaults[kind], 0, None
+
+    def observe_partial(self, text: str, now: float):
+        """A new partial arrived; candidates with other text stop holding."""
+        for c in self._candidates:
+            if c.changed_at is None and c.text != text:
+                c.changed_at = now
+
+    def resolve(self, final_text, now: float):
+        """Reconcile this utterance's candidates against its final (None = no match)."""
+        if final_text is not None:
+            for c in self._candidates:
+                held = (c.changed_at if c.changed_at is not None else now) - c.armed_at
+                self._learn(c, held, is_safe_to_execute(c.text, final_text))
+        self._candidates = []
+
+    def _learn(self, candidate, held, safe):
+        pass
+
+    def decisions_for_utterance(self):
+        """Decisions made since the last call (one utterance's worth)."""
+        decisions, self._decisions = self._decisions, []
+        return decisions
+
+    def close(self):
+        pass
+
+
+class AdaptiveDebounce(FixedDebounce):
+    adaptive = True
+
+    def __init__(self, partial_secs: float, and_timeout_secs: float,
+                 target_false_rate: float = DEFAULT_TARGET_FALSE_RATE, stats_path=None):
+        super().__init__(partial_secs, and_timeout_secs)
+        self.target_false_rate = target_false_rate
+        self.stats_path = stats_path
+        # (kind, shape) -> deque of (held_secs, safe)
+        self.samples = {}
+        if stats_path and os.path.exists(stats_path):
+            self._load(stats_path)
+
+    def _load(self, path):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not load debounce stats {path}: {e}")
+            return
+        for key, rows in data.get("samples", {}).items():
+            kind, _, shape = key.partition("|")
+            self.samples[(kind, shape)] = deque(
+                ((held, safe) for held, safe in rows), maxlen=MAX_SAMPLES_PER_SHAPE
+            )
+        print(f"[OK] Loaded debounce stats for {len(self.samples)} command shapes")
+
+    def _learn(self, candidate, held, safe):
+        key = (candidate.kind, candidate.shape)
+        rows = self.samples.get(key)
+        if rows is None:
+            rows = self.samples[key] = deque(maxlen=MAX_SAMPLES_PER_SHAPE)
+        rows.append((round(held, 3), safe))
+
+    def false_rate(self, kind: str, shape: str, delay: float):
+        rows = self.samples.get((kind, shape), ())
+        if not rows:
+            return None
+        late_unsafe = sum(1 for held, safe in rows if not safe and held >= delay)
+        return late_unsafe / len(rows)
+
+    def _choose(self, kind, shape):
+        rows = self.samples.get((kind, shape), ())
+        if len(rows) < MIN_SAMPLES:
+            return self.defaults[kind], len(rows), None
+        low, high = DELAY_BOUNDS[kind]
+        steps = int(round((high - low) / DELAY_STEP_SECS))
+        for i in range(steps + 1):
+            delay = low + i * DELAY_STEP_SECS
+            rate = self.false_rate(kind, shape, delay)
+            if rate <= self.target_false_rate:
+                return delay, len(rows), rate
+        return high, len(rows), self.false_rate(kind, shape, high)
+
+    def summary(self):
+        """Per (kind, shape): samples, unsafe count, current delay and false rate."""
+        rows = []
+        for (kind, shape), samples in sorted(self.samples.items()):
+            delay, n, rate = self._choose(kind, shape)
+            unsafe = sum(1 for _, safe in samples if not safe)
+            rows.append((kind, shape, n, unsafe, delay, rate))
+        return rows
+
+    def close(self):
+        if self.stats_path:
+            atomic_write_json(self.stats_path, {
+                "target_false_rate": self.target_false_rate,
+                "samples": {f"{kind}|{shape}": list(rows) for (kind, shape), rows in self.samples.items()},
+            }, indent=None)
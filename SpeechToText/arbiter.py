@@ -0,0 +1,441 @@
+"""
+Command Arbiter
+===============
+One process that owns the authoritative TCP position and the single output
+channel, so a voice operator (speech_control.py) and a typed operator
+(cli_control.py) can run at the same time.
+
+Without it each entry point keeps a private current_position and both
+overwrite tcp_commands.json, so each computes its deltas from a position
+the other has already moved.  With --arbiter the entry points still parse
+locally but send only the relative steps; the arbiter applies them to its
+position, checks the workspace, journals, publishes and answers with the
+absolute targets.
+
+Ordering: requests are applied one at a time, in the order they arrive at
+the arbiter, and each gets a global order number.  Every client connection
+has its own reader thread that only decodes frames and puts them on one
+queue.SimpleQueue; a single applier thread owns the position, journal and
+transport, so there is no shared lock for clients to contend on.  Replies
+go out through a writer thread per connection, so a client that stops
+reading only holds up its own replies, never the applier; it is dropped
+once MAX_PENDING_REPLIES replies are waiting.
+
+Frames use the transport.py framing (4-byte length + JSON):
+
+  -> {"seq": 1, "op": "hello", "client": "voice"}
+  -> {"seq": 2, "op": "move", "deltas": [{"x": 0.1, "y": 0.0, "z": 0.0}], "texts": ["move right"]}
+  <- {"seq": 2, "ok": true, "order": 17, "positions": [{"x": .., "y": .., "z": ..}]}
+  <- {"seq": 3, "ok": false, "reason": "(..) is unreachable"}
+  -> {"seq": 4, "op": "position"}
+
+Per-client metrics (requests, steps, rejections, queue wait, most requests
+in flight) are printed on exit.
+
+Usage:
+  python arbiter.py                               # tcp 127.0.0.1:6602, file transport out
+  python arbiter.py --listen /tmp/gofa_arbiter.sock --waypoints
+  python cli_control.py --arbiter                 # in other terminals
+  python speech_control.py --arbiter
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from ack_watcher import AckWatcher
+from command_journal import CommandHistory, DiskWriter
+from timing import percentile
+from transport import add_transport_args, make_transport, parse_address, recv_frame, send_frame
+from waypoint_dispatcher import WaypointDispatcher, add_waypoint_args
+from workspace import WorkspaceValidator, add_workspace_args
+
+COMMAND_QUEUE_FILE = "../UnityProject/tcp_commands.json"
+JOURNAL_FILE = COMMAND_QUEUE_FILE.replace('.json', '_journal.jsonl')
+ACK_FILE = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
+DEFAULT_ARBITER_ADDRESS = "127.0.0.1:6602"
+DEFAULT_POSITION = {"x": 0.0, "y": 0.567, "z": -0.24}
+WAIT_SAMPLES = 4096
+# Unsent replies a connection may hold before the client is dropped
+MAX_PENDING_REPLIES = 1024
+
+_AXES = ("x", "y", "z")
+
+
+def arbiter_endpoint(address: Optional[str]):
+    """Socket family and address: a path means a Unix socket, otherwise host:port."""
+    address = address or DEFAULT_ARBITER_ADDRESS
+    return parse_address("unix" if address.startswith("/") else "tcp", address)
+
+
+def load_position(command_file: str = COMMAND_QUEUE_FILE, ack_file: str = ACK_FILE) -> dict:
+    """Last published target, else last acked position, else the default."""
+    for path, key in ((command_file, None), (ack_file, "position")):
+        try:
+            with open(path, "r") as f:
+                data = json.loads(f.read().strip())
+            pos = data[key] if key else data
+            return {a: round(float(pos[a]), 4) for a in _AXES}
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    return dict(DEFAULT_POSITION)
+
+
+class ClientStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.steps = 0
+        self.rejected = 0
+        # submitted is only written by the connection's reader thread and
+        # applied only by the applier, so neither needs a lock
+        self.submitted = 0
+        self.applied = 0
+        self.max_in_flight = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)   # received -> applied
+
+    def report(self) -> str:
+        waits_us = [w * 1e6 for w in self.waits]
+        if waits_us:
+            wait = (f"queue wait p50 {percentile(waits_us, 50):.0f} us / "
+                    f"p95 {percentile(waits_us, 95):.0f} us / max {max(waits_us):.0f} us")
+        else:
+            wait = "no waits recorded"
+        return (f"{self.name}: {self.requests} request(s), {self.steps} step(s), {self.rejected} rejected, "
+                f"max {self.max_in_flight} in flight, {wait}")
+
+
+class Arbiter:
+    """Applies queued requests in arrival order on one thread.
+
+    publish(targets) sends the absolute targets of one accepted request.
+    """
+
+    def __init__(self, publish, position: dict, validator=None, history=None):
+        self.publish = publish
+        self.position = dict(position)      # only touched by the applier thread
+        self.validator = validator
+        self.history = history
+        self.order = 0
+        self.clients = []
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._apply_loop, name="arbiter", daemon=True)
+        self._thread.start()
+
+    def register(self, name: str) -> ClientStats:
+        stats = ClientStats(name)
+        self.clients.append(stats)
+        return stats
+
+    def submit(self, client: ClientStats, request: dict, reply) -> None:
+        """Queue one request; reply(message) is called from the applier thread
+        and must not block (ArbiterServer only queues it for the connection)."""
+        client.submitted += 1
+        client.max_in_flight = max(client.max_in_flight, client.submitted - client.applied)
+        self._queue.put((time.perf_counter(), client, request, reply))
+
+    def _apply_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            received, client, request, reply = item
+            client.applied += 1
+            client.waits.append(time.perf_counter() - received)
+            try:
+                response = self._apply(client, request)
+            except (KeyError, TypeError, ValueError) as e:
+                response = {"ok": False, "reason": f"bad request: {e}"}
+            response["seq"] = request.get("seq")
+            try:
+                reply(response)
+            except OSError:
+                pass
+
+    def _apply(self, client: ClientStats, request: dict) -> dict:
+        op = request.get("op")
+        if op == "position":
+            return {"ok": True, "position": dict(self.position)}
+        if op != "move":
+            raise ValueError(f"unknown op {op!r}")
+
+        client.requests += 1
+        texts = request.get("texts") or []
+        positions, pos = [], self.position
+        for delta in request["deltas"]:
+            pos = {a: round(pos[a] + float(delta[a]), 4) for a in _AXES}
+            positions.append(pos)
+        if not positions:
+            return {"ok": True, "order": self.order, "positions": []}
+        if self.validator is not None:
+            for i, p in enumerate(positions):
+                verdict = self.validator.check(p)
+                if not verdict.ok:
+                    client.rejected += 1
+                    text = texts[i] if i < len(texts) else "?"
+                    reason = f"'{text}' -> ({p['x']:.3f}, {p['y']:.3f}, {p['z']:.3f}) is {verdict.reason}"
+                    print(f"[WARN] Rejected from {client.name}: {reason}")
+                    return {"ok": False, "reason": reason}
+
+        self.order += 1
+        client.steps += len(positions)
+        if self.history is not None:
+            for i, (p, delta) in enumerate(zip(positions, request["deltas"])):
+                self.history.append({
+                    "timestamp": datetime.now().isoformat(),
+                    "command_type": "move",
+                    "position": p,
+                    "delta": delta,
+                    "text": texts[i] if i < len(texts) else "",
+                    "client": client.name,
+                    "order": self.order,
+                })
+        self.position = dict(positions[-1])
+        self.publish(positions)
+        print(f"[OK] #{self.order} {client.name}: {len(positions)} step(s) -> {self.position}")
+        return {"ok": True, "order": self.order, "positions": positions}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+
+def _shutdown(conn):
+    try:
+        conn.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class ArbiterServer:
+    """Accepts client connections and feeds their frames to the Arbiter."""
+
+    def __init__(self, arbiter: Arbiter, address: Optional[str] = None):
+        self.arbiter = arbiter
+        self.family, self.address = arbiter_endpoint(address)
+        self._stop = threading.Event()
+        self._server = None
+        self._thread = None
+        self._connections = 0
+
+    def start(self):
+        if self.family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+        server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.address)
+        server.listen()
+        server.settimeout(0.2)
+        self._server = server
+        self.address = server.getsockname()
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            if self.family == socket.AF_INET:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connections += 1
+            threading.Thread(target=self._serve, args=(conn, self._connections), daemon=True).start()
+
+    def _serve(self, conn, number):
+        client = None
+        replies = queue.Queue(MAX_PENDING_REPLIES)
+        dropped = threading.Event()
+
+        def reply(response):
+            if dropped.is_set():
+                return
+            try:
+                replies.put_nowait(response)
+            except queue.Full:
+                dropped.set()
+                print(f"[WARN] Dropping connection #{number}: {MAX_PENDING_REPLIES} replies unread")
+                _shutdown(conn)
+
+        writer = threading.Thread(target=self._write_replies, args=(conn, replies), daemon=True)
+        writer.start()
+        with conn:
+            try:
+                while not self._stop.is_set():
+                    msg = recv_frame(conn)
+                    if msg is None:
+                        break
+                    if msg.get("op") == "hello":
+                        client = self.arbiter.register(f"{msg.get('client', 'client')}#{number}")
+                        print(f"[INFO] Client connected: {client.name}")
+                        reply({"seq": msg.get("seq"), "ok": True, "client": client.name})
+                        continue
+                    if client is None:
+                        client = self.arbiter.register(f"client#{number}")
+                    self.arbiter.submit(client, msg, reply)
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    replies.put_nowait(None)
+                except queue.Full:
+                    pass  # the writer exits on the shut-down socket instead
+                writer.join(timeout=1.0)
+        if client is not None:
+            print(f"[INFO] Client disconnected: {client.name}")
+
+    @staticmethod
+    def _write_replies(conn, replies):
+        """Send one connection's replies; a failed send drops the connection."""
+        while True:
+            response = replies.get()
+            if response is None:
+                return
+            try:
+                send_frame(conn, response)
+            except OSError:
+                _shutdown(conn)  # ends the reader too
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self.family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+# ── client side ────────────────────────────────────────────────────────────────
+class ArbiterClient:
+    """Blocking request/response client used by the entry points (thread-safe)."""
+
+    def __init__(self, address: Optional[str] = None, name: str = "client", timeout: float = 5.0):
+        self.family, self.address = arbiter_endpoint(address)
+        self.name = name
+        self.timeout = timeout
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._sock = None
+
+    def connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        reply = self._request({"op": "hello", "client": self.name})
+        print(f"[OK] Connected to arbiter {self.address} as {reply.get('client')}")
+        return self
+
+    def _request(self, message: dict) -> dict:
+        with self._lock:
+            self.seq += 1
+            message["seq"] = self.seq
+            send_frame(self._sock, message)
+            while True:
+                reply = recv_frame(self._sock)
+                if reply is None:
+                    raise ConnectionError("arbiter closed the connection")
+                if reply.get("seq") == self.seq:
+                    return reply
+
+    def position(self) -> dict:
+        return self._request({"op": "position"})["position"]
+
+    def submit(self, positions: list) -> dict:
+        """Send the relative steps of parsed position records."""
+        return self._request({
+            "op": "move",
+            "deltas": [{a: p["delta"][a] for a in _AXES} for p in positions],
+            "texts": [p.get("command_text", "") for p in positions],
+        })
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def add_arbiter_args(parser) -> None:
+    """Add --arbiter to an entry point's argparse parser."""
+    parser.add_argument('--arbiter', nargs='?', const=DEFAULT_ARBITER_ADDRESS, metavar='ADDRESS',
+                        help=f'Send relative moves to a running arbiter.py instead of publishing '
+                             f'(default {DEFAULT_ARBITER_ADDRESS}; a path means a Unix socket)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arbiter for concurrent voice / CLI clients')
+    parser.add_argument('--listen', default=DEFAULT_ARBITER_ADDRESS, metavar='ADDRESS',
+                        help=f'host:port or Unix socket path to accept clients on '
+                             f'(default {DEFAULT_ARBITER_ADDRESS})')
+    add_transport_args(parser)
+    add_waypoint_args(parser)
+    add_workspace_args(parser)
+    args = parser.parse_args()
+
+    disk_writer = DiskWriter()
+    transport = make_transport(args.transport, COMMAND_QUEUE_FILE, args.address, disk_writer)
+    validator = None
+    if not args.no_workspace_check:
+        validator = WorkspaceValidator(args.workspace_grid, args.min_manipulability)
+
+    def publish_target(message):
+        transport.publish(message)
+        if ack_watcher is not None:
+            ack_watcher.note_commanded(message)
+
+    dispatcher = None
+    if args.waypoints:
+        dispatcher = WaypointDispatcher(publish_target, args.lookahead, args.ack_timeout)
+    ack_watcher = AckWatcher(ACK_FILE, on_ack=dispatcher.on_ack if dispatcher else None).start()
+
+    def publish(positions):
+        if dispatcher is not None:
+            dispatcher.submit(positions)
+        else:
+            publish_target(dict(positions[-1]))
+
+    position = load_position()
+    arbiter = Arbiter(publish, position, validator, CommandHistory(JOURNAL_FILE, disk_writer))
+    server = ArbiterServer(arbiter, args.listen).start()
+    print(f"Arbiter listening on {server.address} | Transport: {transport.kind} | Start position: {position}")
+    print("Ctrl+C to stop.")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\nStopping.")
+        server.stop()
+        arbiter.close()
+        for client in arbiter.clients:
+            print(f"  {client.report()}")
+        if validator is not None:
+            print(f"Workspace: {validator.stats()}")
+        ack_watcher.stop()
+        if dispatcher:
+            dispatcher.close()
+        transport.close()
+        disk_writer.close()
+
+
+if __name__ == "__main__":
+    main()
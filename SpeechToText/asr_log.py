@@ -0,0 +1,132 @@
+"""
+ASR Log Writer
+==============
+Asynchronous, batched JSONL logger for recognition results.
+
+Recognizer callbacks call log() which only puts the record on a
+queue.SimpleQueue (no lock, no file I/O).  A dedicated writer thread
+drains the queue and writes records in batches, flushing whenever
+batch_size records are pending or flush_interval seconds have passed.
+
+When the file grows past max_bytes it is rotated:
+  asr_log.jsonl -> asr_log.jsonl.1 -> asr_log.jsonl.2 ... (backup_count kept)
+With compress=True rotated files are gzipped (asr_log.jsonl.1.gz, ...).
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_BATCH_SIZE = 32
+LOG_FLUSH_INTERVAL_SECS = 1.0
+
+
+class AsrLogWriter:
+    def __init__(self, path: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 compress: bool = False, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL_SECS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.rotations = 0
+        self._queue = queue.SimpleQueue()
+        self._handle = None
+        self._thread = threading.Thread(target=self._run, name="asr-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, record: dict):
+        """Enqueue a record; safe to call from any callback thread."""
+        self._queue.put(record)
+
+    def flush(self, timeout=None) -> bool:
+        """Block until everything logged before this call is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ── writer thread ──────────────────────────────────────────────────────────
+    def _run(self):
+        pending = []
+        waiters = []
+        last_flush = time.monotonic()
+        running = True
+
+        while running:
+            wait = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=wait if pending else None)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                pending.append(item)
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if pending and (len(pending) >= self.batch_size or due or waiters or not running):
+                self._write(pending)
+                pending = []
+                last_flush = time.monotonic()
+            elif not pending:
+                last_flush = time.monotonic()
+
+            for done in waiters:
+                done.set()
+            waiters = []
+
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _write(self, records):
+        try:
+            if self._handle is None:
+                self._handle = open(self.path, "a", encoding="utf-8")
+            self._handle.write("".join(json.dumps(r) + "\n" for r in records))
+            self._handle.flush()
+            self.records_written += len(records)
+            if self._handle.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            print(f"[WARN] Could not write ASR log: {e}")
+
+    def _rotated_name(self, index: int) -> str:
+        suffix = ".gz" if self.compress else ""
+        return f"{self.path}.{index}{suffix}"
+
+    def _rotate(self):
+        self._handle.close()
+        self._handle = None
+
+        oldest = self._rotated_name(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self._rotated_name(i)
+            if os.path.exists(src):
+                os.replace(src, self._rotated_name(i + 1))
+
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(self._rotated_name(1), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._rotated_name(1))
+        self.rotations += 1
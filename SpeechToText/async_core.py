@@ -0,0 +1,143 @@
+"""
+Async Core
+==========
+asyncio plumbing that makes one event loop the coordinator for
+speech_control.py: recognizer events, debounce timers, target dispatch,
+acks and shutdown all run as callbacks or tasks on that loop, so the
+per-utterance state is only ever touched by one thread and needs no lock.
+
+  post = threadsafe(loop, handler)   # SDK / audio / ack threads call post(...)
+  scheduler = LoopScheduler(loop)    # call_later() -> cancellable task
+  lane = DispatchLane()              # blocking publishes, in order, off the loop
+  await wait_for_event(thread_event) # no executor thread held while waiting
+
+Threads that must block (mic capture, the Azure SDK, the ack watcher)
+stay threads; they only hand events in with loop.call_soon_threadsafe.
+LoopThread runs a loop on a background thread for synchronous callers
+such as replay_harness.py.
+
+Usage:
+  see speech_control.py (main / serve) and MicToAzureStream
+"""
+
+import asyncio
+import threading
+import traceback
+
+
+def threadsafe(loop: asyncio.AbstractEventLoop, callback):
+    """Wrap callback so calls from any thread run it on loop instead.
+
+    Calls made after the loop has closed (during shutdown) are dropped.
+    """
+    def post(*args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+    return post
+
+
+async def wait_for_event(event: threading.Event) -> None:
+    """Await a threading.Event.
+
+    A daemon thread does the blocking wait, so unlike asyncio.to_thread a
+    cancelled waiter never holds up the executor shutdown in asyncio.run.
+    """
+    if event.is_set():
+        return
+    done = asyncio.Event()
+    post = threadsafe(asyncio.get_running_loop(), done.set)
+    threading.Thread(target=lambda: (event.wait(), post()), name="event-wait", daemon=True).start()
+    await done.wait()
+
+
+class LoopScheduler:
+    """TimerScheduler's call_later on an asyncio loop.
+
+    Each call is a task that sleeps, then runs the callback on the loop;
+    the returned task's cancel() drops it.  Must be called on the loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._tasks = set()
+
+    def call_later(self, delay: float, callback, *args) -> asyncio.Task:
+        task = self.loop.create_task(self._fire(delay, callback, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @staticmethod
+    async def _fire(delay, callback, args):
+        await asyncio.sleep(delay)
+        try:
+            callback(*args)
+        except Exception:
+            print("[WARN] Scheduled callback failed:")
+            traceback.print_exc()
+
+    def pending(self) -> int:
+        return sum(1 for t in self._tasks if not t.done())
+
+    def close(self):
+        """Cancel every call that has not fired yet (on the loop)."""
+        for task in list(self._tasks):
+            task.cancel()
+
+
+class DispatchLane:
+    """One task that runs blocking calls (publishes, arbiter requests) in
+    submission order on a worker thread, so a slow transport never stalls
+    the event handlers.
+
+    submit() must be called on the loop; run() is the task body.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self.dispatched = 0
+        self.max_backlog = 0
+
+    def submit(self, fn, *args) -> None:
+        self._queue.put_nowait((fn, args))
+        self.max_backlog = max(self.max_backlog, self._queue.qsize())
+
+    async def run(self):
+        while True:
+            fn, args = await self._queue.get()
+            try:
+                await asyncio.to_thread(fn, *args)
+            except Exception:
+                print("[WARN] Dispatch failed:")
+                traceback.print_exc()
+            self.dispatched += 1
+            self._queue.task_done()
+
+    async def drain(self):
+        """Wait until everything submitted so far has run."""
+        await self._queue.join()
+
+    def stats(self) -> str:
+        return f"{self.dispatched} dispatched, max backlog {self.max_backlog}"
+
+
+class LoopThread:
+    """An event loop on a background thread, for callers that are not async."""
+
+    def __init__(self, name: str = "event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def call(self, fn, *args, timeout: float = 5.0):
+        """Run fn(*args) on the loop and return its result."""
+        async def runner():
+            return fn(*args)
+        return asyncio.run_coroutine_threadsafe(runner(), self.loop).result(timeout)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=1.0)
+        self.loop.close()
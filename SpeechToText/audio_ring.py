@@ -0,0 +1,161 @@
+"""
+Audio Ring Buffer
+=================
+Preallocated capture buffer and VAD gate for mic_capture_thread.
+
+  AudioRing  -- fixed NumPy buffer of capacity frames. The sounddevice
+                callback copies each block straight into its slot; no
+                per-frame bytes objects, queue nodes or deque entries.
+  SpeechGate -- runs the VAD over read-only memoryview slices of every
+                frame that arrived since the last call, and hands speech to
+                the recognizer in coalesced chunks. The pre-speech window
+                and the speech frames after it go out as one contiguous
+                write instead of one write per 30 ms frame.
+
+Frame views are only valid until the writer laps them, so write_audio
+must consume (or copy) the chunk before returning.
+
+Usage:
+  ring = AudioRing(FRAME_SIZE * BYTES_PER_SAMPLE)
+  gate = SpeechGate(vad, SAMPLE_RATE, PRE_SPEECH_FRAMES, silence_frames, write_audio)
+  callback: ring.write(indata)
+  consumer: while ring.wait(0.1): gate.feed(ring)
+"""
+
+import threading
+
+import numpy as np
+
+DEFAULT_CAPACITY_FRAMES = 128  # ~3.8 s of 30 ms frames
+# Frames closest to the writer are never read, so a slow consumer cannot
+# read a slot the callback is overwriting
+WRITER_GUARD_FRAMES = 4
+
+
+class AudioRing:
+    def __init__(self, frame_bytes: int, capacity: int = DEFAULT_CAPACITY_FRAMES):
+        self.frame_bytes = frame_bytes
+        self.capacity = capacity
+        self._buf = np.zeros(capacity * frame_bytes, dtype=np.uint8)
+        self._scratch = np.zeros(capacity * frame_bytes, dtype=np.uint8)
+        mv = memoryview(self._buf)
+        self._slots = [mv[i * frame_bytes:(i + 1) * frame_bytes] for i in range(capacity)]
+        self._views = [s.toreadonly() for s in self._slots]
+        self._whole = mv.toreadonly()
+        self._scratch_view = memoryview(self._scratch).toreadonly()
+        self._ready = threading.Event()
+
+        self.written = 0   # frames ever written (writer-owned)
+        self.read = 0      # frames consumed (reader-owned)
+        self.overruns = 0  # frames dropped because the reader fell behind
+        self.short_frames = 0
+
+    # ── Writer side (audio callback) ─────────────────────────────────
+
+    def write(self, data) -> None:
+        if len(data) != self.frame_bytes:
+            self.short_frames += 1
+            return
+        self._slots[self.written % self.capacity][:] = data
+        self.written += 1
+        self._ready.set()
+
+    # ── Reader side ──────────────────────────────────────────────────
+
+    def wait(self, timeout: float) -> bool:
+        """Block until new frames may be available."""
+        got = self._ready.wait(timeout)
+        self._ready.clear()
+        return got
+
+    def oldest(self) -> int:
+        """Index of the oldest frame that is still safe to read."""
+        return max(0, self.written - self.capacity + WRITER_GUARD_FRAMES)
+
+    def available(self):
+        """(start, end) of unread frames, skipping any the writer has lapped."""
+        end = self.written
+        oldest = self.oldest()
+        if self.read < oldest:
+            self.overruns += oldest - self.read
+            self.read = oldest
+        return self.read, end
+
+    def consume(self, end: int) -> None:
+        self.read = end
+
+    def frame(self, index: int) -> memoryview:
+        return self._views[index % self.capacity]
+
+    def span(self, start: int, end: int) -> memoryview:
+        """Frames [start, end) as one contiguous read-only view.
+
+        Zero-copy unless the span wraps the end of the buffer, in which case
+        the two halves are copied into a preallocated scratch buffer.
+        """
+        fb = self.frame_bytes
+        first = start % self.capacity
+        count = end - start
+        if first + count <= self.capacity:
+            return self._whole[first * fb:(first + count) * fb]
+        head = (self.capacity - first) * fb
+        total = count * fb
+        self._scratch[:head] = self._buf[first * fb:]
+        self._scratch[head:total] = self._buf[:total - head]
+        return self._scratch_view[:total]
+
+
+class SpeechGate:
+    """VAD state machine over an AudioRing, with coalesced recognizer writes."""
+
+    def __init__(self, vad, sample_rate: int, pre_speech_frames: int, silence_frames: int,
+                 write_audio, on_onset=None):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.pre_speech_frames = pre_speech_frames
+        self.silence_frames = silence_frames
+        self.write_audio = write_audio
+        self.on_onset = on_onset
+
+        self.voiced = False
+        self._silent_run = 0
+        self.writes = 0
+        self.frames_sent = 0
+
+    def _send(self, ring, start, end):
+        if end > start:
+            self.write_audio(ring.span(start, end))
+            self.writes += 1
+            self.frames_sent += end - start
+
+    def feed(self, ring: AudioRing) -> None:
+        """Process every frame that arrived since the last call."""
+        start, end = ring.available()
+        run_start = None  # first frame of the chunk being coalesced
+        is_speech = self.vad.is_speech
+        rate = self.sample_rate
+
+        for i in range(start, end):
+            if is_speech(ring.frame(i), rate):
+                if not self.voiced:
+                    self.voiced = True
+                    if self.on_onset:
+                        self.on_onset()
+                    # Pre-speech window: this frame and the ones before it
+                    run_start = max(i - self.pre_speech_frames + 1, ring.oldest())
+                elif run_start is None:
+                    run_start = i
+                self._silent_run = 0
+            else:
+                if run_start is not None:
+                    self._send(ring, run_start, i)
+                    run_start = None
+                if self.voiced:
+                    self._silent_run += 1
+                    if self._silent_run > self.silence_frames:
+                        self.voiced = False
+                        self._silent_run = 0
+
+        if run_start is not None:
+            self._send(ring, run_start, end)
+        ring.consume(end)
@@ -0,0 +1,112 @@
+"""
+Arbiter Concurrency Benchmark
+=============================
+Many clients submit relative moves to one in-process arbiter.Arbiter over
+its socket server at the same time, the way several cli_control.py /
+speech_control.py instances would with --arbiter.
+
+Checked:
+  - every request got a distinct global order number, and each client's
+    order numbers increase (its requests were applied in submission order)
+  - the final position equals the start plus the sum of every delta, so
+    no client's step was computed from a stale position
+
+Reported: total request throughput, client round trip (submit -> reply)
+and the arbiter's per-client queue metrics.
+
+Usage:
+  python benchmarks/bench_arbiter.py
+  python benchmarks/bench_arbiter.py --clients 32 --requests 500 --unix
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from arbiter import Arbiter, ArbiterClient, ArbiterServer, DEFAULT_POSITION  # noqa: E402
+from timing import percentile  # noqa: E402
+
+STEP_MM = (-20, -10, 10, 20)
+
+
+def run_client(address, name, requests, seed, results):
+    rng = random.Random(seed)
+    client = ArbiterClient(address, name).connect()
+    sent_mm, orders, round_trips = [0, 0, 0], [], []
+    for i in range(requests):
+        step = [rng.choice(STEP_MM) if rng.random() < 0.5 else 0 for _ in range(3)]
+        for axis in range(3):
+            sent_mm[axis] += step[axis]
+        record = {"delta": {a: s / 1000.0 for a, s in zip("xyz", step)}, "command_text": f"{name} {i}"}
+        started = time.perf_counter()
+        reply = client.submit([record])
+        round_trips.append(time.perf_counter() - started)
+        orders.append(reply["order"])
+    client.close()
+    results[name] = (sent_mm, orders, round_trips)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent clients against the arbiter')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per client')
+    parser.add_argument('--unix', action='store_true', help='Use a Unix socket instead of tcp')
+    args = parser.parse_args()
+
+    published = []
+    arbiter = Arbiter(lambda targets: published.append(targets[-1]), DEFAULT_POSITION)
+    tmp = tempfile.TemporaryDirectory()
+    address = os.path.join(tmp.name, "arbiter.sock") if args.unix else "127.0.0.1:0"
+    # the arbiter and clients print per request; keep only the report
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        server = ArbiterServer(arbiter, address).start()
+        if not args.unix:
+            address = f"127.0.0.1:{server.address[1]}"
+
+        results = {}
+        threads = [threading.Thread(target=run_client,
+                                    args=(address, f"c{i:02d}", args.requests, i, results))
+                   for i in range(args.clients)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        final = dict(arbiter.position)
+        server.stop()
+        arbiter.close()
+    tmp.cleanup()
+
+    total = args.clients * args.requests
+    orders = [o for _, client_orders, _ in results.values() for o in client_orders]
+    in_order = all(o == sorted(o) for _, o, _ in results.values())
+    sum_mm = [sum(r[0][axis] for r in results.values()) for axis in range(3)]
+    expected = {a: round(DEFAULT_POSITION[a] + s / 1000.0, 4) for a, s in zip("xyz", sum_mm)}
+    consistent = all(abs(final[a] - expected[a]) < 1e-6 for a in "xyz")
+    round_trips = [v * 1e6 for _, _, rts in results.values() for v in rts]
+
+    print(f"{args.clients} clients x {args.requests} requests over {'unix' if args.unix else 'tcp'}\n")
+    print(f"Throughput: {total} requests in {elapsed:.3f}s -> {total / elapsed:.0f} requests/s, "
+          f"{len(published)} published")
+    print(f"Round trip: p50 {percentile(round_trips, 50):.0f} us, p99 {percentile(round_trips, 99):.0f} us, "
+          f"max {max(round_trips):.0f} us")
+    print(f"Order numbers: {len(set(orders))}/{total} distinct, "
+          f"per-client submission order {'kept' if in_order else 'VIOLATED'}")
+    print(f"Final position {final} {'==' if consistent else '!='} start + all deltas {expected}")
+    print("Per client (arbiter side):")
+    for client in sorted(arbiter.clients, key=lambda c: c.name)[:8]:
+        print(f"  {client.report()}")
+    if len(arbiter.clients) > 8:
+        print(f"  ... {len(arbiter.clients) - 8} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Audio Capture Benchmark
+=======================
+Feeds synthetic audio (speech-like bursts separated by silence) through the
+old mic_capture_thread path and through AudioRing + SpeechGate, in blocks
+of a few frames like the sounddevice callback delivers between consumer
+wake-ups.
+
+  legacy -- bytes(indata) per frame, queue.Queue, deque pre-roll,
+            one recognizer write per frame
+  ring   -- preallocated AudioRing, VAD over memoryviews, coalesced writes
+
+Reported per second of audio: CPU time, recognizer write calls, and bytes
+allocated (tracemalloc peak above baseline within each wake-up, summed; a
+lower bound, measured over a short window).
+
+Uses webrtcvad when it is installed; otherwise an RMS energy VAD, so the
+numbers then show the buffering path only.
+
+Usage:
+  python benchmarks/bench_audio.py
+  python benchmarks/bench_audio.py --seconds 120 --vad energy
+"""
+
+import argparse
+import os
+import queue
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_ring import AudioRing, SpeechGate  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 30
+FRAME_SIZE = int(SAMPLE_RATE * FRAME_DURATION_MS / 1000)
+BYTES_PER_SAMPLE = 2
+FRAME_BYTES = FRAME_SIZE * BYTES_PER_SAMPLE
+PRE_SPEECH_FRAMES = 10
+SILENCE_TIMEOUT_FRAMES = 20
+FRAMES_PER_WAKEUP = 3
+
+
+class EnergyVad:
+    """RMS threshold VAD; stands in when webrtcvad is not installed."""
+
+    def __init__(self, threshold=500.0):
+        self.threshold_sq = threshold * threshold * FRAME_SIZE
+        self._samples = np.zeros(FRAME_SIZE, dtype=np.float32)
+
+    def is_speech(self, frame, sample_rate):
+        np.copyto(self._samples, np.frombuffer(frame, dtype=np.int16))
+        return float(np.dot(self._samples, self._samples)) > self.threshold_sq
+
+
+def make_vad(kind):
+    if kind == "webrtc":
+        try:
+            import webrtcvad
+            return webrtcvad.Vad(2), "webrtcvad"
+        except ImportError:
+            print("[INFO] webrtcvad not installed; using the energy VAD")
+    return EnergyVad(), "energy"
+
+
+def synth_audio(seconds, seed=0):
+    """Alternating ~1.5 s bursts of voiced noise and ~1 s of near-silence."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    t = np.arange(total) / SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * t / 2.5) > 0.2).astype(np.float32)
+    voice = np.sin(2 * np.pi * 180 * t) * 6000 + rng.normal(0, 1500, total)
+    noise = rng.normal(0, 60, total)
+    pcm = np.where(envelope > 0, voice, noise).astype(np.int16)
+    # Callback blocks are views of driver memory, like sounddevice's cffi buffers
+    raw = memoryview(pcm.view(np.uint8))
+    return [raw[i * FRAME_BYTES:(i + 1) * FRAME_BYTES] for i in range(len(pcm) // FRAME_SIZE)]
+
+
+class LegacyPath:
+    """The old mic_capture_thread loop, minus the real microphone."""
+
+    def __init__(self, vad, sink):
+        self.vad = vad
+        self.sink = sink
+        self.q = queue.Queue()
+        self.ring = deque(maxlen=PRE_SPEECH_FRAMES)
+        self.voiced = False
+        self.silent = 0
+
+    def wakeup(self, block):
+        for indata in block:
+            self.q.put_nowait(bytes(indata))
+        while True:
+            try:
+                pcm_bytes = self.q.get_nowait()
+            except queue.Empty:
+                break
+            is_speech = self.vad.is_speech(pcm_bytes, SAMPLE_RATE)
+            self.ring.append(pcm_bytes)
+            if is_speech:
+                if not self.voiced:
+                    for pre in self.ring:
+                        self.sink(pre)
+                    self.voiced = True
+                    self.silent = 0
+                self.sink(pcm_bytes)
+            elif self.voiced:
+                self.silent += 1
+                if self.silent > SILENCE_TIMEOUT_FRAMES:
+                    self.voiced = False
+                    self.silent = 0
+
+
+class RingPath:
+    def __init__(self, vad, sink):
+        self.ring = AudioRing(FRAME_BYTES)
+        self.gate = SpeechGate(vad, SAMPLE_RATE, PRE_SPEECH_FRAMES, SILENCE_TIMEOUT_FRAMES, sink)
+
+    def wakeup(self, block):
+        for indata in block:
+            self.ring.write(indata)
+        self.gate.feed(self.ring)
+
+
+def blocks(frames):
+    return [frames[i:i + FRAMES_PER_WAKEUP] for i in range(0, len(frames), FRAMES_PER_WAKEUP)]
+
+
+def measure(cls, frames, vad):
+    writes = [0]
+
+    def sink(chunk):
+        writes[0] += 1
+
+    wakeups = blocks(frames)
+    path = cls(vad, sink)
+    for block in wakeups[:50]:  # warm up
+        path.wakeup(block)
+    writes[0] = 0
+
+    path = cls(vad, sink)
+    t0 = time.process_time()
+    for block in wakeups:
+        path.wakeup(block)
+    cpu = time.process_time() - t0
+
+    # Peak traced memory above the baseline, per wake-up: a lower bound on
+    # what each wake-up allocates (tracemalloc is slow, so a short window)
+    path = cls(vad, lambda chunk: None)
+    window = wakeups[:min(len(wakeups), 600)]
+    allocated = 0
+    tracemalloc.start()
+    for block in window:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        path.wakeup(block)
+        allocated += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    window_frames = sum(len(b) for b in window)
+    return cpu, writes[0], allocated, window_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mic capture buffering')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Seconds of synthetic audio')
+    parser.add_argument('--vad', choices=['webrtc', 'energy'], default='webrtc')
+    args = parser.parse_args()
+
+    frames = synth_audio(args.seconds)
+    vad, vad_name = make_vad(args.vad)
+    audio_secs = len(frames) * FRAME_DURATION_MS / 1000
+
+    print(f"{audio_secs:.0f} s of audio, {len(frames)} frames, VAD: {vad_name}\n")
+    print(f"{'path':<8}{'CPU ms/s':>10}{'writes/s':>10}{'alloc KiB/s':>13}")
+    for name, cls in (("legacy", LegacyPath), ("ring", RingPath)):
+        cpu, writes, allocated, window_frames = measure(cls, frames, vad)
+        window_secs = window_frames * FRAME_DURATION_MS / 1000
+        print(f"{name:<8}{cpu * 1000 / audio_secs:>10.2f}{writes / audio_secs:>10.1f}"
+              f"{allocated / 1024 / window_secs:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+End-to-End Benchmark
+====================
+Runs cli_control.py in batch mode against the headless Unity stand-in
+(unity_standin.py) in a scratch directory, so the whole file pipeline --
+parse, publish, poll, move, ack -- can be measured without Unity.
+
+Each mode sends the same command script:
+  direct     -- every target overwrites tcp_commands.json (default CLI)
+  waypoints  -- --waypoints: the next step is published on the previous ack
+Both use --wait, so each command waits for its final ack before the next.
+
+Reported per mode: steps commanded (from the command journal) and how many
+the stand-in reached, then the stand-in's own counts -- commands picked up,
+cancelled moves, acks, dropped waypoints, throughput and publish -> pickup
+/ ack latency.  Steps overwritten before a poll never reach the stand-in, so
+only the journal comparison shows them.
+
+Usage:
+  python benchmarks/bench_e2e.py
+  python benchmarks/bench_e2e.py --commands 40 --poll-interval 0.05 --move-speed 4
+"""
+
+import argparse
+import glob
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, HERE)
+
+from command_journal import iter_journal  # noqa: E402
+from unity_standin import ROUTE_MATCH_DISTANCE, UnityStandin  # noqa: E402
+
+# Consecutive commands never end on the same point, so --wait cannot be
+# satisfied by the previous command's ack
+SCRIPT = [
+    "move right 1",
+    "move up 1 then left 1",
+    "move down 1",
+    "move forward 1 then left 1",
+]
+MODES = {"direct": ["--wait", "5"], "waypoints": ["--waypoints", "--wait", "5"]}
+# Stop waiting for the stand-in after this long without a pickup or ack
+IDLE_SECS = 1.0
+
+
+def reached_steps(steps, acks):
+    """How many commanded steps were acked, matching in order."""
+    reached, i = 0, 0
+    for _, ack in acks:
+        point = tuple(ack[a] for a in ("x", "y", "z"))
+        for j in range(i, len(steps)):
+            if math.dist(steps[j], point) < ROUTE_MATCH_DISTANCE:
+                reached += 1
+                i = j + 1
+                break
+    return reached
+
+
+def run(mode_args, commands, poll_interval, move_speed, workdir):
+    project = os.path.join(workdir, "UnityProject")
+    cwd = os.path.join(workdir, "SpeechToText")
+    os.makedirs(project)
+    os.makedirs(cwd)
+    script = os.path.join(workdir, "commands.txt")
+    with open(script, "w") as f:
+        f.write("\n".join(SCRIPT[i % len(SCRIPT)] for i in range(commands)) + "\n")
+
+    standin = UnityStandin(project, poll_interval, move_speed).start()
+    try:
+        time.sleep(poll_interval * 2)  # let it publish and ack its start position
+        started = time.monotonic()
+        script_started = time.time()
+        proc = subprocess.run(
+            [sys.executable, os.path.join(HERE, "cli_control.py"), "--script", script, "--quiet",
+             "--no-workspace-check", *mode_args],
+            cwd=cwd, capture_output=True, text=True, timeout=600,
+        )
+        while standin.idle_for() < IDLE_SECS and time.monotonic() - started < 600:
+            time.sleep(0.05)
+    finally:
+        standin.stop()
+    if proc.returncode != 0:
+        print(proc.stderr)
+    batch = next((line for line in proc.stdout.splitlines() if line.startswith("Batch:")), "")
+    steps = [tuple(r["position"][a] for a in ("x", "y", "z"))
+             for path in sorted(glob.glob(os.path.join(project, "tcp_commands_journal.*.jsonl")))
+             for r in iter_journal(path) if r.get("command_type") == "move"]
+    acks = [(t, p) for t, p in standin.ack_log if t >= script_started]
+    return standin, batch, steps, acks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end benchmark against the Unity stand-in')
+    parser.add_argument('--commands', type=int, default=20, help='Commands in the script')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='Stand-in poll interval (s)')
+    parser.add_argument('--move-speed', type=float, default=2.0, help='Stand-in move speed (units/s)')
+    args = parser.parse_args()
+
+    print(f"{args.commands} commands, poll {args.poll_interval}s, move speed {args.move_speed}\n")
+    for mode, mode_args in MODES.items():
+        with tempfile.TemporaryDirectory() as workdir:
+            standin, batch, steps, acks = run(mode_args, args.commands, args.poll_interval,
+                                              args.move_speed, workdir)
+        reached = reached_steps(steps, acks)
+        print(f"[{mode}] {batch}")
+        print(f"{len(steps)} step(s) commanded, {reached} reached, {len(steps) - reached} never reached")
+        print(standin.stats())
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+EGM Loop Benchmark
+==================
+Runs egm.EgmClient against the stand-in controller (egm_standin.py) on
+localhost and drives the TCP around a square of targets, the way
+--transport egm would, to measure the control loop without a robot.
+
+Reported:
+  - achieved controller cycle rate against the target (250 Hz at 4 ms)
+  - controller send lateness (scheduling jitter of the stand-in itself)
+  - reply round trip: EgmRobot sent -> EgmSensor received, as the
+    controller sees it, and the client's own receive -> reply time
+  - cycles that got no reply before the next one was due
+  - time from set_route() to the confirmed (acked) arrival per target
+
+Usage:
+  python benchmarks/bench_egm.py
+  python benchmarks/bench_egm.py --side 0.2 --cycle-ms 4 --speed 0.5
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from egm import EgmClient  # noqa: E402
+from egm_standin import START_POSITION, SimulatedController  # noqa: E402
+from timing import percentile  # noqa: E402
+
+
+def square(start, side):
+    x, y, z = start["x"], start["y"], start["z"]
+    return [
+        {"x": x + side, "y": y, "z": z},
+        {"x": x + side, "y": y + side, "z": z},
+        {"x": x, "y": y + side, "z": z},
+        {"x": x, "y": y, "z": z},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the EGM client loop against the stand-in controller')
+    parser.add_argument('--side', type=float, default=0.1, help='Square side in metres')
+    parser.add_argument('--laps', type=int, default=2, help='Times around the square')
+    parser.add_argument('--cycle-ms', type=float, default=4.0, help='Controller cycle in milliseconds')
+    parser.add_argument('--speed', type=float, default=0.25, help='Client max speed in m/s')
+    args = parser.parse_args()
+
+    reached = threading.Event()
+    client = EgmClient("127.0.0.1:0", max_speed=args.speed, on_reached=lambda p: reached.set()).start()
+    controller = SimulatedController(f"127.0.0.1:{client.address[1]}", args.cycle_ms / 1000.0).start()
+    move_secs = []
+    try:
+        deadline = time.monotonic() + 2.0
+        while client.position() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for target in square(START_POSITION, args.side) * args.laps:
+            reached.clear()
+            started = time.perf_counter()
+            client.set_route([target])
+            if not reached.wait(10.0):
+                print(f"[WARN] {target} not reached")
+                break
+            move_secs.append(time.perf_counter() - started)
+    finally:
+        controller.stop()
+        client.stop()
+
+    print(f"square {args.side} m x {args.laps} lap(s), client max speed {args.speed} m/s\n")
+    print(f"Controller: {controller.stats()}")
+    responses = [v * 1e6 for v in client.response_times]
+    print(f"Client receive -> reply: p50 {percentile(responses, 50):.0f} us, "
+          f"p99 {percentile(responses, 99):.0f} us, max {max(responses):.0f} us")
+    if move_secs:
+        ideal = args.side / args.speed
+        print(f"Move to confirmed arrival: p50 {percentile(move_secs, 50) * 1000:.0f} ms, "
+              f"max {max(move_secs) * 1000:.0f} ms (cruise-only time {ideal * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
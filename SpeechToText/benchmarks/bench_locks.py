@@ -0,0 +1,214 @@
+"""
+Lock Hold-Time Benchmark
+========================
+Replays a burst of the final commands from replay_fixtures/ through
+speech_control.py from several threads at once (the SDK, timer and ack
+threads of the old threaded design) and reports how long each lock was
+held and waited for.
+
+Two schemes:
+  legacy    the locking speech_control.py used before position_state.py:
+            the whole parse under position_lock, journaling and the position
+            update under queue_lock + position_lock, and the target written
+            to the command file while publish_lock is held
+  snapshot  the current code: a lock-free snapshot read for the parse, one
+            compare-and-swap per command (journal enqueue inside it) and the
+            publish on a single dispatch worker with no lock held
+
+Both use the same parser, journal (DiskWriter) and an inline FileTransport,
+so the command file is really written.  Checked for each: the final
+position equals the start plus every command's deltas, and the command file
+ends at the final position.  The legacy scheme parses and commits under two
+separate position_lock acquisitions, so two threads can parse from the same
+position and one command's move is lost; the snapshot commit detects that
+and rebases instead.
+
+Usage:
+  python benchmarks/bench_locks.py
+  python benchmarks/bench_locks.py --threads 16 --commands 500
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import speech_control as sc  # noqa: E402
+from command_journal import CommandHistory  # noqa: E402
+from position_state import PositionState, TimedLock  # noqa: E402
+from transport import FileTransport  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "replay_fixtures")
+START_POSITION = {"x": 0.0, "y": 0.567, "z": -0.24}
+
+
+def load_burst():
+    texts = []
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        with open(os.path.join(FIXTURE_DIR, name)) as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    if event["type"] == "final" and event.get("text"):
+                        texts.append(event["text"])
+    return texts
+
+
+class SerialLane:
+    """DispatchLane's in-order worker without an event loop."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="dispatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        self._queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args = item
+            fn(*args)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+class Legacy:
+    """The pre-snapshot locking, reproduced around the current parse."""
+
+    def __init__(self):
+        self.queue_lock = TimedLock("queue_lock")
+        self.position_lock = TimedLock("position_lock")
+        self.publish_lock = TimedLock("publish_lock")
+        self.queued = 0
+        self.published = 0
+
+    def command(self, text):
+        with self.position_lock:
+            positions = sc.process_multi_command_sentence(text)
+        if not positions:
+            return
+        with self.queue_lock:
+            with self.position_lock:
+                for pos_data in positions:
+                    sc.command_history.append({
+                        "timestamp": time.time(),
+                        "command_type": "move",
+                        "position": pos_data["position"],
+                        "delta": pos_data["delta"],
+                        "text": pos_data["command_text"],
+                    })
+                sc.position_state.set(positions[-1]["position"])
+                target = positions[-1]["position"].copy()
+            self.queued += 1
+            generation = self.queued
+        with self.publish_lock:
+            if generation <= self.published:
+                return
+            self.published = generation
+            sc.transport.publish(target)
+            print(f"Published via {sc.transport.kind}: {target}")
+
+    def locks(self):
+        return [self.position_lock, self.queue_lock, self.publish_lock]
+
+
+def snapshot_command(text):
+    sc.add_positions_to_queue(sc.process_multi_command_sentence(text))
+
+
+def run_scheme(name, burst, threads, workdir):
+    os.makedirs(workdir)
+    command_path = os.path.join(workdir, "tcp_commands.json")
+    sc.transport = FileTransport(command_path)
+    sc.command_history = CommandHistory(os.path.join(workdir, "journal.jsonl"), sc.disk_writer)
+    sc.position_state = PositionState(START_POSITION)
+    sc.publish_lock = TimedLock("publish")
+    sc._published_generation = 0
+    legacy = Legacy() if name == "legacy" else None
+    lane = None if legacy else SerialLane()
+    sc.dispatch_lane = lane
+    run = legacy.command if legacy else snapshot_command
+
+    def worker(index):
+        for text in burst[index::threads]:
+            run(text)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if lane is not None:
+        lane.close()
+    elapsed = time.perf_counter() - started
+    sc.dispatch_lane = None
+    sc.disk_writer.flush(timeout=5.0)
+
+    with open(command_path) as f:
+        published = json.load(f)
+    locks = legacy.locks() if legacy else [sc.position_state.swap_lock, sc.publish_lock]
+    return {
+        "elapsed": elapsed,
+        "final": sc.position_state.position.copy(),
+        "published": published,
+        "journaled": len(sc.command_history),
+        "locks": [lock.report() for lock in locks],
+        "conflicts": sc.position_state.conflicts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lock hold times under a burst of commands')
+    parser.add_argument('--threads', type=int, default=8, help='Threads replaying the burst')
+    parser.add_argument('--commands', type=int, default=2000, help='Commands in the burst')
+    args = parser.parse_args()
+
+    finals = load_burst()
+    burst = [finals[i % len(finals)] for i in range(args.commands)]
+
+    tmp = tempfile.TemporaryDirectory()
+    # parse, commit and publish print per command; keep only the report
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        sc.position_state = PositionState({a: 0.0 for a in "xyz"})
+        expected_steps = {text: sc.process_multi_command_sentence(text) for text in set(burst)}
+        results = {name: run_scheme(name, burst, args.threads, os.path.join(tmp.name, name))
+                   for name in ("legacy", "snapshot")}
+    tmp.cleanup()
+
+    records = sum(len(expected_steps[text]) for text in burst)
+    expected = {a: START_POSITION[a] + sum(sum(p["delta"][a] for p in expected_steps[text]) for text in burst)
+                for a in "xyz"}
+
+    print(f"{args.commands} commands ({len(finals)} distinct finals from replay_fixtures/) "
+          f"replayed from {args.threads} threads\n")
+    for name, r in results.items():
+        consistent = all(abs(r["final"][a] - expected[a]) < 1e-6 for a in "xyz")
+        current = all(abs(r["published"][a] - r["final"][a]) < 1e-9 for a in "xyz")
+        print(f"{name}:")
+        print(f"  throughput: {args.commands / r['elapsed']:.0f} commands/s")
+        for report in r["locks"]:
+            print(f"  {report}")
+        if name == "snapshot":
+            print(f"  {r['conflicts']} swap conflict(s) retried")
+        print(f"  journaled {r['journaled']}/{records}, final position "
+              f"{'==' if consistent else '!='} start + all deltas, "
+              f"command file {'at' if current else 'NOT at'} the final position")
+        print()
+
+
+if __name__ == "__main__":
+    main()
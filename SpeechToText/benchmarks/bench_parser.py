@@ -0,0 +1,147 @@
+"""
+Parser Microbenchmark
+=====================
+Per-utterance parse cost of command_parser.parse_ops against the original
+regex/substring implementation that used to live in speech_control.py and
+cli_control.py (kept here verbatim as the reference).
+
+Also checks that both produce the same deltas over the benchmark corpus,
+and times ParseCache once warm (every phrase already seen, as with
+repeated partials and re-sent finals).
+
+Usage:
+  python benchmarks/bench_parser.py
+  python benchmarks/bench_parser.py --repeat 20000
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from command_parser import DISTANCE_SCALE, ParseCache, parse_ops  # noqa: E402
+
+CORPUS = [
+    "move right",
+    "move right 5",
+    "move right a tiny bit",
+    "move up and forward",
+    "move left then down 3",
+    "go right 10 centimeters and then up 20 millimeters",
+    "move forward a little bit, then back a lot",
+    "move right and up and forward then left 2 after that down slightly",
+    "move backward 15 cm next move up a big amount",
+    "move to the left",
+]
+
+
+# ── reference implementation (pre command_parser) ──────────────────────────────
+def legacy_split_into_commands(text: str):
+    text = text.lower()
+    for sep in [r'\s+and\s+then\s+', r'\s+then\s+', r',\s*then\s+',
+                r'\s+after\s+that\s+', r'\s+next\s+']:
+        text = re.sub(sep, '|THEN|', text)
+    text = re.sub(r'\s+and\s+', '|AND|', text)
+    text = re.sub(r',\s*', '|THEN|', text)
+
+    parts = [p.strip() for p in text.split('|') if p.strip()]
+    commands = []
+    for i, part in enumerate(parts):
+        if part in ('THEN', 'AND'):
+            continue
+        combine = i > 0 and parts[i - 1] == 'AND'
+        commands.append((part, combine))
+    return commands
+
+
+def legacy_parse_movement_command(text: str):
+    text_lower = text.lower()
+    number_match = re.search(r'(\d+(?:\.\d+)?)', text_lower)
+    distance = float(number_match.group(1)) if number_match else 1.0
+
+    if not number_match:
+        if any(w in text_lower for w in ("tiny", "teensy", "small")):
+            distance = 0.3
+        elif any(w in text_lower for w in ("little bit", "slightly", "bit")):
+            distance = 0.5
+        elif any(w in text_lower for w in ("large", "big", "lot")):
+            distance = 2.0
+
+    if "centimeter" in text_lower or "cm" in text_lower:
+        distance /= 10.0
+    elif "millimeter" in text_lower or "mm" in text_lower:
+        distance /= 100.0
+
+    delta = {"x": 0.0, "y": 0.0, "z": 0.0}
+    scaled = round(distance * DISTANCE_SCALE, 4)
+    found = False
+
+    if "right"    in text_lower:                           delta["x"] =  scaled; found = True
+    if "left"     in text_lower:                           delta["x"] = -scaled; found = True
+    if "up"       in text_lower or "upward"   in text_lower: delta["y"] =  scaled; found = True
+    if "down"     in text_lower or "downward" in text_lower: delta["y"] = -scaled; found = True
+    if "forward"  in text_lower or "ahead"    in text_lower: delta["z"] =  scaled; found = True
+    if "backward" in text_lower or "back"     in text_lower: delta["z"] = -scaled; found = True
+
+    return delta if found else None
+
+
+def legacy_parse(text: str):
+    return [(cmd, combine, legacy_parse_movement_command(cmd))
+            for cmd, combine in legacy_split_into_commands(text)]
+
+
+def new_parse(text: str):
+    return [(op.text, op.combine, op.delta) for op in parse_ops(text)]
+
+
+_CACHE = ParseCache()
+
+
+def cached_parse(text: str):
+    return [(op.text, op.combine, op.delta) for op in _CACHE.parse(text)]
+
+
+# ── benchmark ──────────────────────────────────────────────────────────────────
+def check_equivalence():
+    mismatches = 0
+    for text in CORPUS:
+        old = [(c, d) for _, c, d in legacy_parse(text)]
+        new = [(c, d) for _, c, d in new_parse(text)]
+        if old != new:
+            mismatches += 1
+            print(f"[WARN] Mismatch for '{text}':\n  legacy: {old}\n  new:    {new}")
+    return mismatches
+
+
+def bench(fn, repeat):
+    best = min(timeit.repeat(lambda: [fn(t) for t in CORPUS], number=repeat, repeat=5))
+    return best / (repeat * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Command parser microbenchmark")
+    parser.add_argument("--repeat", type=int, default=5000,
+                        help="Passes over the corpus per timing run")
+    args = parser.parse_args()
+
+    mismatches = check_equivalence()
+    print(f"Equivalence: {len(CORPUS) - mismatches}/{len(CORPUS)} utterances identical\n")
+
+    legacy_us = bench(legacy_parse, args.repeat)
+    new_us = bench(new_parse, args.repeat)
+    cached_us = bench(cached_parse, args.repeat)
+
+    print(f"{'implementation':<20}{'us/utterance':>14}")
+    print(f"{'legacy':<20}{legacy_us:>14.2f}")
+    print(f"{'command_parser':<20}{new_us:>14.2f}")
+    print(f"{'ParseCache (warm)':<20}{cached_us:>14.2f}")
+    print(f"\nSpeedup: {legacy_us / new_us:.2f}x parser, {new_us / cached_us:.2f}x more with the cache warm")
+    print(f"Cache: {_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
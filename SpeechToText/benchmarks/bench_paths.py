@@ -0,0 +1,84 @@
+"""
+Path Generator Benchmark
+========================
+Cost of sampling spoken arcs/circles with path_generator.arc_points (NumPy,
+all points at once) against a per-point Python loop (math.cos/sin with a
+dict per point), for chord tolerances from coarse to very fine.
+
+Reported per tolerance:
+  - points generated
+  - generation time for each implementation, and the speedup
+  - worst chord error (distance from each segment midpoint to the circle),
+    which must stay within the tolerance
+  - shape_records() time (arc points -> position/delta records)
+
+Usage:
+  python benchmarks/bench_paths.py
+  python benchmarks/bench_paths.py --radius 5 --repeat 50
+"""
+
+import argparse
+import math
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from path_generator import ShapeSpec, arc_points, shape_records  # noqa: E402
+
+START = {"x": 0.0, "y": 0.567, "z": -0.24}
+START_POINT = np.array([START["x"], START["y"], START["z"]])
+TOLERANCES = (2e-3, 2e-4, 2e-5, 2e-6, 2e-7)
+
+
+def loop_circle(centre, radius, tolerance):
+    """Reference: one math.cos/sin pair and one dict per point."""
+    step = 2.0 * math.acos(1.0 - tolerance / radius)
+    segments = math.ceil(2 * math.pi / step)
+    points = []
+    for i in range(1, segments + 1):
+        t = 2 * math.pi * i / segments
+        points.append({
+            "x": centre[0] + radius * math.cos(t),
+            "y": centre[1] + radius * math.sin(t),
+            "z": centre[2],
+        })
+    return points
+
+
+def chord_error(points, centre, radius):
+    mids = (points[1:] + points[:-1]) / 2.0
+    return float(np.max(radius - np.linalg.norm(mids - centre, axis=1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark arc sampling')
+    parser.add_argument('--radius', type=float, default=0.5, help='Circle radius in metres')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (best is kept)')
+    args = parser.parse_args()
+
+    r = args.radius
+    centre = np.array([START["x"] - r, START["y"], START["z"]])
+    u, v = np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 0.0])
+    spec = ShapeSpec("circle", r, None, 360.0, None, False, False, "draw a circle")
+
+    print(f"full circle, radius {r} m, best of {args.repeat}\n")
+    print(f"{'tolerance m':>12}{'points':>10}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}"
+          f"{'max err m':>12}{'records ms':>12}")
+    for tol in TOLERANCES:
+        points = arc_points(centre, u, v, r, 2 * math.pi, tol)
+        loop = min(timeit.repeat(lambda: loop_circle(centre, r, tol), number=1, repeat=args.repeat))
+        vec = min(timeit.repeat(lambda: arc_points(centre, u, v, r, 2 * math.pi, tol),
+                                number=1, repeat=args.repeat))
+        records = min(timeit.repeat(lambda: shape_records(spec, START, tol), number=1,
+                                    repeat=max(1, args.repeat // 4)))
+        err = chord_error(np.vstack([START_POINT, points]), centre, r)
+        print(f"{tol:>12.0e}{len(points):>10}{loop * 1e3:>10.3f}{vec * 1e3:>10.3f}"
+              f"{loop / vec:>8.1f}x{err:>12.2e}{records * 1e3:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
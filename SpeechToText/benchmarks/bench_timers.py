@@ -0,0 +1,120 @@
+"""
+Timer Benchmark
+===============
+Compares a threading.Timer per deferred call (the old debounce code) with
+the shared TimerScheduler, on the pattern _on_recognizing produces: every
+partial cancels the pending timer and schedules a new one, and only the
+last timer of a burst fires.
+
+Reported per implementation:
+  - schedule cost   (cancel old + schedule new, per partial)
+  - threads started during the run, and peak threading.active_count()
+    (the scheduler's own thread is started before the run)
+  - fire jitter     (actual fire time - due time)
+
+Usage:
+  python benchmarks/bench_timers.py
+  python benchmarks/bench_timers.py --bursts 50 --partials 8 --delay 0.05
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scheduler import TimerScheduler  # noqa: E402
+from timing import percentile  # noqa: E402
+
+
+class ThreadTimers:
+    name = "threading.Timer"
+
+    def call_later(self, delay, callback, *args):
+        timer = threading.Timer(delay, callback, args=args)
+        timer.start()
+        return timer
+
+    def close(self):
+        pass
+
+
+class SchedulerTimers:
+    name = "TimerScheduler"
+
+    def __init__(self):
+        self.scheduler = TimerScheduler()
+
+    def call_later(self, delay, callback, *args):
+        return self.scheduler.call_later(delay, callback, *args)
+
+    def close(self):
+        self.scheduler.close()
+
+
+def run(timers, bursts, partials, delay, gap):
+    jitter = []
+    schedule_cost = []
+    fired = threading.Semaphore(0)
+    peak_threads = threading.active_count()
+    started = [0]
+
+    original_start = threading.Thread.start
+
+    def counting_start(self):
+        started[0] += 1
+        original_start(self)
+
+    def on_fire(due):
+        jitter.append(time.monotonic() - due)
+        fired.release()
+
+    threading.Thread.start = counting_start
+    try:
+        for _ in range(bursts):
+            pending = None
+            for _ in range(partials):
+                t0 = time.perf_counter()
+                if pending is not None:
+                    pending.cancel()
+                pending = timers.call_later(delay, on_fire, time.monotonic() + delay)
+                schedule_cost.append(time.perf_counter() - t0)
+                peak_threads = max(peak_threads, threading.active_count())
+                time.sleep(gap)
+            fired.acquire(timeout=delay + 1.0)
+    finally:
+        threading.Thread.start = original_start
+
+    return {
+        "schedule_us": [c * 1e6 for c in schedule_cost],
+        "jitter_ms": [j * 1000 for j in jitter],
+        "threads_started": started[0],
+        "peak_threads": peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark debounce timer implementations')
+    parser.add_argument('--bursts', type=int, default=30, help='Utterances (bursts of partials)')
+    parser.add_argument('--partials', type=int, default=8, help='Partials per burst')
+    parser.add_argument('--delay', type=float, default=0.05, help='Debounce delay in seconds')
+    parser.add_argument('--gap', type=float, default=0.01, help='Seconds between partials')
+    args = parser.parse_args()
+
+    print(f"{args.bursts} bursts x {args.partials} partials, delay {args.delay * 1000:.0f} ms\n")
+    print(f"{'implementation':<18}{'sched p50 us':>13}{'p99 us':>9}"
+          f"{'jitter p50 ms':>15}{'p95 ms':>9}{'p99 ms':>9}{'threads':>9}{'peak':>6}")
+    for timers in (ThreadTimers(), SchedulerTimers()):
+        r = run(timers, args.bursts, args.partials, args.delay, args.gap)
+        timers.close()
+        print(f"{timers.name:<18}"
+              f"{statistics.median(r['schedule_us']):>13.1f}{percentile(r['schedule_us'], 99):>9.1f}"
+              f"{statistics.median(r['jitter_ms']):>15.2f}{percentile(r['jitter_ms'], 95):>9.2f}"
+              f"{percentile(r['jitter_ms'], 99):>9.2f}{r['threads_started']:>9}{r['peak_threads']:>6}")
+
+
+if __name__ == "__main__":
+    main()
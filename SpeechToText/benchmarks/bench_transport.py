@@ -0,0 +1,101 @@
+"""
+Transport Latency Benchmark
+===========================
+Publishes a sequence of targets through each transport to an in-process
+stand-in receiver and reports delivery latency (publish -> receiver has
+the target) and, for the socket transports, the ack round trip.
+
+The file receiver polls by mtime at --poll-interval, like Unity's
+TCPHotController, so its numbers include the poll wait (writes are spread
+at random across the poll cycle).
+
+Usage:
+  python benchmarks/bench_transport.py
+  python benchmarks/bench_transport.py --count 200 --poll-interval 0.1
+"""
+
+import argparse
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from standin_receiver import make_receiver  # noqa: E402
+from timing import percentile  # noqa: E402
+from transport import make_transport  # noqa: E402
+
+
+def run(kind, count, poll_interval, workdir):
+    file_path = os.path.join(workdir, "tcp_commands.json")
+    address = os.path.join(workdir, "bench.sock") if kind == "unix" else "127.0.0.1:0"
+    if kind == "tcp":
+        # pick a free port up front so receiver and transport agree
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        address = f"127.0.0.1:{probe.getsockname()[1]}"
+        probe.close()
+
+    receiver = make_receiver(kind, file_path, address, poll_interval).start()
+    transport = make_transport(kind, file_path, address)
+    delivery, rtts, lost = [], [], 0
+
+    try:
+        for i in range(count):
+            if kind == "file":
+                # land writes at random points in the poll cycle
+                time.sleep(random.uniform(0, poll_interval))
+            target = {"x": round(i * 0.001, 4), "y": 0.567, "z": -0.24}
+            seen = len(receiver.received)
+            sent = time.perf_counter()
+            seq = transport.publish(target)
+
+            rtt = transport.wait_ack(seq, timeout=2.0)
+            if rtt is not None:
+                rtts.append(rtt)
+
+            deadline = sent + max(2.0, poll_interval * 5)
+            while len(receiver.received) == seen and time.perf_counter() < deadline:
+                time.sleep(0.0005)
+            if len(receiver.received) == seen:
+                lost += 1
+                continue
+            delivery.append(receiver.received[seen][0] - sent)
+    finally:
+        transport.close()
+        receiver.stop()
+
+    return delivery, rtts, lost
+
+
+def fmt_ms(values, pct):
+    return f"{percentile(values, pct) * 1000:9.3f}" if values else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Target transport latency benchmark")
+    parser.add_argument("--count", type=int, default=50, help="Targets per transport")
+    parser.add_argument("--poll-interval", type=float, default=0.1,
+                        help="File receiver poll interval (Unity default 0.1s)")
+    args = parser.parse_args()
+
+    kinds = ["file", "tcp"]
+    if hasattr(socket, "AF_UNIX"):
+        kinds.append("unix")
+
+    print(f"{'transport':<10}{'deliv p50':>10}{'deliv p95':>10}{'ack p50':>10}{'ack p95':>10}{'lost':>6}  (ms)")
+    with tempfile.TemporaryDirectory() as workdir:
+        for kind in kinds:
+            delivery, rtts, lost = run(kind, args.count, args.poll_interval, workdir)
+            print(f"{kind:<10}{fmt_ms(delivery, 50):>10}{fmt_ms(delivery, 95):>10}"
+                  f"{fmt_ms(rtts, 50):>10}{fmt_ms(rtts, 95):>10}{lost:>6}")
+            if delivery:
+                print(f"{'':<10}mean delivery {statistics.mean(delivery) * 1000:.3f} ms over {len(delivery)} targets")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,18 @@
 CLI Robot Control
 =================
 Type movement commands to control the robot via TCP.
-Uses the same command parser as speech_control.py — no LLM, no gripper.
+Uses the same command parser as speech_control.py (command_parser.py) — no LLM,
+no gripper.
 
 Usage:
   python cli_control.py
+  python cli_control.py --transport tcp --address 127.0.0.1:6601
+  python cli_control.py --waypoints --lookahead 1
+  python cli_control.py --wait          # block until Unity acks each move
+  python cli_control.py --waypoints --simplify 0.005   # thin dense shapes before dispatch
+  python cli_control.py --script moves.txt             # batch mode with a throughput report
+  cat moves.txt | python cli_control.py --script - --wait --quiet
+  python cli_control.py --arbiter      # share the robot with speech_control.py via arbiter.py
 
 Commands:
   move right              -> moves 1.0 unit right
@@ -13,28 +21,56 @@ Commands:
   move right a tiny bit   -> moves 0.3 units right
   move right and up       -> diagonal movement
   move right then up      -> sequential movements
+  draw a circle radius 5  -> shape traced as waypoints (use --waypoints)
   stop / halt / quit      -> exit
 """
 
+import argparse
+import contextlib
 import json
 import os
-import re
+import sys
 import threading
+import time
 from datetime import datetime
 
 import pathlib
 
+from ack_watcher import AckWatcher
+from arbiter import ArbiterClient, add_arbiter_args
+from command_journal import CommandHistory, DiskWriter
+from coalescer import MoveCoalescer, add_coalesce_args
+from command_parser import ParseCache
+from path_generator import DEFAULT_CHORD_TOLERANCE, parse_shape, shape_records, split_shape_sentence
+from path_simplify import PathSimplifier, add_simplify_args
+from timing import percentile
+from transport import FileTransport, add_transport_args, make_transport
+from waypoint_dispatcher import WaypointDispatcher, add_waypoint_args
+from workspace import WorkspaceValidator, add_workspace_args
+
 # ── shared config ──────────────────────────────────────────────────────────────
 COMMAND_QUEUE_FILE = "../UnityProject/tcp_commands.json"
-DISTANCE_SCALE = 0.1
+JOURNAL_FILE = COMMAND_QUEUE_FILE.replace('.json', '_journal.jsonl')
+ACK_FILE = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
+WAIT_TIMEOUT_SECS = 10.0
+STOP_WORDS = {"stop", "halt", "quit", "exit", "q"}
 
 pathlib.Path(COMMAND_QUEUE_FILE).parent.mkdir(parents=True, exist_ok=True)
 
 # ── global state ───────────────────────────────────────────────────────────────
-command_queue = []
 queue_lock = threading.Lock()
 current_position = {"x": 0.0, "y": 0.567, "z": -0.24}
 position_lock = threading.Lock()
+disk_writer = DiskWriter()
+command_history = CommandHistory(JOURNAL_FILE, disk_writer)
+transport = FileTransport(COMMAND_QUEUE_FILE, disk_writer)
+dispatcher = None  # WaypointDispatcher with --waypoints
+ack_watcher = None  # confirmed (acked) position
+coalescer = None  # MoveCoalescer with --coalesce
+simplifier = None  # PathSimplifier with --simplify
+parse_cache = ParseCache()  # parsed ops per distinct phrase
+validator = None  # WorkspaceValidator unless --no-workspace-check
+arbiter = None  # ArbiterClient with --arbiter
 
 
 # ── position persistence ───────────────────────────────────────────────────────
@@ -52,9 +88,8 @@ def load_current_position():
     except Exception:
         pass
     try:
-        ack_file = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
-        if os.path.exists(ack_file):
-            with open(ack_file, 'r') as f:
+        if os.path.exists(ACK_FILE):
+            with open(ACK_FILE, 'r') as f:
                 ack = json.loads(f.read().strip())
                 pos = ack.get('position', {})
                 if 'x' in pos and 'y' in pos and 'z' in pos:
@@ -67,72 +102,47 @@ def load_current_position():
     print(f"[INFO] Using default position: {current_position}")
 
 
+def publish_target(target):
+    output = {a: round(target[a], 4) for a in ("x", "y", "z")}
+    transport.publish(output)
+    if ack_watcher is not None:
+        ack_watcher.note_commanded(output)
+    print(f"         Published via {transport.kind}: {output}")
+
+
 def save_position():
     with position_lock:
-        output = {
-            "x": round(current_position["x"], 4),
-            "y": round(current_position["y"], 4),
-            "z": round(current_position["z"], 4),
-        }
-    with open(COMMAND_QUEUE_FILE, 'w') as f:
-        json.dump(output, f, indent=2)
-    print(f"         Written to JSON: {output}")
-
-
-# ── command parsing (mirrors speech_control.py) ────────────────────────────────
-def split_into_commands(text: str):
-    text = text.lower()
-    for sep in [r'\s+and\s+then\s+', r'\s+then\s+', r',\s*then\s+',
-                r'\s+after\s+that\s+', r'\s+next\s+']:
-        text = re.sub(sep, '|THEN|', text)
-    text = re.sub(r'\s+and\s+', '|AND|', text)
-    text = re.sub(r',\s*', '|THEN|', text)
-
-    parts = [p.strip() for p in text.split('|') if p.strip()]
-    commands = []
-    for i, part in enumerate(parts):
-        if part in ('THEN', 'AND'):
-            continue
-        combine = i > 0 and parts[i - 1] == 'AND'
-        commands.append((part, combine))
-    return commands
-
-
-def parse_movement_command(text: str):
-    text_lower = text.lower()
-    number_match = re.search(r'(\d+(?:\.\d+)?)', text_lower)
-    distance = float(number_match.group(1)) if number_match else 1.0
-
-    if not number_match:
-        if any(w in text_lower for w in ("tiny", "teensy", "small")):
-            distance = 0.3
-        elif any(w in text_lower for w in ("little bit", "slightly", "bit")):
-            distance = 0.5
-        elif any(w in text_lower for w in ("large", "big", "lot")):
-            distance = 2.0
-
-    # DISTANCE_SCALE=0.1 means raw units → metres (1 unit = 0.1m = 10cm)
-    # cm: divide by 10 so 20cm → 2 units → 0.2m
-    # mm: divide by 100 so 20mm → 0.2 units → 0.02m
-    if "centimeter" in text_lower or "cm" in text_lower:
-        distance /= 10.0
-    elif "millimeter" in text_lower or "mm" in text_lower:
-        distance /= 100.0
-
-    delta = {"x": 0.0, "y": 0.0, "z": 0.0}
-    scaled = round(distance * DISTANCE_SCALE, 4)
-    found = False
-
-    if "right"    in text_lower:                           delta["x"] =  scaled; found = True
-    if "left"     in text_lower:                           delta["x"] = -scaled; found = True
-    if "up"       in text_lower or "upward"   in text_lower: delta["y"] =  scaled; found = True
-    if "down"     in text_lower or "downward" in text_lower: delta["y"] = -scaled; found = True
-    if "forward"  in text_lower or "ahead"    in text_lower: delta["z"] =  scaled; found = True
-    if "backward" in text_lower or "back"     in text_lower: delta["z"] = -scaled; found = True
-
-    return delta if found else None
+        target = current_position.copy()
+    publish_target(target)
+
+
+def publish_coalesced(targets):
+    if dispatcher is not None:
+        dispatcher.submit(targets)
+    else:
+        publish_target(targets[-1])
+
+
+def publish_waypoint(message):
+    transport.publish(message)
+    if ack_watcher is not None:
+        ack_watcher.note_commanded(message)
+    ahead = f" (+{len(message['waypoints'])} ahead)" if message.get("waypoints") else ""
+    print(f"         Waypoint via {transport.kind}: "
+          f"({message['x']:.4f}, {message['y']:.4f}, {message['z']:.4f}){ahead}")
+
+
+def load_start_position():
+    global current_position
+    if arbiter is None:
+        load_current_position()
+        return
+    with position_lock:
+        current_position = arbiter.position()
+    print(f"[OK] Position from arbiter: {current_position}")
 
 
+# ── command processing ─────────────────────────────────────────────────────────
 def apply_delta(position, delta):
     return {
         "x": position["x"] + delta["x"],
@@ -141,23 +151,56 @@ def apply_delta(position, delta):
     }
 
 
-def process_command(text: str):
-    commands = split_into_commands(text)
+def process_shape(shape, start=None):
+    if start is None:
+        with position_lock:
+            start = current_position.copy()
+    positions = shape_records(shape, start, DEFAULT_CHORD_TOLERANCE)
+    print(f"  Shape: {shape.kind} ({shape.size:.3f} m) -> {len(positions)} waypoint(s)"
+          f" => {positions[-1]['position']}")
+    if dispatcher is None:
+        print("  [WARN] Without --waypoints only the shape's end point is published")
+    return positions if reachable(positions) else []
+
+
+def process_mixed(pieces):
+    """Shapes and moves in one line: each piece starts where the previous one ended."""
+    with position_lock:
+        start = current_position.copy()
+    positions = []
+    for piece, shape in pieces:
+        records = process_shape(shape, start) if shape is not None else process_command(piece, start)
+        if not records:
+            # every piece has a move, so this one was rejected
+            return []
+        positions.extend(records)
+        start = records[-1]["position"]
+    return positions
+
+
+def process_command(text: str, start=None):
+    shape = parse_shape(text)
+    if shape is not None:
+        pieces = split_shape_sentence(text)
+        if len(pieces) > 1:
+            return process_mixed(pieces)
+        return process_shape(shape, start)
+
+    commands = parse_cache.parse(text)
     positions = []
 
     with position_lock:
-        temp_pos = current_position.copy()
+        temp_pos = (current_position if start is None else start).copy()
         acc_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
         acc_text = []
 
-        for i, (cmd, combine) in enumerate(commands):
-            delta = parse_movement_command(cmd)
+        for i, (cmd, combine, delta, _direction, _measured) in enumerate(commands):
             if not delta:
                 print(f"  [?] Unrecognised: '{cmd}'")
                 continue
 
             is_last = (i == len(commands) - 1)
-            next_separate = not is_last and not commands[i + 1][1]
+            next_separate = not is_last and not commands[i + 1].combine
 
             if combine:
                 acc_delta["x"] += delta["x"]
@@ -199,30 +242,209 @@ def process_command(text: str):
                     })
                     print(f"  Sequential: '{cmd}' -> {delta} => {temp_pos}")
 
-    return positions
+    return positions if reachable(positions) else []
+
+
+def reachable(positions: list) -> bool:
+    """Check every target against the workspace grid; reject the whole command if one fails."""
+    if validator is None:
+        return True
+    for p in positions:
+        verdict = validator.check(p["position"])
+        if not verdict.ok:
+            pos = p["position"]
+            print(f"  [WARN] Rejected '{p['command_text']}': "
+                  f"({pos['x']:.3f}, {pos['y']:.3f}, {pos['z']:.3f}) is {verdict.reason}")
+            return False
+    return True
 
 
 def execute_positions(positions):
-    global current_position, command_queue
+    global current_position
     if not positions:
         return
+    if arbiter is not None:
+        submit_to_arbiter(positions)
+        return
     with queue_lock:
         with position_lock:
+            start = current_position.copy()
             for p in positions:
-                command_queue.append({
+                command = {
                     "timestamp": datetime.now().isoformat(),
                     "command_type": "move",
                     "position": p["position"],
                     "delta": p["delta"],
                     "text": p["command_text"],
-                })
+                }
+                command_history.append(command)
             current_position = positions[-1]["position"].copy()
-    save_position()
+    targets = [p["position"] for p in positions]
+    if simplifier is not None:
+        targets = simplifier.simplify(start, targets)
+    if coalescer is not None:
+        coalescer.submit(targets, start)
+    elif dispatcher is not None:
+        dispatcher.submit(targets)
+    else:
+        save_position()
     print(f"  -> {len(positions)} command(s) sent. Position: {current_position}\n")
 
 
+def submit_to_arbiter(positions):
+    """Send the relative steps; the arbiter journals, validates and publishes.
+
+    Each record's position is replaced with the target the arbiter applied
+    (it may differ if another client moved first); positions is emptied if
+    the arbiter rejected the command.
+    """
+    global current_position
+    try:
+        reply = arbiter.submit(positions)
+    except OSError as e:
+        print(f"  [WARN] Arbiter unreachable: {e}\n")
+        positions.clear()
+        return
+    if not reply.get("ok"):
+        print(f"  [WARN] Arbiter rejected: {reply.get('reason')}\n")
+        positions.clear()
+        return
+    for p, target in zip(positions, reply["positions"]):
+        p["position"] = target
+    with position_lock:
+        current_position = dict(reply["positions"][-1])
+    print(f"  -> {len(positions)} command(s) sent as #{reply['order']}. Position: {current_position}\n")
+
+
+def wait_until_reached(target, timeout, acks_before) -> bool:
+    """Wait for an ack newer than acks_before (ack_count read before publishing) at target."""
+    started = time.monotonic()
+    if ack_watcher.wait_for_position(target, timeout, after_count=acks_before):
+        print(f"  [OK] Reached in {time.monotonic() - started:.2f}s "
+              f"(confirmed {ack_watcher.confirmed_position()})\n")
+        return True
+    print(f"  [WARN] Not confirmed after {timeout:.1f}s; "
+          f"last confirmed {ack_watcher.confirmed_position()}\n")
+    return False
+
+
+# ── batch mode ─────────────────────────────────────────────────────────────────
+def run_script(lines, wait=None, quiet=False):
+    """Run commands from an iterable of lines ('#' comments and blanks skipped).
+
+    Returns ([(text, secs, sent, reached)], elapsed_secs); reached is None
+    unless wait is set.
+    """
+    results = []
+    sink = open(os.devnull, "w") if quiet else None
+    started = time.perf_counter()
+    try:
+        for line in lines:
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            if text.lower() in STOP_WORDS:
+                break
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext():
+                positions = process_command(text)
+                acks_before = ack_watcher.ack_count
+                execute_positions(positions)
+                reached = None
+                if positions and wait:
+                    reached = wait_until_reached(positions[-1]["position"], wait, acks_before)
+            results.append((text, time.perf_counter() - t0, bool(positions), reached))
+    finally:
+        if sink:
+            sink.close()
+    return results, time.perf_counter() - started
+
+
+def print_batch_report(results, elapsed):
+    if not results:
+        print("Batch: no commands")
+        return
+    sent = sum(1 for r in results if r[2])
+    latency_ms = [r[1] * 1000 for r in results]
+    print(f"Batch: {len(results)} commands ({len(results) - sent} not sent) in {elapsed:.3f}s "
+          f"-> {len(results) / elapsed:.1f} commands/s")
+    print(f"Per-command latency: p50 {percentile(latency_ms, 50):.2f} ms, "
+          f"p95 {percentile(latency_ms, 95):.2f} ms, p99 {percentile(latency_ms, 99):.2f} ms, "
+          f"max {max(latency_ms):.2f} ms")
+    waited = [r for r in results if r[3] is not None]
+    if waited:
+        print(f"Acks: {sum(1 for r in waited if r[3])}/{len(waited)} positions confirmed")
+    slowest = max(results, key=lambda r: r[1])
+    print(f"Slowest: '{slowest[0]}' ({slowest[1] * 1000:.2f} ms)")
+
+
+def shutdown():
+    """Flush and close everything main() started."""
+    if coalescer:
+        coalescer.close()
+        print(f"Coalescing: {coalescer.stats()}")
+    if simplifier:
+        print(f"Simplification: {simplifier.stats()}")
+    print(f"Parse cache: {parse_cache.stats()}")
+    ack_watcher.stop()
+    if dispatcher:
+        dispatcher.close()
+    if arbiter:
+        arbiter.close()
+    transport.close()
+    disk_writer.close()
+
+
 # ── main loop ──────────────────────────────────────────────────────────────────
 def main():
+    global transport, dispatcher, ack_watcher, coalescer, simplifier, validator, arbiter
+
+    parser = argparse.ArgumentParser(description='CLI Robot Control')
+    add_transport_args(parser)
+    add_waypoint_args(parser)
+    add_coalesce_args(parser)
+    add_simplify_args(parser)
+    add_workspace_args(parser)
+    add_arbiter_args(parser)
+    parser.add_argument('--wait', type=float, nargs='?', const=WAIT_TIMEOUT_SECS, metavar='SECS',
+                        help=f'After each command, wait until Unity confirms the position '
+                             f'(default timeout {WAIT_TIMEOUT_SECS:.0f}s)')
+    parser.add_argument('--script', metavar='FILE',
+                        help="Run commands from FILE ('-' for stdin) and report throughput")
+    parser.add_argument('--quiet', action='store_true', help='With --script: only print the report')
+    args = parser.parse_args()
+    transport = make_transport(args.transport, COMMAND_QUEUE_FILE, args.address, disk_writer)
+    if args.waypoints:
+        dispatcher = WaypointDispatcher(publish_waypoint, args.lookahead, args.ack_timeout)
+    if args.coalesce is not None:
+        coalescer = MoveCoalescer(publish_coalesced, args.coalesce, args.collinear_tolerance,
+                                  keep_waypoints=args.waypoints)
+    if args.simplify is not None:
+        simplifier = PathSimplifier(args.simplify)
+    if args.arbiter:
+        # the arbiter checks the workspace and publishes; only parsing stays local
+        try:
+            arbiter = ArbiterClient(args.arbiter, "cli").connect()
+        except OSError as e:
+            parser.error(f"cannot reach the arbiter at {args.arbiter}: {e}")
+    elif not args.no_workspace_check:
+        validator = WorkspaceValidator(args.workspace_grid, args.min_manipulability)
+    ack_watcher = AckWatcher(ACK_FILE, on_ack=dispatcher.on_ack if dispatcher else None).start()
+
+    if args.script:
+        load_start_position()
+        print(f"Start position: {current_position} | Transport: {'arbiter ' + args.arbiter if arbiter else transport.kind}")
+        if args.script == "-":
+            results, elapsed = run_script(sys.stdin, args.wait, args.quiet)
+        else:
+            with open(args.script, "r") as f:
+                results, elapsed = run_script(f, args.wait, args.quiet)
+        print_batch_report(results, elapsed)
+        if dispatcher is not None and dispatcher.pending():
+            print(f"[INFO] {dispatcher.pending()} waypoint(s) still waiting for acks")
+        shutdown()
+        return
+
     print("=" * 55)
     print("CLI Robot Control  (no LLM, no gripper)")
     print("=" * 55)
@@ -230,12 +452,16 @@ def main():
     print("  move right 5")
     print("  move up and forward")
     print("  move left then down 3")
+    print("  draw a square 10 cm")
     print("  stop / quit  ->  exit\n")
 
-    load_current_position()
-    print(f"Start position: {current_position}\n")
-
-    STOP_WORDS = {"stop", "halt", "quit", "exit", "q"}
+    load_start_position()
+    print(f"Start position: {current_position}")
+    print(f"Transport: {'arbiter ' + args.arbiter if arbiter else transport.kind}")
+    print(f"Acks: {ack_watcher.backend} on {ACK_FILE}")
+    if dispatcher is not None:
+        print(f"Waypoints: ack-paced, lookahead {dispatcher.lookahead}")
+    print()
 
     while True:
         try:
@@ -252,7 +478,12 @@ def main():
             break
 
         positions = process_command(text)
+        acks_before = ack_watcher.ack_count
         execute_positions(positions)
+        if positions and args.wait:
+            wait_until_reached(positions[-1]["position"], args.wait, acks_before)
+
+    shutdown()
 
 
 if __name__ == "__main__":
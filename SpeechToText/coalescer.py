@@ -0,0 +1,144 @@
+"""
+Move Coalescer
+==============
+Optional stage between command parsing and publishing for rapid-fire input.
+
+Each new target makes TCPHotController cancel and restart MoveTo, so a
+burst of short commands makes the arm stutter. MoveCoalescer holds targets
+for a short window (measured from the first target of a burst) and then
+emits them together:
+
+  - window merge    -- publishing straight to tcp_commands.json, only the
+                       last target of the burst is sent (its deltas are
+                       already summed into it)
+  - collinear merge -- with --waypoints every step is kept, but consecutive
+                       legs in the same direction become one longer leg:
+                       A -> B -> C with B on segment AC is sent as A -> C
+
+Counters (commands_in, targets_out, saved_by_window, saved_by_collinear)
+report how many moves were saved.
+
+Usage:
+  coalescer = MoveCoalescer(emit, window=0.15, tolerance=1e-3)
+  coalescer.submit([target, ...], start)   # emit(targets) runs on the timer thread
+
+  # speech_control: the window closes on its event loop instead
+  coalescer = MoveCoalescer(emit, window=0.15, scheduler=LoopScheduler(loop))
+"""
+
+import threading
+
+from scheduler import TimerScheduler
+
+DEFAULT_WINDOW_SECS = 0.15
+# Metres a middle waypoint may sit off the straight line and still be merged
+DEFAULT_COLLINEAR_TOLERANCE = 1e-3
+
+_AXES = ("x", "y", "z")
+
+
+def _point_on_segment(start, mid, end, tolerance) -> bool:
+    """True if mid lies on the segment start -> end within tolerance."""
+    seg = [end[a] - start[a] for a in _AXES]
+    rel = [mid[a] - start[a] for a in _AXES]
+    length_sq = sum(c * c for c in seg)
+    if length_sq == 0.0:
+        return False
+    t = sum(r * s for r, s in zip(rel, seg)) / length_sq
+    if t <= 0.0 or t >= 1.0:
+        return False  # a reversal or overshoot is a real waypoint
+    off_sq = sum((r - t * s) ** 2 for r, s in zip(rel, seg))
+    return off_sq <= tolerance * tolerance
+
+
+def collapse_collinear(start, targets, tolerance=DEFAULT_COLLINEAR_TOLERANCE):
+    """Drop waypoints that lie on the straight leg between their neighbours.
+
+    start is where the arm is heading before targets (None if unknown).
+    """
+    kept = []
+    prev = start
+    for i, target in enumerate(targets):
+        nxt = targets[i + 1] if i + 1 < len(targets) else None
+        if prev is not None and nxt is not None and _point_on_segment(prev, target, nxt, tolerance):
+            continue
+        kept.append(target)
+        prev = target
+    return kept
+
+
+class MoveCoalescer:
+    def __init__(self, emit, window: float = DEFAULT_WINDOW_SECS,
+                 tolerance: float = DEFAULT_COLLINEAR_TOLERANCE, keep_waypoints: bool = False,
+                 scheduler=None):
+        """emit(targets) publishes a list of targets; keep_waypoints=False
+        means only the last one matters (direct file/socket publishing).
+        scheduler closes the window (default: a TimerScheduler thread of
+        its own; a LoopScheduler keeps submit and emit on one event loop)."""
+        self.emit = emit
+        self.window = window
+        self.tolerance = tolerance
+        self.keep_waypoints = keep_waypoints
+        self._lock = threading.Lock()
+        self._pending = []
+        self._start = None          # where the arm is headed before the pending burst
+        self._timer = None
+        self._last_emitted = None
+        self._owns_scheduler = scheduler is None
+        self._scheduler = scheduler or TimerScheduler(name="move-coalescer")
+
+        self.commands_in = 0
+        self.targets_out = 0
+        self.saved_by_window = 0
+        self.saved_by_collinear = 0
+
+    def submit(self, targets, start=None) -> None:
+        """Queue targets; start is the committed position they begin from
+        (the first of a burst anchors the collinear merge)."""
+        with self._lock:
+            if not self._pending:
+                self._start = dict(start) if start is not None else self._last_emitted
+            self._pending.extend({a: t[a] for a in _AXES} for t in targets)
+            self.commands_in += len(targets)
+            if self._timer is None:
+                self._timer = self._scheduler.call_later(self.window, self.flush)
+
+    def flush(self) -> None:
+        """Emit whatever is pending now (also called when the window closes)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            if self.keep_waypoints:
+                targets = collapse_collinear(self._start, batch, self.tolerance)
+                self.saved_by_collinear += len(batch) - len(targets)
+            else:
+                targets = batch[-1:]
+                self.saved_by_window += len(batch) - 1
+            self.targets_out += len(targets)
+            self._last_emitted = targets[-1]
+            # Emit under the lock so bursts reach the publisher in order
+            self.emit(targets)
+
+    def stats(self) -> str:
+        saved = self.saved_by_window + self.saved_by_collinear
+        return (f"{self.commands_in} commands -> {self.targets_out} targets "
+                f"({saved} saved: {self.saved_by_window} window, {self.saved_by_collinear} collinear)")
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_scheduler:
+            self._scheduler.close()
+
+
+def add_coalesce_args(parser) -> None:
+    """Add --coalesce / --collinear-tolerance to an argparse parser."""
+    parser.add_argument('--coalesce', type=float, nargs='?', const=DEFAULT_WINDOW_SECS, metavar='SECS',
+                        help=f'Merge targets arriving within SECS into one publish '
+                             f'(default window {DEFAULT_WINDOW_SECS}s)')
+    parser.add_argument('--collinear-tolerance', type=float, default=DEFAULT_COLLINEAR_TOLERANCE,
+                        metavar='METRES',
+                        help='With --coalesce and --waypoints: merge legs this close to a straight line')
@@ -0,0 +1,277 @@
+"""
+Command Journal
+===============
+Background disk writer and bounded command history for the command pipeline.
+
+- Every accepted command is appended once, as one JSON line, to the command
+  journal instead of re-serializing the whole history on every move.  The
+  journal rotates into numbered segments (tcp_commands_journal.00001.jsonl,
+  ...) every SEGMENT_SIZE commands.
+- CommandHistory keeps only the most recent commands in a fixed-capacity
+  ring; older ones live only in the journal segments and are read back
+  lazily by iter_all().
+- Target files are published with write-to-temp + os.replace(), so Unity
+  never reads a half-written tcp_commands.json.
+- All of it runs on a single daemon thread (the DiskWriter).  Callers only
+  enqueue, so no file I/O happens inside position_state.commit's
+  compare-and-swap, under cli_control's position locks, or on recognizer
+  callbacks.
+
+Usage:
+  writer = DiskWriter()
+  writer.append_jsonl("tcp_commands_journal.jsonl", command)
+  writer.write_json("tcp_commands.json", {"x": 0.1, "y": 0.567, "z": -0.24})
+  writer.flush()   # block until everything queued so far is on disk
+  writer.close()
+
+  history = CommandHistory("tcp_commands_journal.jsonl", writer, capacity=256)
+  history.append(command)
+  history.latest_move()      # O(1)
+  for cmd in history.iter_all(): ...
+"""
+
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+REPLACE_RETRIES = 5
+REPLACE_RETRY_SECS = 0.005
+
+HISTORY_CAPACITY = 256
+SEGMENT_SIZE = 10000
+
+
+def _create_temp(directory: str):
+    """Create a new temp file in directory; returns (fd, path).
+
+    Unlike mkstemp (always 0600) the file gets the usual umask-default mode,
+    so a Unity process running as another user can read what is published.
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp_path = os.path.join(directory, f".tmp_{os.urandom(6).hex()}.json")
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def atomic_write_json(path: str, obj, indent=2):
+    """Write JSON to a temp file in the same directory and rename it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = _create_temp(directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(obj, f, indent=indent)
+        # On Windows the rename fails while a reader has the file open; retry briefly
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_SECS)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def iter_journal(path: str):
+    """Yield the records of a JSONL journal, skipping a torn last line."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class DiskWriter:
+    """Single background thread that owns all command-file writes.
+
+    Queued work is drained in batches: journal lines are written in order
+    and flushed once per batch, and for target files only the newest
+    pending content per path is written.  A record that cannot be written
+    (I/O error or not JSON-serialisable) is reported and skipped; it never
+    stops the thread or leaves a flush() waiting.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._handles = {}
+        self._thread = threading.Thread(target=self._run, name="disk-writer", daemon=True)
+        self._thread.start()
+
+    def append_jsonl(self, path: str, record: dict):
+        self._queue.put(("jsonl", path, record))
+
+    def write_json(self, path: str, obj):
+        self._queue.put(("json", path, obj))
+
+    def close_file(self, path: str):
+        """Close the append handle for path once queued lines are written."""
+        self._queue.put(("close", path, None))
+
+    def flush(self, timeout=None) -> bool:
+        """Block until everything queued before this call has been written."""
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            waiters = [item[2] for item in batch if item is not None and item[0] == "flush"]
+            try:
+                running = self._write_batch(batch)
+            finally:
+                for done in waiters:
+                    done.set()
+
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+    def _write_batch(self, batch) -> bool:
+        """Write one drained batch; returns False once close() was queued."""
+        running = True
+        targets = {}
+        for item in batch:
+            if item is None:
+                running = False
+                continue
+            kind, path, payload = item
+            if kind == "jsonl":
+                self._append(path, payload)
+            elif kind == "json":
+                targets[path] = payload
+            elif kind == "close":
+                handle = self._handles.pop(path, None)
+                if handle is not None:
+                    try:
+                        handle.close()
+                    except OSError as e:
+                        print(f"[WARN] Could not close {path}: {e}")
+
+        for path, handle in self._handles.items():
+            try:
+                handle.flush()
+            except OSError as e:
+                print(f"[WARN] Could not flush {path}: {e}")
+        for path, obj in targets.items():
+            try:
+                atomic_write_json(path, obj)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[WARN] Could not write {path}: {e}")
+        return running
+
+    def _append(self, path, record):
+        try:
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+        except (TypeError, ValueError) as e:
+            print(f"[WARN] Could not serialise record for {path}: {e}")
+            return
+        try:
+            handle = self._handles.get(path)
+            if handle is None:
+                handle = open(path, 'a', encoding='utf-8')
+                self._handles[path] = handle
+            handle.write(line)
+        except OSError as e:
+            print(f"[WARN] Could not append to {path}: {e}")
+
+
+class CommandHistory:
+    """Fixed-capacity ring of recent commands backed by journal segments.
+
+    Every command is handed to the DiskWriter once, as it is appended, so
+    the segments hold the complete history and the ring only bounds what
+    stays in memory.  latest_move() is O(1); iter_all() streams the full
+    history from disk without loading it.
+    """
+
+    def __init__(self, journal_path: str, writer: DiskWriter,
+                 capacity: int = HISTORY_CAPACITY, segment_size: int = SEGMENT_SIZE):
+        self.writer = writer
+        self.segment_size = segment_size
+        self._base, self._ext = os.path.splitext(journal_path)
+        self._recent = deque(maxlen=capacity)
+        self._latest_move = None
+        self._count = 0
+
+        # Continue numbering after segments left by earlier sessions
+        existing = self.segment_paths()
+        self._segment_index = self._index_of(existing[-1]) + 1 if existing else 1
+        self._segment_fill = 0
+
+    def _segment_path(self, index: int) -> str:
+        return f"{self._base}.{index:05d}{self._ext}"
+
+    def _index_of(self, path: str) -> int:
+        return int(path[len(self._base) + 1:-len(self._ext)])
+
+    def segment_paths(self):
+        """Journal segment files, oldest first."""
+        pattern = re.compile(re.escape(self._base) + r"\.(\d{5})" + re.escape(self._ext) + "$")
+        paths = [p for p in glob.glob(f"{glob.escape(self._base)}.*{self._ext}") if pattern.match(p)]
+        return sorted(paths)
+
+    def append(self, command: dict):
+        self._recent.append(command)
+        self._count += 1
+        if command.get("command_type") == "move":
+            self._latest_move = command
+
+        path = self._segment_path(self._segment_index)
+        self.writer.append_jsonl(path, command)
+        self._segment_fill += 1
+        if self._segment_fill >= self.segment_size:
+            self.writer.close_file(path)
+            self._segment_index += 1
+            self._segment_fill = 0
+
+    def extend(self, commands):
+        for command in commands:
+            self.append(command)
+
+    def latest_move(self):
+        return self._latest_move
+
+    def recent(self):
+        """The commands still held in memory, oldest first."""
+        return list(self._recent)
+
+    def __len__(self):
+        """Commands appended in this session."""
+        return self._count
+
+    def iter_all(self):
+        """Lazily yield every journaled command, oldest first."""
+        self.writer.flush()
+        for path in self.segment_paths():
+            yield from iter_journal(path)
@@ -0,0 +1,479 @@
+"""
+Command Parser
+==============
+Shared movement-command parser for speech_control.py and cli_control.py.
+
+The text is tokenized once with a single precompiled pattern; every token is
+classified through a fixed lexicon (directions, units, qualifiers, and/then
+connectors) and the token stream is folded into typed MoveOp records in one
+pass.  No per-command re.sub passes or substring scans.
+
+  parse_ops("move right 5 and up then back a tiny bit")
+    -> [MoveOp(text='move right 5', combine=False, delta={'x': 0.5, ...}, ...),
+        MoveOp(text='up',           combine=True,  delta={'y': 0.1, ...}, ...),
+        MoveOp(text='back a tiny bit', combine=False, delta={'z': -0.03, ...}, ...)]
+
+split_into_commands / parse_movement_command / has_measurement /
+get_direction_from_text keep their old signatures for existing callers.
+
+ParseCache memoizes parse_ops on normalized text (case, whitespace and
+trailing punctuation folded), so repeated partials, a final that repeats
+its last partial, and phrases the operator says over and over are parsed
+once.  Ops hold relative deltas only, so cached entries never go stale.
+
+StreamingParser follows one utterance's growing partial transcripts: each
+partial only tokenizes what changed since the previous one, and command
+groups closed by a sequential connector ("... then", "... , ") are released
+once they have stayed unchanged for a few partials, so they can run while
+the rest of the sentence is still being spoken.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# DISTANCE_SCALE=0.1 means raw units → metres (1 unit = 0.1m = 10cm)
+DISTANCE_SCALE = 0.1
+DEFAULT_DISTANCE = 1.0
+
+# ── token kinds ────────────────────────────────────────────────────────────────
+WORD = 0
+NUM = 1
+DIR = 2
+UNIT = 3
+QUAL = 4
+AND = 5
+THEN = 6
+
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|[a-z]+|,")
+
+# direction -> (axis, sign); order matters: later directions on the same
+# axis win, exactly like the old chain of if-statements
+DIRECTIONS = {
+    "right":    ("x",  1.0),
+    "left":     ("x", -1.0),
+    "up":       ("y",  1.0),
+    "down":     ("y", -1.0),
+    "forward":  ("z",  1.0),
+    "backward": ("z", -1.0),
+}
+_DIRECTION_ORDER = tuple(DIRECTIONS)
+
+# unit -> divisor from spoken value to raw units
+# cm: divide by 10 so 20cm → 2 units → 0.2m
+# mm: divide by 100 so 20mm → 0.2 units → 0.02m
+_UNIT_DIVISORS = {"cm": 10.0, "mm": 100.0}
+
+# qualifier -> (priority, distance); lower priority wins when several appear
+_QUALIFIERS = {
+    "tiny": (0, 0.3), "teensy": (0, 0.3), "small": (0, 0.3),
+    "slightly": (1, 0.5), "bit": (1, 0.5),
+    "large": (2, 2.0), "big": (2, 2.0), "lot": (2, 2.0),
+}
+
+
+def _build_lexicon():
+    lexicon = {}
+    for word, canonical in (
+        ("right", "right"), ("left", "left"),
+        ("up", "up"), ("upward", "up"), ("upwards", "up"),
+        ("down", "down"), ("downward", "down"), ("downwards", "down"),
+        ("forward", "forward"), ("forwards", "forward"), ("ahead", "forward"),
+        ("backward", "backward"), ("backwards", "backward"), ("back", "backward"),
+    ):
+        lexicon[word] = (DIR, canonical)
+    for word in ("cm", "centimeter", "centimeters", "centimetre", "centimetres"):
+        lexicon[word] = (UNIT, "cm")
+    for word in ("mm", "millimeter", "millimeters", "millimetre", "millimetres"):
+        lexicon[word] = (UNIT, "mm")
+    for word, qual in _QUALIFIERS.items():
+        lexicon[word] = (QUAL, qual)
+    lexicon["and"] = (AND, None)
+    lexicon["then"] = (THEN, None)
+    lexicon["next"] = (THEN, None)
+    lexicon[","] = (THEN, None)
+    return lexicon
+
+
+_LEXICON = _build_lexicon()
+_PLAIN = (WORD, None)
+
+
+class Token(NamedTuple):
+    kind: int
+    value: object
+    start: int
+    end: int
+
+
+class MoveOp(NamedTuple):
+    """One command segment of a sentence.
+
+    text      -- the segment as spoken (lowercased)
+    combine   -- True if joined to the previous segment with 'and'
+    delta     -- {"x","y","z"} delta in metres, or None if no direction
+    direction -- primary direction word ("right", "up", ...) or None
+    measured  -- True if a number or qualitative distance was given
+    """
+    text: str
+    combine: bool
+    delta: Optional[Dict[str, float]]
+    direction: Optional[str]
+    measured: bool
+
+
+def tokenize(text: str) -> List[Token]:
+    """Tokenize lowercased text into (kind, value, start, end) tokens."""
+    tokens = []
+    for m in _TOKEN_RE.finditer(text):
+        word = m.group()
+        if word[0].isdigit():
+            tokens.append(Token(NUM, float(word), m.start(), m.end()))
+        else:
+            kind, value = _LEXICON.get(word, (WORD, word))
+            tokens.append(Token(kind, value, m.start(), m.end()))
+    return tokens
+
+
+class _Segment:
+    """Accumulates the tokens of one command segment during parse_ops."""
+
+    __slots__ = ("start", "end", "combine", "number", "qual", "unit", "dirs")
+
+    def __init__(self, start, combine):
+        self.start = start
+        self.end = start
+        self.combine = combine
+        self.number = None
+        self.qual = None
+        self.unit = None
+        self.dirs = set()
+
+    def feed(self, kind, value):
+        if kind == DIR:
+            self.dirs.add(value)
+        elif kind == NUM:
+            if self.number is None:
+                self.number = value
+        elif kind == QUAL:
+            if self.qual is None or value[0] < self.qual[0]:
+                self.qual = value
+        elif kind == UNIT:
+            if self.unit is None or value == "cm":
+                self.unit = value
+
+    def build(self, text) -> MoveOp:
+        seg_text = text[self.start:self.end]
+        measured = self.number is not None or self.qual is not None
+        dirs = self.dirs
+        if not dirs:
+            return MoveOp(seg_text, self.combine, None, None, measured)
+
+        if self.number is not None:
+            distance = self.number
+        elif self.qual is not None:
+            distance = self.qual[1]
+        else:
+            distance = DEFAULT_DISTANCE
+        if self.unit is not None:
+            distance /= _UNIT_DIVISORS[self.unit]
+
+        scaled = round(distance * DISTANCE_SCALE, 4)
+        delta = {"x": 0.0, "y": 0.0, "z": 0.0}
+        direction = None
+        for name in _DIRECTION_ORDER:
+            if name in dirs:
+                axis, sign = DIRECTIONS[name]
+                delta[axis] = sign * scaled
+                if direction is None:
+                    direction = name
+
+        return MoveOp(seg_text, self.combine, delta, direction, measured)
+
+
+def parse_ops(text: str) -> List[MoveOp]:
+    """Parse a sentence into MoveOps in a single pass over its tokens.
+
+    'and' joins segments into one combined move, 'then' / 'next' /
+    'after that' / ',' start a new sequential move.  A run of connectors
+    counts as 'then' if any of them is sequential ("and then").
+    """
+    text = text.lower()
+    lexicon = _LEXICON
+    ops = []
+    seg = None
+    connector = None
+    after = None
+
+    for m in _TOKEN_RE.finditer(text):
+        word = m.group()
+        if word[0].isdigit():
+            kind, value = NUM, float(word)
+        else:
+            kind, value = lexicon.get(word, _PLAIN)
+
+        if after is not None:
+            # "after that" is a sequential connector; a lone "after" is a word
+            if word == "that":
+                kind = THEN
+            else:
+                if seg is None:
+                    seg = _Segment(after[0], connector == AND)
+                seg.end = after[1]
+            after = None
+        elif word == "after":
+            after = m.span()
+            continue
+
+        if kind == AND or kind == THEN:
+            if seg is not None:
+                ops.append(seg.build(text))
+                seg = None
+                connector = kind
+            elif connector is not None and kind == THEN:
+                connector = THEN
+            continue
+
+        if seg is None:
+            seg = _Segment(m.start(), connector == AND)
+        seg.end = m.end()
+        if kind != WORD:
+            seg.feed(kind, value)
+
+    if after is not None:
+        if seg is None:
+            seg = _Segment(after[0], connector == AND)
+        seg.end = after[1]
+    if seg is not None:
+        ops.append(seg.build(text))
+
+    return ops
+
+
+# ── memoization ────────────────────────────────────────────────────────────────
+DEFAULT_PARSE_CACHE_SIZE = 256
+
+
+def normalize_command(text: str) -> str:
+    """Cache key: lowercase, single spaces, no trailing sentence punctuation."""
+    return " ".join(text.lower().split()).rstrip(".?!")
+
+
+class ParseCache:
+    """Bounded LRU cache in front of parse_ops, with hit/miss counters."""
+
+    def __init__(self, maxsize: int = DEFAULT_PARSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, text: str) -> List[MoveOp]:
+        key = normalize_command(text)
+        with self._lock:
+            ops = self._entries.get(key)
+            if ops is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if ops is None:
+            ops = tuple(parse_ops(key))
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = ops
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        # Callers may mutate deltas; hand out copies
+        return [op._replace(delta=dict(op.delta)) if op.delta else op for op in ops]
+
+    def stats(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            rate = self.hits / total * 100 if total else 0.0
+            return (f"{self.hits} hits / {self.misses} misses ({rate:.0f}% hit rate, "
+                    f"{len(self._entries)}/{self.maxsize} entries)")
+
+
+# ── streaming ──────────────────────────────────────────────────────────────────
+DEFAULT_STABLE_PARTIALS = 2
+
+
+class Group(NamedTuple):
+    """A run of segments joined by 'and', ended by a sequential connector."""
+    text: str
+    start: int   # offsets into the lowercased transcript
+    end: int
+    ops: Tuple[MoveOp, ...]
+
+
+def _ops_key(ops):
+    return tuple((op.combine, tuple(op.delta.values()) if op.delta else None) for op in ops)
+
+
+class StreamingParser:
+    """Incremental parse of one utterance's partial transcripts.
+
+    feed(text) takes the whole transcript so far (as Azure delivers it) and
+    returns the groups that just became stable.  Tokens before the first
+    changed character are kept; only the changed tail is re-tokenized, and
+    grouping resumes from the last group boundary still intact.
+    """
+
+    def __init__(self, stable_partials: int = DEFAULT_STABLE_PARTIALS):
+        self.stable_partials = max(1, stable_partials)
+        self.tokens_scanned = 0   # regex matches over the parser's lifetime
+        self.rescans = 0          # partials that revised earlier text
+        self.revised_after_release = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new utterance."""
+        self._text = ""
+        self._tokens = []    # [kind, start, end, word]
+        self._closed = []    # (start, end, index of the next group's first token)
+        self._seen = []      # [group text, partials seen unchanged]
+        self.stable = []     # Groups released this utterance
+
+    def feed(self, text: str) -> List[Group]:
+        text = text.lower()
+        old = self._text
+        if text.startswith(old):
+            common = len(old)
+        else:
+            common = 0
+            for a, b in zip(old, text):
+                if a != b:
+                    break
+                common += 1
+            self.rescans += 1
+        self._text = text
+
+        # A token touching the first changed character may still be growing
+        tokens = self._tokens
+        while tokens and tokens[-1][2] >= common:
+            tokens.pop()
+        dirty = len(tokens)
+        pos = tokens[-1][2] if tokens else 0
+        for m in _TOKEN_RE.finditer(text, pos):
+            word = m.group()
+            if word[0].isdigit():
+                kind = NUM
+            else:
+                kind = _LEXICON.get(word, _PLAIN)[0]
+                if word == "that" and tokens and tokens[-1][3] == "after":
+                    tokens[-1][0] = THEN  # "after that" is sequential
+                    kind = THEN
+                    dirty = min(dirty, len(tokens) - 1)
+            tokens.append([kind, m.start(), m.end(), word])
+            self.tokens_scanned += 1
+
+        # Boundaries found from a changed token onwards have to be redone
+        while self._closed and self._closed[-1][2] >= dirty:
+            self._closed.pop()
+        self._fold()
+        return self._release()
+
+    def _fold(self):
+        tokens = self._tokens
+        if self._closed:
+            i = self._closed[-1][2]
+            group_start = tokens[i][1]
+        else:
+            i, group_start = 0, None
+        run_start, run_then = None, False
+        for j in range(i, len(tokens)):
+            kind, start = tokens[j][0], tokens[j][1]
+            if kind == AND or kind == THEN:
+                if group_start is None:
+                    continue  # leading connectors
+                if run_start is None:
+                    run_start, run_then = start, False
+                run_then = run_then or kind == THEN
+                continue
+            if run_start is not None:
+                if run_then:
+                    self._closed.append((group_start, run_start, j))
+                    group_start = start
+                run_start = None
+            if group_start is None:
+                group_start = start
+
+    def _release(self) -> List[Group]:
+        text = self._text
+        seen = self._seen
+        for k, (start, end, _) in enumerate(self._closed):
+            group_text = text[start:end].strip()
+            if k < len(seen) and seen[k][0] == group_text:
+                seen[k][1] += 1
+            else:
+                del seen[k:]
+                seen.append([group_text, 1])
+                if k < len(self.stable):
+                    self.revised_after_release += 1
+        del seen[len(self._closed):]
+
+        released = []
+        k = len(self.stable)
+        while k < len(seen) and seen[k][1] >= self.stable_partials:
+            start, end, _ = self._closed[k]
+            group_text = seen[k][0]
+            group = Group(group_text, start, start + len(group_text), tuple(parse_ops(group_text)))
+            self.stable.append(group)
+            released.append(group)
+            k += 1
+        return released
+
+    def remaining_after(self, final_text: str) -> Optional[str]:
+        """Text of final_text after the released groups.
+
+        "" if nothing is left; None if the final's leading groups do not
+        parse to the same moves as the released ones (Azure revised them).
+        """
+        final = StreamingParser(stable_partials=1)
+        final.feed(final_text)
+        k = len(self.stable)
+        if k == 0:
+            return final._text.strip().rstrip(".?!")
+        if len(final._closed) < k:
+            return None
+        for group, (start, end, _) in zip(self.stable, final._closed):
+            if _ops_key(parse_ops(final._text[start:end])) != _ops_key(group.ops):
+                return None
+        next_token = final._closed[k - 1][2]
+        return final._text[final._tokens[next_token][1]:].strip().rstrip(".?!")
+
+
+# ── compatibility helpers ──────────────────────────────────────────────────────
+def split_into_commands(text: str) -> List[Tuple[str, bool]]:
+    """
+    Split a sentence into multiple movement commands.
+    Returns a list of tuples: (command_text, combine_with_previous)
+    """
+    return [(op.text, op.combine) for op in parse_ops(text)]
+
+
+def parse_movement_command(text: str) -> Optional[Dict[str, float]]:
+    """Parse a single movement command and return its delta (or None)."""
+    text = text.lower()
+    seg = None
+    for tok in tokenize(text):
+        if seg is None:
+            seg = _Segment(tok.start, False)
+        seg.end = tok.end
+        seg.feed(tok.kind, tok.value)
+    return seg.build(text).delta if seg is not None else None
+
+
+def has_measurement(text: str) -> bool:
+    """Check if the text contains a measurement (number or qualitative)."""
+    return any(tok.kind in (NUM, QUAL) for tok in tokenize(text.lower()))
+
+
+def get_direction_from_text(text: str) -> Optional[str]:
+    """Extract the primary direction from a movement command."""
+    dirs = {tok.value for tok in tokenize(text.lower()) if tok.kind == DIR}
+    for name in _DIRECTION_ORDER:
+        if name in dirs:
+            return name
+    return None
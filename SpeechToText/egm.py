@@ -0,0 +1,489 @@
+"""
+EGM Client
+==========
+Streams position corrections straight to the robot controller over ABB
+Externally Guided Motion, skipping tcp_commands.json and Unity.
+
+The controller sends an EgmRobot message every EGM cycle (4 ms, ~250 Hz)
+to the sensor's UDP port (6510, as in EgmCommunication.cs / UDPCOMM.cs) and
+expects an EgmSensor reply carrying the next planned pose.  EgmClient
+answers every message as it arrives:
+
+  - the setpoint moves toward the current target along a straight line,
+    with a trapezoidal speed profile (max_speed, accel)
+  - once the setpoint is on the target it holds there until the feedback
+    is within REACHED_TOLERANCE_M, then writes tcp_ack.json (the same ack
+    TCPHotController writes, so AckWatcher / --waypoints / --wait work
+    unchanged) and moves on to the next waypoint of the route
+  - orientation is held at whatever the controller first reported
+
+Routes follow TCPHotController: a command is its target plus optional
+"waypoints"; a new command that still contains the point being approached
+only refreshes what follows it, otherwise the move restarts toward the new
+target.
+
+Only the message fields this needs are encoded, with a small proto2 wire
+codec (no protobuf dependency).  Field numbers match egm.proto as compiled
+into UnityProject/Assets/Scripts/Egm.cs.  Positions are robot base frame
+millimetres on the wire and Unity metres everywhere else.
+
+Usage:
+  python cli_control.py --transport egm                      # bind 0.0.0.0:6510
+  python cli_control.py --transport egm --address 127.0.0.1:6511
+  python egm_standin.py                                      # simulated controller
+"""
+
+import math
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from command_journal import atomic_write_json
+from timing import percentile
+from workspace import robot_to_unity, unity_to_robot
+
+DEFAULT_EGM_ADDRESS = "0.0.0.0:6510"
+EGM_CYCLE_SECS = 0.004
+
+DEFAULT_MAX_SPEED = 0.25   # m/s
+DEFAULT_ACCEL = 1.0        # m/s^2
+REACHED_TOLERANCE_M = 1e-3
+# Longest gap between controller messages used as one interpolation step
+MAX_STEP_SECS = 0.02
+MAX_DATAGRAM_BYTES = 65535
+LATENCY_SAMPLES = 8192
+
+# EgmHeader.MessageType
+MSGTYPE_DATA = 2
+MSGTYPE_CORRECTION = 3
+# EgmMotorState / EgmMCIState / EgmRapidCtrlExecState
+MOTORS_ON = 1
+MCI_RUNNING = 3
+RAPID_RUNNING = 2
+
+_AXES = ("x", "y", "z")
+_DOUBLE = struct.Struct("<d")
+
+
+# ── proto2 wire format ─────────────────────────────────────────────────────────
+_VARINT, _FIXED64, _LENGTH, _FIXED32 = 0, 1, 2, 5
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3 | _VARINT) + _varint(value)
+
+
+def _field_double(field: int, value: float) -> bytes:
+    return _varint(field << 3 | _FIXED64) + _DOUBLE.pack(value)
+
+
+def _field_message(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | _LENGTH) + _varint(len(payload)) + payload
+
+
+def _read_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(data: bytes) -> dict:
+    """{field number: [values]}; varints as int, fixed64 as double, length-delimited as bytes."""
+    fields = {}
+    pos, end = 0, len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == _VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire == _FIXED64:
+            (value,) = _DOUBLE.unpack_from(data, pos)
+            pos += 8
+        elif wire == _LENGTH:
+            size, pos = _read_varint(data, pos)
+            value = data[pos:pos + size]
+            pos += size
+        elif wire == _FIXED32:
+            value = data[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"unsupported wire type {wire}")
+        fields.setdefault(field, []).append(value)
+    if pos != end:
+        raise ValueError("truncated message")
+    return fields
+
+
+def _first(fields: dict, field: int, default=None):
+    values = fields.get(field)
+    return values[-1] if values else default
+
+
+def _doubles(values) -> list:
+    """A repeated double field, packed or not."""
+    out = []
+    for v in values:
+        if isinstance(v, bytes):
+            out.extend(struct.unpack(f"<{len(v) // 8}d", v))
+        else:
+            out.append(v)
+    return out
+
+
+# ── EGM messages ───────────────────────────────────────────────────────────────
+class Pose(NamedTuple):
+    pos: tuple                      # robot frame mm
+    orient: Optional[tuple] = None  # quaternion u0..u3
+    euler: Optional[tuple] = None   # degrees
+
+
+class RobotMessage(NamedTuple):
+    seqno: int
+    tm: int
+    feedback: Optional[Pose]
+    planned: Optional[Pose]
+    motors_on: bool
+    mci_running: bool
+    rapid_running: bool
+    convergence_met: bool
+    utilization: float
+
+
+class SensorMessage(NamedTuple):
+    seqno: int
+    tm: int
+    planned: Optional[Pose]
+    speed: Optional[tuple]          # mm/s (and deg/s) feed-forward
+
+
+def _encode_header(seqno: int, tm: int, mtype: int) -> bytes:
+    return (_field_varint(1, seqno & 0xFFFFFFFF) + _field_varint(2, tm & 0xFFFFFFFF)
+            + _field_varint(3, mtype))
+
+
+def _encode_xyz(values) -> bytes:
+    return b"".join(_field_double(i + 1, v) for i, v in enumerate(values))
+
+
+def _encode_pose(pose: Pose) -> bytes:
+    out = _field_message(1, _encode_xyz(pose.pos))
+    if pose.orient is not None:
+        out += _field_message(2, b"".join(_field_double(i + 1, v) for i, v in enumerate(pose.orient)))
+    if pose.euler is not None:
+        out += _field_message(3, _encode_xyz(pose.euler))
+    return out
+
+
+def _decode_pose(data: bytes) -> Pose:
+    fields = _fields(data)
+    pos = _fields(_first(fields, 1, b""))
+    orient = _first(fields, 2)
+    euler = _first(fields, 3)
+    if orient is not None:
+        q = _fields(orient)
+        orient = tuple(_first(q, i, 0.0) for i in range(1, 5))
+    if euler is not None:
+        e = _fields(euler)
+        euler = tuple(_first(e, i, 0.0) for i in range(1, 4))
+    return Pose(tuple(_first(pos, i, 0.0) for i in range(1, 4)), orient, euler)
+
+
+def _decode_cartesian(message: bytes) -> Optional[Pose]:
+    """EgmFeedBack / EgmPlanned -> their cartesian pose (field 2)."""
+    cartesian = _first(_fields(message), 2)
+    return None if cartesian is None else _decode_pose(cartesian)
+
+
+def _state(fields: dict, field: int) -> int:
+    sub = _first(fields, field)
+    return _first(_fields(sub), 1, 0) if sub is not None else 0
+
+
+def _header(fields: dict):
+    header = _fields(_first(fields, 1, b""))
+    return _first(header, 1, 0), _first(header, 2, 0)
+
+
+def encode_sensor(seqno: int, tm: int, pose: Pose, speed=None) -> bytes:
+    """EgmSensor: header, planned cartesian pose, optional cartesian speed reference."""
+    out = _field_message(1, _encode_header(seqno, tm, MSGTYPE_CORRECTION))
+    out += _field_message(2, _field_message(2, _encode_pose(pose)))
+    if speed is not None:
+        values = b"".join(_field_double(1, v) for v in speed)
+        out += _field_message(3, _field_message(2, values))
+    return out
+
+
+def decode_sensor(data: bytes) -> SensorMessage:
+    fields = _fields(data)
+    seqno, tm = _header(fields)
+    planned = _first(fields, 2)
+    speed_ref = _first(fields, 3)
+    speed = None
+    if speed_ref is not None:
+        cartesians = _first(_fields(speed_ref), 2)
+        if cartesians is not None:
+            speed = tuple(_doubles(_fields(cartesians).get(1, [])))
+    return SensorMessage(seqno, tm, None if planned is None else _decode_cartesian(planned), speed)
+
+
+def encode_robot(seqno: int, tm: int, feedback: Pose, planned: Optional[Pose] = None,
+                 convergence_met: bool = False, utilization: float = 0.0,
+                 sec: int = 0, usec: int = 0) -> bytes:
+    """EgmRobot as a running controller sends it (motors on, MCI and RAPID running)."""
+    clock = _field_varint(1, sec) + _field_varint(2, usec)
+    out = _field_message(1, _encode_header(seqno, tm, MSGTYPE_DATA))
+    out += _field_message(2, _field_message(2, _encode_pose(feedback)) + _field_message(4, clock))
+    if planned is not None:
+        out += _field_message(3, _field_message(2, _encode_pose(planned)))
+    out += _field_message(4, _field_varint(1, MOTORS_ON))
+    out += _field_message(5, _field_varint(1, MCI_RUNNING))
+    out += _field_varint(6, int(convergence_met))
+    out += _field_message(8, _field_varint(1, RAPID_RUNNING))
+    out += _field_double(10, utilization)
+    return out
+
+
+def decode_robot(data: bytes) -> RobotMessage:
+    fields = _fields(data)
+    seqno, tm = _header(fields)
+    feedback = _first(fields, 2)
+    planned = _first(fields, 3)
+    return RobotMessage(
+        seqno=seqno,
+        tm=tm,
+        feedback=None if feedback is None else _decode_cartesian(feedback),
+        planned=None if planned is None else _decode_cartesian(planned),
+        motors_on=_state(fields, 4) == MOTORS_ON,
+        mci_running=_state(fields, 5) == MCI_RUNNING,
+        rapid_running=_state(fields, 8) == RAPID_RUNNING,
+        convergence_met=bool(_first(fields, 6, 0)),
+        utilization=_first(fields, 10, 0.0),
+    )
+
+
+def parse_egm_address(address: Optional[str]):
+    host, _, port = (address or DEFAULT_EGM_ADDRESS).rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+
+def unity_to_mm(position: dict) -> tuple:
+    return tuple(c * 1000.0 for c in unity_to_robot(position))
+
+
+def mm_to_unity(point) -> dict:
+    return robot_to_unity(tuple(c / 1000.0 for c in point))
+
+
+# ── client ─────────────────────────────────────────────────────────────────────
+class EgmClient:
+    """Sensor side of EGM: answers each EgmRobot with the next interpolated pose."""
+
+    def __init__(self, address: Optional[str] = None, max_speed: float = DEFAULT_MAX_SPEED,
+                 accel: float = DEFAULT_ACCEL, on_reached=None):
+        """on_reached(unity_position) runs on the client thread when a target is confirmed."""
+        self.address = parse_egm_address(address)
+        self.max_speed = max_speed * 1000.0   # mm/s
+        self.accel = accel * 1000.0           # mm/s^2
+        self.on_reached = on_reached
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._route = deque()       # robot mm targets; head is being approached
+        self._setpoint = None
+        self._speed = 0.0
+        self._orient = None
+        self._euler = None
+        self._seqno = 0
+        self._last_rx = None
+        self.feedback = None        # last feedback position, robot mm
+        self.controller = None      # controller (host, port) once it has spoken
+
+        self.messages = 0
+        self.bad_messages = 0
+        self.reached = 0
+        self.response_times = deque(maxlen=LATENCY_SAMPLES)   # receive -> reply sent
+        self.intervals = deque(maxlen=LATENCY_SAMPLES)        # between controller messages
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(self.address)
+        sock.settimeout(0.2)
+        self._sock = sock
+        self.address = sock.getsockname()
+        self._thread = threading.Thread(target=self._run, name="egm-client", daemon=True)
+        self._thread.start()
+        print(f"[OK] EGM client listening on udp {self.address[0]}:{self.address[1]}")
+        return self
+
+    def set_route(self, route) -> None:
+        """Follow Unity-frame targets in order, like a TCPHotController command."""
+        points = [unity_to_mm(p) for p in route]
+        with self._lock:
+            head = self._route[0] if self._route else None
+            current = next((i for i, p in enumerate(points)
+                            if head is not None and math.dist(p, head) < REACHED_TOLERANCE_M * 1000), -1)
+            # the speed carries over, as MoveTowards does when Unity retargets
+            self._route = deque(points[max(current, 0):])
+
+    def position(self) -> Optional[dict]:
+        """Last feedback position in the Unity frame."""
+        with self._lock:
+            return None if self.feedback is None else mm_to_unity(self.feedback)
+
+    def _run(self):
+        sock = self._sock
+        while not self._stop.is_set():
+            try:
+                data, controller = sock.recvfrom(MAX_DATAGRAM_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received = time.perf_counter()
+            try:
+                message = decode_robot(data)
+            except (ValueError, IndexError, struct.error):
+                self.bad_messages += 1
+                continue
+            reply, reached = self._step(message, received)
+            if reply is None:
+                continue
+            try:
+                sock.sendto(reply, controller)
+            except OSError:
+                continue
+            self.response_times.append(time.perf_counter() - received)
+            self.controller = controller
+            if reached is not None and self.on_reached:
+                self.on_reached(mm_to_unity(reached))
+
+    def _step(self, message: RobotMessage, received: float):
+        """Advance the setpoint one cycle; returns (EgmSensor bytes, reached target or None)."""
+        with self._lock:
+            self.messages += 1
+            dt = EGM_CYCLE_SECS
+            if self._last_rx is not None:
+                interval = received - self._last_rx
+                self.intervals.append(interval)
+                dt = min(interval, MAX_STEP_SECS)
+            self._last_rx = received
+            if message.feedback is None:
+                return None, None
+            self.feedback = message.feedback.pos
+            if self._setpoint is None:
+                self._setpoint = self.feedback
+                self._orient = message.feedback.orient
+                self._euler = message.feedback.euler
+
+            reached = None
+            velocity = (0.0, 0.0, 0.0)
+            if self._route:
+                target = self._route[0]
+                remaining = math.dist(self._setpoint, target)
+                if remaining > 0.0:
+                    # trapezoid: accelerate, cruise, brake to stop on the target
+                    self._speed = min(self.max_speed, self._speed + self.accel * dt,
+                                      math.sqrt(2.0 * self.accel * remaining))
+                    step = min(remaining, self._speed * dt)
+                    direction = tuple((t - s) / remaining for s, t in zip(self._setpoint, target))
+                    velocity = tuple(d * self._speed for d in direction)
+                    self._setpoint = target if step >= remaining else tuple(
+                        s + d * step for s, d in zip(self._setpoint, direction))
+                elif math.dist(self.feedback, target) <= REACHED_TOLERANCE_M * 1000:
+                    reached = self._route.popleft()
+                    self._speed = 0.0
+                    self.reached += 1
+            if not self._route:
+                self._speed = 0.0
+
+            self._seqno += 1
+            pose = Pose(self._setpoint, self._orient, self._euler)
+            reply = encode_sensor(self._seqno, int(received * 1000), pose, velocity + (0.0, 0.0, 0.0))
+        return reply, reached
+
+    def stats(self) -> str:
+        if not self.response_times:
+            return f"{self.messages} controller messages, no replies"
+        responses_us = [r * 1e6 for r in self.response_times]
+        intervals = list(self.intervals)
+        mid = percentile(responses_us, 50)
+        p99 = percentile(responses_us, 99)
+        rate = 1.0 / (sum(intervals) / len(intervals)) if intervals else float("nan")
+        return (f"{self.messages} controller messages at {rate:.0f} Hz, reply p50 {mid:.0f} us / "
+                f"p99 {p99:.0f} us, {self.reached} target(s) reached, {self.bad_messages} bad")
+
+    def stop(self):
+        self._stop.set()
+        if self._sock is not None:
+            self._sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+# ── transport ──────────────────────────────────────────────────────────────────
+class EgmTransport:
+    """transport.py interface over EgmClient (--transport egm).
+
+    publish() hands the target and its lookahead waypoints to the client;
+    reached targets are acked in tcp_ack.json like Unity does, through the
+    DiskWriter when one is given.
+    """
+
+    kind = "egm"
+
+    def __init__(self, address: Optional[str], ack_path: str, writer=None,
+                 max_speed: float = DEFAULT_MAX_SPEED, accel: float = DEFAULT_ACCEL):
+        self.ack_path = ack_path
+        self.writer = writer
+        self.seq = 0
+        self.client = EgmClient(address, max_speed, accel, on_reached=self._write_ack).start()
+
+    def _write_ack(self, position: dict):
+        ack = {
+            "completed": True,
+            "position": {a: round(position[a], 4) for a in _AXES},
+            "timestamp": datetime.now().astimezone().isoformat(),
+        }
+        if self.writer is not None:
+            self.writer.write_json(self.ack_path, ack)
+        else:
+            atomic_write_json(self.ack_path, ack)
+
+    def publish(self, target: dict) -> int:
+        self.seq += 1
+        self.client.set_route([target] + list(target.get("waypoints") or []))
+        if self.client.controller is None and self.seq == 1:
+            print("[WARN] No EGM controller has connected yet; the target is held until one does")
+        return self.seq
+
+    def wait_ack(self, seq: int, timeout: float = 1.0) -> Optional[float]:
+        """Reached targets are acked through tcp_ack.json, not per frame."""
+        return None
+
+    def close(self):
+        print(f"EGM: {self.client.stats()}")
+        self.client.stop()
@@ -0,0 +1,188 @@
+"""
+EGM Stand-in Controller
+=======================
+Local stand-in for the robot controller's side of EGM, so egm.py can be
+run and its loop timing benchmarked without a robot.
+
+Every cycle (4 ms by default) it sends an EgmRobot message with the
+simulated TCP pose to the sensor address, then waits for the EgmSensor
+reply until the next cycle is due.  The simulated TCP follows the planned
+pose through a first-order lag (gain per cycle), roughly the smoothing the
+controller's EGM position filter applies.  Cycles are scheduled against
+absolute deadlines, like trajectory_replay.py.
+
+Reported: achieved cycle rate, send lateness against the schedule, reply
+round trip (EgmRobot sent -> EgmSensor received) and cycles without a
+reply.
+
+Usage:
+  python egm_standin.py                          # sends to 127.0.0.1:6510
+  python egm_standin.py --address 127.0.0.1:6511 --cycle-ms 4 --gain 0.3
+"""
+
+import argparse
+import math
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from egm import Pose, decode_sensor, encode_robot, mm_to_unity, parse_egm_address, unity_to_mm
+from timing import percentile, sleep_until
+
+DEFAULT_SENSOR_ADDRESS = "127.0.0.1:6510"
+DEFAULT_CYCLE_SECS = 0.004
+DEFAULT_GAIN = 0.3
+# Convergence is reported when the TCP is this close to the planned pose (mm)
+CONVERGENCE_MM = 0.5
+START_POSITION = {"x": 0.0, "y": 0.567, "z": -0.24}
+# Quaternion for the tool pointing straight down
+TOOL_DOWN = (0.0, 0.0, 1.0, 0.0)
+SAMPLES = 65536
+# Stop waiting for replies this long before the next cycle; socket timeouts overshoot
+RECV_MARGIN_SECS = 0.001
+
+
+class SimulatedController:
+    """Sends EgmRobot each cycle and follows the planned pose it gets back."""
+
+    def __init__(self, sensor_address=DEFAULT_SENSOR_ADDRESS, cycle: float = DEFAULT_CYCLE_SECS,
+                 gain: float = DEFAULT_GAIN, start: dict = START_POSITION):
+        host, port = parse_egm_address(sensor_address)
+        self.sensor = ("127.0.0.1" if host == "0.0.0.0" else host, port)
+        self.cycle = cycle
+        self.gain = gain
+        self.position = unity_to_mm(start)
+        self.planned = self.position
+        self._stop = threading.Event()
+        self._thread = None
+        self._sock = None
+
+        self.cycles = 0
+        self.replies = 0
+        self.missed = 0
+        self.bad_replies = 0
+        self.started_at = None
+        self.last_cycle_at = None
+        self.lateness = deque(maxlen=SAMPLES)
+        self.round_trips = deque(maxlen=SAMPLES)
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1" if self.sensor[0] == "127.0.0.1" else "0.0.0.0", 0))
+        self._sock = sock
+        self._thread = threading.Thread(target=self._run, name="egm-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def tcp_position(self) -> dict:
+        """Simulated TCP in the Unity frame."""
+        return mm_to_unity(self.position)
+
+    def _run(self):
+        sock = self._sock
+        self.started_at = start = time.perf_counter()
+        while not self._stop.is_set():
+            due = start + self.cycles * self.cycle
+            sleep_until(due)
+            sent = self.last_cycle_at = time.perf_counter()
+            self.lateness.append(sent - due)
+            self.cycles += 1
+            wall = time.time()
+            converged = math.dist(self.position, self.planned) < CONVERGENCE_MM
+            message = encode_robot(self.cycles, int((sent - start) * 1000), Pose(self.position, TOOL_DOWN),
+                                   Pose(self.planned, TOOL_DOWN), converged,
+                                   sec=int(wall), usec=int((wall % 1) * 1e6))
+            try:
+                sock.sendto(message, self.sensor)
+            except OSError:
+                break
+
+            replied = False
+            next_due = start + self.cycles * self.cycle
+            while True:
+                remaining = next_due - time.perf_counter() - RECV_MARGIN_SECS
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
+                try:
+                    data = sock.recv(65535)
+                except socket.timeout:
+                    break
+                except OSError:
+                    # nothing listening on the sensor port yet (ICMP unreachable)
+                    continue
+                try:
+                    reply = decode_sensor(data)
+                except (ValueError, IndexError, struct.error):
+                    self.bad_replies += 1
+                    continue
+                if not replied:
+                    self.round_trips.append(time.perf_counter() - sent)
+                    replied = True
+                self.replies += 1
+                if reply.planned is not None:
+                    self.planned = reply.planned.pos
+            if not replied:
+                self.missed += 1
+            self.position = tuple(p + self.gain * (q - p) for p, q in zip(self.position, self.planned))
+
+    def stats(self) -> str:
+        if self.cycles < 2:
+            return f"{self.cycles} cycle(s)"
+        elapsed = self.last_cycle_at - self.started_at
+        late = [v * 1e6 for v in self.lateness]
+        rtt = [v * 1e6 for v in self.round_trips]
+        lines = [
+            f"{self.cycles} cycles in {elapsed:.2f}s -> {(self.cycles - 1) / elapsed:.1f} Hz "
+            f"(target {1.0 / self.cycle:.0f} Hz)",
+            f"  send lateness: p50 {percentile(late, 50):.0f} us, p99 {percentile(late, 99):.0f} us, "
+            f"max {max(late):.0f} us",
+        ]
+        if rtt:
+            lines.append(f"  reply round trip: p50 {percentile(rtt, 50):.0f} us, "
+                         f"p99 {percentile(rtt, 99):.0f} us, max {max(rtt):.0f} us")
+        lines.append(f"  {self.replies} replies, {self.missed} cycle(s) without a reply, "
+                     f"{self.bad_replies} undecodable")
+        return "\n".join(lines)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._sock is not None:
+            self._sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in EGM robot controller')
+    parser.add_argument('--address', default=DEFAULT_SENSOR_ADDRESS,
+                        help=f'Sensor (EGM client) UDP address (default {DEFAULT_SENSOR_ADDRESS})')
+    parser.add_argument('--cycle-ms', type=float, default=DEFAULT_CYCLE_SECS * 1000,
+                        help='EGM cycle in milliseconds (default 4)')
+    parser.add_argument('--gain', type=float, default=DEFAULT_GAIN,
+                        help='Fraction of the remaining distance to the planned pose covered per cycle')
+    args = parser.parse_args()
+
+    controller = SimulatedController(args.address, args.cycle_ms / 1000.0, args.gain).start()
+    print(f"Stand-in EGM controller -> udp {controller.sensor[0]}:{controller.sensor[1]} "
+          f"every {args.cycle_ms:g} ms. Ctrl+C to stop.")
+    last = None
+    try:
+        while True:
+            time.sleep(0.5)
+            position = {a: round(v, 4) for a, v in controller.tcp_position().items()}
+            if position != last:
+                print(f"[SIM] TCP {position}")
+                last = position
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+        print()
+        print(controller.stats())
+
+
+if __name__ == "__main__":
+    main()
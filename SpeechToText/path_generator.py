@@ -0,0 +1,225 @@
+"""
+Path Generator
+==============
+Turns spoken drawing commands into waypoint lists.
+
+  "draw a square 10 cm"            -> 4 corners, side 0.1 m
+  "draw a rectangle 10 by 5 cm"    -> 4 corners, 0.1 m x 0.05 m
+  "draw a triangle 3"              -> 3 corners of an equilateral triangle
+  "draw a circle radius 5"         -> circle of radius 0.5 m
+  "arc left 90 degrees radius 2"   -> quarter circle, centre 0.2 m to the left
+  "... flat" / "on the table"      -> draw in the horizontal x/z plane
+
+Sizes use the same units as movement commands (1 unit = DISTANCE_SCALE m,
+cm / mm accepted).  Shapes are drawn in the vertical x/y plane facing the
+user unless "flat" is said, and start and end at the current position:
+
+  square / rectangle / triangle -- current position is the bottom-left
+                                   corner; corners are visited counter-
+                                   clockwise (right first)
+  circle -- current position is the rightmost point; traced counter-
+            clockwise back to it
+  arc    -- the centre lies `radius` away in the spoken direction and the
+            TCP sweeps `degrees` around it, curving up (or forward when
+            flat); say "clockwise" to curve the other way
+
+Polygons only need their corners.  Arcs are sampled with NumPy, with the
+number of points set by the chord tolerance (the largest gap allowed
+between a chord and the true arc) rather than a fixed count.
+
+shape_records() returns the same {"position", "delta", "command_text"}
+records as process_multi_command_sentence / process_command.
+
+split_shape_sentence() cuts a sentence that mixes shapes and moves
+("move right then draw a circle") into pieces, so the entry points run
+every piece in order instead of drawing the shape and dropping the moves.
+"""
+
+import math
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from command_parser import DEFAULT_DISTANCE, DIR, DIRECTIONS, DISTANCE_SCALE, NUM, UNIT, parse_ops, tokenize
+
+# Largest allowed distance between a chord and the arc it replaces (metres)
+DEFAULT_CHORD_TOLERANCE = 0.002
+DEFAULT_ARC_DEGREES = 90.0
+MIN_SEGMENTS_PER_TURN = 8
+
+SHAPES = ("square", "rectangle", "triangle", "circle", "arc")
+_UNIT_DIVISORS = {"cm": 10.0, "mm": 100.0}
+_FLAT_WORDS = {"flat", "horizontal", "table", "floor"}
+_AXIS_INDEX = {"x": 0, "y": 1, "z": 2}
+
+
+class ShapeSpec(NamedTuple):
+    kind: str
+    size: float            # side / width / radius in metres
+    size2: Optional[float]  # rectangle height in metres
+    degrees: float         # arc sweep
+    direction: Optional[str]
+    clockwise: bool
+    flat: bool
+    text: str
+
+
+def _metres(value, unit):
+    if unit is not None:
+        value /= _UNIT_DIVISORS[unit]
+    return value * DISTANCE_SCALE
+
+
+def parse_shape(text: str) -> Optional[ShapeSpec]:
+    """Parse a drawing command; None if the text names no shape."""
+    text = text.lower()
+    tokens = tokenize(text)
+    words = [t.value for t in tokens if isinstance(t.value, str)]
+    kind = next((w for w in words if w in SHAPES), None)
+    if kind is None:
+        return None
+
+    # Numbers with the unit that follows them, and what they measure
+    lengths, degrees, radius, diameter = [], None, None, None
+    unit = next((t.value for t in tokens if t.kind == UNIT), None)
+    for i, tok in enumerate(tokens):
+        if tok.kind != NUM:
+            continue
+        nxt = tokens[i + 1].value if i + 1 < len(tokens) else None
+        prev = tokens[i - 1].value if i > 0 else None
+        if nxt in ("degrees", "degree", "deg"):
+            degrees = tok.value
+        elif prev == "radius":
+            radius = tok.value
+        elif prev == "diameter":
+            diameter = tok.value
+        else:
+            lengths.append(tok.value)
+
+    if kind in ("circle", "arc"):
+        if radius is None and diameter is not None:
+            radius = diameter / 2.0
+        if radius is None:
+            radius = lengths[0] if lengths else DEFAULT_DISTANCE
+        size, size2 = _metres(radius, unit), None
+    else:
+        size = _metres(lengths[0] if lengths else DEFAULT_DISTANCE, unit)
+        size2 = _metres(lengths[1], unit) if kind == "rectangle" and len(lengths) > 1 else None
+
+    direction = next((t.value for t in tokens if t.kind == DIR), None)
+    clockwise = "clockwise" in words and not any(
+        w in ("counterclockwise", "anticlockwise", "counter", "anti") for w in words
+    )
+    return ShapeSpec(
+        kind=kind,
+        size=size,
+        size2=size2,
+        degrees=DEFAULT_ARC_DEGREES if degrees is None else degrees,
+        direction=direction,
+        clockwise=clockwise,
+        flat=any(w in _FLAT_WORDS for w in words),
+        text=text.strip(),
+    )
+
+
+def is_shape_command(text: str) -> bool:
+    return parse_shape(text) is not None
+
+
+def split_shape_sentence(text: str):
+    """[(piece text, ShapeSpec or None), ...] in spoken order.
+
+    Every shape is a piece of its own; movement segments between shapes
+    stay together with their and/then connectors.  A segment without a
+    direction right after a shape ("arc left, 90 degrees, radius 2") is
+    part of that shape; other pieces without a direction are dropped.
+    """
+    pieces = []
+    for op in parse_ops(text):
+        shape = parse_shape(op.text)
+        last_text, last_shape = pieces[-1] if pieces else (None, None)
+        if shape is None and last_shape is not None and op.delta is None:
+            merged = f"{last_text} {op.text}"
+            pieces[-1] = (merged, parse_shape(merged))
+        elif shape is None and last_text is not None and last_shape is None:
+            joiner = " and " if op.combine else " then "
+            pieces[-1] = (last_text + joiner + op.text, None)
+        else:
+            pieces.append((op.text, shape))
+    # Filler around a shape ("ok, draw a circle") is not a move
+    return [(piece, shape) for piece, shape in pieces
+            if shape is not None or any(op.delta for op in parse_ops(piece))]
+
+
+def _plane(flat: bool):
+    u = np.array([1.0, 0.0, 0.0])
+    v = np.array([0.0, 0.0, 1.0]) if flat else np.array([0.0, 1.0, 0.0])
+    return u, v
+
+
+def _unit_vector(direction: str) -> np.ndarray:
+    axis, sign = DIRECTIONS[direction]
+    vec = np.zeros(3)
+    vec[_AXIS_INDEX[axis]] = sign
+    return vec
+
+
+def arc_points(centre, e1, e2, radius, sweep, tolerance=DEFAULT_CHORD_TOLERANCE) -> np.ndarray:
+    """Points on centre + r(cos t e1 + sin t e2) for t in (0, sweep].
+
+    The start (t = 0) is excluded.  Segment count comes from the chord
+    tolerance: a chord spanning dt deviates r(1 - cos(dt/2)) from the arc.
+    """
+    if tolerance >= radius:
+        step = math.pi / 2
+    else:
+        step = 2.0 * math.acos(1.0 - tolerance / radius)
+    segments = max(math.ceil(abs(sweep) / step),
+                   math.ceil(MIN_SEGMENTS_PER_TURN * abs(sweep) / (2 * math.pi)), 1)
+    t = np.linspace(0.0, sweep, segments + 1)[1:]
+    return centre + radius * (np.cos(t)[:, None] * e1 + np.sin(t)[:, None] * e2)
+
+
+def shape_points(spec: ShapeSpec, start, tolerance=DEFAULT_CHORD_TOLERANCE) -> np.ndarray:
+    """Waypoints (N x 3 array) after start, ending where the shape ends."""
+    start = np.asarray(start, dtype=float)
+    u, v = _plane(spec.flat)
+
+    if spec.kind in ("square", "rectangle", "triangle"):
+        w = spec.size
+        if spec.kind == "triangle":
+            corners = np.array([[w, 0.0], [w / 2.0, w * math.sqrt(3) / 2.0], [0.0, 0.0]])
+        else:
+            h = spec.size2 if spec.size2 is not None else w
+            corners = np.array([[w, 0.0], [w, h], [0.0, h], [0.0, 0.0]])
+        return start + corners[:, :1] * u + corners[:, 1:] * v
+
+    r = spec.size
+    if spec.kind == "circle":
+        centre = start - r * u
+        sweep = -2.0 * math.pi if spec.clockwise else 2.0 * math.pi
+        return arc_points(centre, u, v, r, sweep, tolerance)
+
+    # arc: centre `r` away in the spoken direction, start on the opposite side
+    d = _unit_vector(spec.direction) if spec.direction else -u
+    other = v if abs(float(np.dot(d, v))) < 0.5 else u
+    centre = start + r * d
+    sweep = math.radians(spec.degrees)
+    e2 = -other if spec.clockwise else other
+    return arc_points(centre, -d, e2, r, sweep, tolerance)
+
+
+def shape_records(spec: ShapeSpec, start: dict, tolerance=DEFAULT_CHORD_TOLERANCE):
+    """Position/delta records for the shape, like the movement parsers produce."""
+    origin = np.array([start["x"], start["y"], start["z"]])
+    points = np.round(shape_points(spec, origin, tolerance), 4)
+    deltas = np.round(np.diff(np.vstack([origin, points]), axis=0), 4)
+    label = f"{spec.text} [{{}}/{len(points)}]"
+    return [
+        {
+            "position": {"x": p[0], "y": p[1], "z": p[2]},
+            "delta": {"x": d[0], "y": d[1], "z": d[2]},
+            "command_text": label.format(i + 1),
+        }
+        for i, (p, d) in enumerate(zip(points.tolist(), deltas.tolist()))
+    ]
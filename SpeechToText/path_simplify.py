@@ -0,0 +1,180 @@
+"""
+Path Simplification
+===================
+Ramer-Douglas-Peucker reduction of dense waypoint lists before dispatch.
+
+Every waypoint costs Unity a full move-and-ack cycle, but a sampled circle
+or a recorded trajectory usually carries far more points than the path
+needs. simplify() keeps the fewest waypoints such that no dropped point
+lies further than `tolerance` metres from the simplified polyline. The
+first and last points are always kept, so the final target never changes.
+
+Distances are measured to each segment (not the infinite line through it),
+so reversals ("right 2 then left 1") and closed loops (a circle ending
+where it started) keep their turning points.
+
+Usage:
+  simplifier = PathSimplifier(tolerance=0.001)
+  targets = simplifier.simplify(start, targets)   # start = position before targets
+  simplifier.stats()
+
+  python path_simplify.py trajectory.csv --tolerance 0.002
+  python path_simplify.py ../UnityProject/tcp_writer.py
+"""
+
+import argparse
+import ast
+import csv
+import json
+import os
+import threading
+
+import numpy as np
+
+# Metres a dropped waypoint may sit off the simplified path
+DEFAULT_SIMPLIFY_TOLERANCE = 1e-3
+
+_AXES = ("x", "y", "z")
+
+
+def _segment_distances(points, a, b):
+    """Distance from each row of points to the segment a-b."""
+    ab = b - a
+    length_sq = float(np.dot(ab, ab))
+    rel = points - a
+    if length_sq == 0.0:
+        return np.sqrt(np.einsum("ij,ij->i", rel, rel))
+    t = np.clip(rel @ ab / length_sq, 0.0, 1.0)
+    off = rel - t[:, None] * ab
+    return np.sqrt(np.einsum("ij,ij->i", off, off))
+
+
+def rdp(points, tolerance=DEFAULT_SIMPLIFY_TOLERANCE):
+    """Keep-mask for an (N, 3) polyline, and the largest dropped deviation.
+
+    Iterative (no recursion limit on long trajectories); each split
+    measures all interior points of a span in one vectorized pass.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep, 0.0
+    keep[0] = keep[-1] = True
+    max_error = 0.0
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        dist = _segment_distances(points[i + 1:j], points[i], points[j])
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+        else:
+            max_error = max(max_error, float(dist[k]))
+    return keep, max_error
+
+
+class PathSimplifier:
+    def __init__(self, tolerance: float = DEFAULT_SIMPLIFY_TOLERANCE):
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self.points_in = 0
+        self.points_out = 0
+        self.max_error = 0.0
+
+    def simplify(self, start, targets):
+        """Drop targets within tolerance of the path start -> targets.
+
+        start is where the arm is heading before targets (None if unknown,
+        in which case the first target anchors the path).
+        """
+        if len(targets) < 2:
+            kept, error = list(targets), 0.0
+        else:
+            anchor = [start] if start is not None else []
+            points = np.array([[p[a] for a in _AXES] for p in anchor + list(targets)])
+            keep, error = rdp(points, self.tolerance)
+            if anchor:
+                keep = keep[1:]
+            kept = [t for t, k in zip(targets, keep) if k]
+        with self._lock:
+            self.points_in += len(targets)
+            self.points_out += len(kept)
+            self.max_error = max(self.max_error, error)
+        if len(kept) < len(targets):
+            print(f"   Simplified: {len(targets)} -> {len(kept)} waypoint(s) "
+                  f"(max error {error * 1000:.2f} mm)")
+        return kept
+
+    def stats(self) -> str:
+        with self._lock:
+            return (f"{self.points_in} waypoints in -> {self.points_out} out "
+                    f"(max error {self.max_error * 1000:.2f} mm, tolerance {self.tolerance * 1000:.2f} mm)")
+
+
+def add_simplify_args(parser) -> None:
+    """Add --simplify to an argparse parser."""
+    parser.add_argument('--simplify', type=float, nargs='?', const=DEFAULT_SIMPLIFY_TOLERANCE,
+                        metavar='METRES',
+                        help=f'Drop waypoints within METRES of the simplified path before dispatch '
+                             f'(default {DEFAULT_SIMPLIFY_TOLERANCE * 1000:.0f} mm)')
+
+
+# ── trajectory files ───────────────────────────────────────────────────────────
+def _positions_from_script(path):
+    """The literal `positions = [...]` list from a script like tcp_writer.py."""
+    with open(path, "r") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "positions" for t in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"{path}: no literal 'positions' list")
+
+
+def load_points(path: str) -> np.ndarray:
+    """(N, 3) array from .npy, .csv (x,y,z columns), .json / .jsonl or a .py positions list."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return np.load(path, mmap_mode="r")[:, :3]
+    if ext == ".csv":
+        with open(path, newline="") as f:
+            rows = [{a: float(row[a]) for a in _AXES} for row in csv.DictReader(f)]
+    elif ext == ".jsonl":
+        with open(path, "r") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        rows = [r.get("position", r) for r in rows]
+    elif ext == ".py":
+        rows = _positions_from_script(path)
+    else:
+        with open(path, "r") as f:
+            rows = json.load(f)
+    return np.array([[r[a] for a in _AXES] for r in rows], dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simplify a recorded waypoint trajectory')
+    parser.add_argument('path', help='Trajectory (.npy, .csv, .json, .jsonl, or a script with a positions list)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_SIMPLIFY_TOLERANCE, metavar='METRES')
+    parser.add_argument('--output', metavar='FILE', help='Write the kept waypoints as a JSON list')
+    args = parser.parse_args()
+
+    points = load_points(args.path)
+    keep, error = rdp(points, args.tolerance)
+    kept = np.asarray(points)[keep]
+    print(f"{args.path}: {len(points)} -> {len(kept)} waypoints "
+          f"(max error {error * 1000:.3f} mm, tolerance {args.tolerance * 1000:.3f} mm)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([dict(zip(_AXES, p)) for p in kept.tolist()], f, indent=2)
+        print(f"[OK] Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Position State
+==============
+The commanded TCP position as an immutable snapshot that is replaced, never
+edited, so readers need no lock and writers hold one only for a pointer swap.
+
+  state = PositionState({"x": 0.0, "y": 0.567, "z": -0.24})
+  snap = state.snapshot                  # lock-free: one attribute read
+  snap.position["x"], snap.generation    # read-only mapping + commit counter
+  state.commit(snap, target)             # swap if nothing committed since snap
+  state.set(target)                      # unconditional swap (load / arbiter reply)
+
+A parse works from the snapshot it read.  commit() is a compare-and-swap:
+it fails (returns None) if another commit landed first, and the caller
+rebases onto the new snapshot and tries again.  Only the comparison, the
+assignment and an optional in-memory journal callback run under the lock;
+parsing, validation, printing and publishing all happen outside it.
+
+TimedLock wraps threading.Lock and records how long each acquirer waited
+and held it, for the summary in speech_control.py and
+benchmarks/bench_locks.py.
+
+Usage:
+  see speech_control.py (add_positions_to_queue) and benchmarks/bench_locks.py
+"""
+
+import threading
+import time
+from collections import deque
+from types import MappingProxyType
+from typing import Callable, Mapping, NamedTuple, Optional
+
+from timing import percentile
+
+_AXES = ("x", "y", "z")
+
+# Per-lock samples kept for the percentiles
+LOCK_HISTORY = 10000
+
+
+class TimedLock:
+    """threading.Lock that records wait (acquire) and hold (acquire -> release) times."""
+
+    def __init__(self, name: str, history: int = LOCK_HISTORY):
+        self.name = name
+        self._lock = threading.Lock()
+        self._held_at = 0.0
+        self.acquisitions = 0
+        # Appended while the lock is held, so the deques need no lock of their own
+        self.waits = deque(maxlen=history)
+        self.holds = deque(maxlen=history)
+
+    def __enter__(self):
+        requested = time.perf_counter()
+        self._lock.acquire()
+        self._held_at = time.perf_counter()
+        self.waits.append(self._held_at - requested)
+        self.acquisitions += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.holds.append(time.perf_counter() - self._held_at)
+        self._lock.release()
+        return False
+
+    def report(self) -> str:
+        if not self.acquisitions:
+            return f"{self.name}: unused"
+        holds = [h * 1e6 for h in self.holds]
+        waits = [w * 1e6 for w in self.waits]
+        return (f"{self.name}: {self.acquisitions} acquisitions, "
+                f"hold p50 {percentile(holds, 50):.1f} us / p99 {percentile(holds, 99):.1f} us / "
+                f"max {max(holds):.1f} us, wait p99 {percentile(waits, 99):.1f} us / "
+                f"max {max(waits):.1f} us")
+
+
+class Snapshot(NamedTuple):
+    position: Mapping[str, float]   # read-only; .copy() gives a plain dict
+    generation: int                 # bumped by every commit / set
+
+
+def freeze(position: Mapping[str, float]) -> Mapping[str, float]:
+    return MappingProxyType({a: position[a] for a in _AXES})
+
+
+class PositionState:
+    """Copy-on-write holder of the commanded position."""
+
+    def __init__(self, position: Mapping[str, float], lock_name: str = "position swap"):
+        self.swap_lock = TimedLock(lock_name)
+        self.snapshot = Snapshot(freeze(position), 0)
+        self.conflicts = 0
+
+    @property
+    def position(self) -> Mapping[str, float]:
+        return self.snapshot.position
+
+    def commit(self, base: Snapshot, position: Mapping[str, float],
+               journal: Optional[Callable[[Snapshot], None]] = None) -> Optional[Snapshot]:
+        """Replace base with position, or return None if base is no longer current.
+
+        journal(new) runs inside the swap so journal order matches commit
+        order; it must only enqueue (DiskWriter), never touch the disk.
+        """
+        new = Snapshot(freeze(position), base.generation + 1)
+        with self.swap_lock:
+            if self.snapshot is not base:
+                self.conflicts += 1
+                return None
+            self.snapshot = new
+            if journal is not None:
+                journal(new)
+        return new
+
+    def set(self, position: Mapping[str, float]) -> Snapshot:
+        """Replace whatever is current (positions loaded or assigned elsewhere)."""
+        frozen = freeze(position)
+        with self.swap_lock:
+            self.snapshot = new = Snapshot(frozen, self.snapshot.generation + 1)
+        return new
@@ -0,0 +1,238 @@
+"""
+Recognizer Backends
+===================
+Speech recognizer abstraction used by MicToAzureStream.
+
+  AzureRecognizer  -- live Azure continuous recognition fed from a push stream
+  ReplayRecognizer -- replays a recorded JSONL event timeline with its original
+                      timing; no network, no microphone, no Azure SDK
+
+Both deliver RecognitionEvent objects shaped like the Azure SDK events
+(evt.result.text / .reason / .offset / .duration) to the same handlers, so
+the debounce and reconciliation logic in speech_control.py runs unchanged.
+Any backend can record what it delivers (record_to=...) to produce new
+replay fixtures from live sessions.
+
+Fixture format (one event per line, t = seconds since session start):
+  {"t": 0.42, "type": "partial", "text": "move right"}
+  {"t": 1.10, "type": "final", "text": "Move right.", "offset": 0.3, "duration": 0.8}
+  {"t": 4.00, "type": "nomatch"}
+"""
+
+import json
+import threading
+import time
+
+from asr_log import AsrLogWriter
+
+# Event reasons (also the fixture "type" values)
+RECOGNIZING = "partial"
+RECOGNIZED = "final"
+NO_MATCH = "nomatch"
+
+_TICKS_PER_SEC = 10_000_000  # Azure offsets/durations are in 100 ns ticks
+
+
+class RecognitionResult:
+    __slots__ = ("text", "reason", "offset", "duration")
+
+    def __init__(self, text, reason, offset=0, duration=0):
+        self.text = text
+        self.reason = reason
+        self.offset = offset
+        self.duration = duration
+
+
+class RecognitionEvent:
+    __slots__ = ("result",)
+
+    def __init__(self, result: RecognitionResult):
+        self.result = result
+
+
+class RecognizerBackend:
+    """Common handler wiring and optional event recording."""
+
+    def __init__(self, record_to=None):
+        self.on_recognizing = None
+        self.on_recognized = None
+        self.on_canceled = None
+        self._recorder = AsrLogWriter(record_to) if record_to else None
+        self._t0 = time.monotonic()
+
+    def connect(self, on_recognizing, on_recognized, on_canceled=None):
+        self.on_recognizing = on_recognizing
+        self.on_recognized = on_recognized
+        self.on_canceled = on_canceled
+
+    def _deliver(self, reason, text="", offset=0, duration=0):
+        if self._recorder is not None:
+            record = {"t": round(time.monotonic() - self._t0, 3), "type": reason}
+            if reason != NO_MATCH:
+                record["text"] = text
+            if reason == RECOGNIZED:
+                record["offset"] = offset / _TICKS_PER_SEC
+                record["duration"] = duration / _TICKS_PER_SEC
+            self._recorder.log(record)
+
+        evt = RecognitionEvent(RecognitionResult(text, reason, offset, duration))
+        if reason == RECOGNIZING:
+            if self.on_recognizing:
+                self.on_recognizing(evt)
+        elif self.on_recognized:
+            self.on_recognized(evt)
+
+    def start(self):
+        self._t0 = time.monotonic()
+
+    def write_audio(self, pcm_bytes: bytes):
+        pass
+
+    def stop(self):
+        if self._recorder is not None:
+            self._recorder.close()
+
+
+class AzureRecognizer(RecognizerBackend):
+    """Azure continuous recognition over a PushAudioInputStream."""
+
+    def __init__(self, speech_key, region, sample_rate, channels, phrase_list=(), record_to=None):
+        super().__init__(record_to)
+        import azure.cognitiveservices.speech as speechsdk
+        self._sdk = speechsdk
+
+        self.push_stream = speechsdk.audio.PushAudioInputStream()
+        audio_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=sample_rate,
+            bits_per_sample=16,
+            channels=channels
+        )
+        audio_input = speechsdk.audio.AudioConfig(stream=self.push_stream)
+
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=region)
+        speech_config.output_format = speechsdk.OutputFormat.Simple
+        speech_config.speech_recognition_language = "en-US"
+
+        # Balanced endpoint detection
+        speech_config.set_property(
+            speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs, "500"
+        )
+        speech_config.set_property(
+            speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs, "500"
+        )
+        speech_config.set_property(
+            speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs, "3000"
+        )
+
+        self.recognizer = speechsdk.SpeechRecognizer(
+            speech_config=speech_config,
+            audio_config=audio_input
+        )
+
+        self.recognizer.recognizing.connect(self._sdk_recognizing)
+        self.recognizer.recognized.connect(self._sdk_recognized)
+        self.recognizer.canceled.connect(self._sdk_canceled)
+        self.recognizer.session_started.connect(lambda evt: print("[Session started]"))
+        self.recognizer.session_stopped.connect(lambda evt: print("[Session stopped]"))
+
+        self._apply_phrase_list(phrase_list)
+
+    def _apply_phrase_list(self, phrase_list):
+        try:
+            plist = self._sdk.PhraseListGrammar.from_recognizer(self.recognizer)
+            for p in phrase_list:
+                plist.addPhrase(p)
+            print("Applied phrase list boosting:", list(phrase_list))
+        except Exception as e:
+            print("Could not apply phrase list:", e)
+
+    def _sdk_recognizing(self, evt):
+        self._deliver(RECOGNIZING, evt.result.text)
+
+    def _sdk_recognized(self, evt):
+        result = evt.result
+        if result.reason == self._sdk.ResultReason.RecognizedSpeech:
+            self._deliver(RECOGNIZED, result.text, result.offset, result.duration)
+        elif result.reason == self._sdk.ResultReason.NoMatch:
+            self._deliver(NO_MATCH)
+
+    def _sdk_canceled(self, evt):
+        if self.on_canceled:
+            self.on_canceled(evt)
+
+    def start(self):
+        super().start()
+        self.recognizer.start_continuous_recognition()
+        print("Azure recognizer started (continuous).")
+
+    def write_audio(self, pcm_bytes: bytes):
+        # The SDK wants bytes; ring-buffer chunks arrive as memoryviews
+        if not isinstance(pcm_bytes, bytes):
+            pcm_bytes = bytes(pcm_bytes)
+        try:
+            self.push_stream.write(pcm_bytes)
+        except Exception as e:
+            print("Error writing audio:", e)
+
+    def stop(self):
+        try:
+            self.recognizer.stop_continuous_recognition()
+        except Exception:
+            pass
+        try:
+            self.push_stream.close()
+        except Exception:
+            pass
+        super().stop()
+
+
+def load_fixture(path: str):
+    """Load a replay fixture, sorted by time."""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                events.append(json.loads(line))
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+class ReplayRecognizer(RecognizerBackend):
+    """Replays a fixture timeline on its own thread, like SDK callbacks.
+
+    Events are delivered at their recorded offsets from start(), so the
+    real debounce/and-timeout timers see the original timing.
+    """
+
+    def __init__(self, events, record_to=None):
+        super().__init__(record_to)
+        self.events = load_fixture(events) if isinstance(events, str) else list(events)
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        super().start()
+        self._thread = threading.Thread(target=self._replay, name="replay-recognizer", daemon=True)
+        self._thread.start()
+
+    def _replay(self):
+        for event in self.events:
+            delay = self._t0 + event["t"] - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            reason = event["type"]
+            offset = int(event.get("offset", 0) * _TICKS_PER_SEC)
+            duration = int(event.get("duration", 0) * _TICKS_PER_SEC)
+            self._deliver(reason, event.get("text", ""), offset, duration)
+        self.done.set()
+
+    def wait_done(self, timeout=None) -> bool:
+        return self.done.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        super().stop()
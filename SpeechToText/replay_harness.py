@@ -0,0 +1,257 @@
+"""
+Replay Harness
+==============
+Runs recorded recognizer timelines (see recognizers.py for the fixture
+format) through MicToAzureStream offline - no microphone, no network, no
+Azure SDK - using the real debounce timers and final/partial reconciliation.
+
+Reported per fixture:
+  - onset -> target latency (first event of an utterance -> first published target)
+  - final -> target latency (final result -> last target of the utterance)
+  - duplicate executions (the same command segment executed twice in one utterance)
+  - missed combinations ("X and Y" executed as two separate moves)
+  - net-motion mismatches (what was published vs. the final text parsed whole)
+  - median debounce wait chosen for the fixture's timers
+
+Some fixtures record a known failure on purpose (e.g. the missed
+combination when "and" arrives after the debounce fired).  Their counts
+are listed in replay_fixtures/expected.json; --check fails only when a
+fixture does worse than that baseline.
+
+With --adaptive all fixtures share one AdaptiveDebounce, so it learns as
+the replay goes; --rounds repeats the fixture list to show how the waits
+and error counts settle.
+
+Usage:
+  python replay_harness.py replay_fixtures/*.jsonl
+  python replay_harness.py replay_fixtures/*.jsonl --check     # exit 1 on regressions vs expected.json
+  python replay_harness.py session.jsonl --verbose              # show handler output
+  python replay_harness.py replay_fixtures/*.jsonl --adaptive --rounds 5
+  python replay_harness.py replay_fixtures/*.jsonl --stream-segments --stable-partials 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import speech_control as sc
+from adaptive_debounce import AND_TIMEOUT, DEFAULT_TARGET_FALSE_RATE, DELAY_BOUNDS, AdaptiveDebounce
+from asr_log import AsrLogWriter
+from command_journal import CommandHistory, iter_journal
+from command_parser import parse_ops
+from recognizers import NO_MATCH, RECOGNIZED, ReplayRecognizer, load_fixture
+
+START_POSITION = {"x": 0.0, "y": 0.567, "z": -0.24}
+MOTION_TOLERANCE = 1e-6
+EXPECTED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay_fixtures", "expected.json")
+CHECKED = ("duplicates", "missed_combinations", "mismatches")
+
+
+class RecordingTransport:
+    """Transport that keeps every published target with its publish time."""
+
+    kind = "recording"
+
+    def __init__(self):
+        self.published = []  # (monotonic time, target)
+        self.seq = 0
+
+    def publish(self, target: dict) -> int:
+        self.seq += 1
+        self.published.append((time.monotonic(), dict(target)))
+        return self.seq
+
+    def wait_ack(self, seq, timeout=1.0):
+        return None
+
+    def close(self):
+        pass
+
+
+def split_utterances(events):
+    """Group fixture events into utterances ending at a final/nomatch."""
+    utterances, current = [], []
+    for event in events:
+        current.append(event)
+        if event["type"] in (RECOGNIZED, NO_MATCH):
+            utterances.append(current)
+            current = []
+    if current:
+        utterances.append(current)
+    return utterances
+
+
+def net_delta(text: str):
+    total = {"x": 0.0, "y": 0.0, "z": 0.0}
+    for op in parse_ops(text):
+        if op.delta:
+            for axis in total:
+                total[axis] += op.delta[axis]
+    return total
+
+
+def replay_fixture(path: str, workdir: str, verbose: bool = False, debounce=None, stream_segments=None):
+    events = load_fixture(path)
+
+    # Point the module's outputs at the harness instead of Unity / real logs.
+    # Each run gets its own journal and ASR log: AsrLogWriter appends, so a
+    # shared log would pair this fixture's finals with earlier runs' records.
+    rundir = tempfile.mkdtemp(prefix="run-", dir=workdir)
+    transport = RecordingTransport()
+    sc.transport = transport
+    sc.position_state.set(START_POSITION)
+    sc.command_history = CommandHistory(os.path.join(rundir, "journal.jsonl"), sc.disk_writer)
+    log_path = os.path.join(rundir, "asr_log.jsonl")
+    sc.asr_log = AsrLogWriter(log_path)
+    emergencies = []
+    sc.emergency_shutdown = lambda: emergencies.append(time.monotonic())
+
+    output = None if verbose else io.StringIO()
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        recognizer = ReplayRecognizer(events)
+        stream = sc.MicToAzureStream(None, None, threading.Event(), recognizer=recognizer,
+                                     debounce=debounce, stream_segments=stream_segments)
+        recognizer.wait_done()
+        and_timeout = DELAY_BOUNDS[AND_TIMEOUT][1] if debounce else sc.AND_COMMAND_TIMEOUT_SECS
+        time.sleep(and_timeout + 0.3)
+        stream.stop()
+    sc.asr_log.close()
+
+    t0 = recognizer._t0
+    log_records = list(iter_journal(log_path))
+    utterances = split_utterances(events)
+    report = {
+        "fixture": os.path.basename(path),
+        "utterances": len(utterances),
+        "targets": len(transport.published),
+        "onset_latency": [],
+        "final_latency": [],
+        "duplicates": 0,
+        "missed_combinations": stream.missed_combinations,
+        "mismatches": [],
+        "emergencies": len(emergencies),
+        "waits": [d["delay_secs"] for r in log_records for d in r.get("debounce", [])],
+    }
+
+    position = START_POSITION.copy()
+    finals = iter(log_records)
+    for i, utterance in enumerate(utterances):
+        start = t0 + utterance[0]["t"]
+        end = t0 + utterances[i + 1][0]["t"] if i + 1 < len(utterances) else float("inf")
+        published = [(t, target) for t, target in transport.published if start <= t < end]
+        final = next((e for e in utterance if e["type"] == RECOGNIZED), None)
+
+        if published:
+            report["onset_latency"].append(published[0][0] - start)
+            if final is not None and published[-1][0] >= t0 + final["t"]:
+                report["final_latency"].append(published[-1][0] - (t0 + final["t"]))
+
+        if final is None:
+            continue
+
+        record = next(finals, {})
+        segments = [op.text for e in record.get("executed", []) for op in parse_ops(e["text"])]
+        report["duplicates"] += len(segments) - len(set(segments))
+
+        expected = net_delta(final["text"])
+        last = published[-1][1] if published else position
+        actual = {axis: last[axis] - position[axis] for axis in position}
+        if any(abs(actual[a] - expected[a]) > MOTION_TOLERANCE for a in actual):
+            report["mismatches"].append((final["text"], expected, actual))
+        position = {axis: last[axis] for axis in position}
+
+    return report
+
+
+def load_expected(path: str) -> dict:
+    """Known per-fixture counts, e.g. {"missed_combination.jsonl": {"missed_combinations": 1}}."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(report: dict, expected: dict) -> list:
+    """Checked counts above the fixture's recorded baseline (0 if none)."""
+    baseline = expected.get(report["fixture"], {})
+    found = []
+    for key in CHECKED:
+        value = report[key] if isinstance(report[key], int) else len(report[key])
+        if value > baseline.get(key, 0):
+            found.append(f"{key} {value} > {baseline.get(key, 0)}")
+    return found
+
+
+def fmt_ms(values):
+    if not values:
+        return "      -"
+    return f"{sorted(values)[len(values) // 2] * 1000:7.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recognizer fixtures through MicToAzureStream')
+    parser.add_argument('fixtures', nargs='+', help='JSONL event timelines')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit non-zero on more duplicates, missed combinations or motion '
+                             'mismatches than the expected baseline')
+    parser.add_argument('--expected', default=EXPECTED_FILE, metavar='FILE',
+                        help='Known per-fixture counts for --check (default replay_fixtures/expected.json)')
+    parser.add_argument('--verbose', action='store_true', help='Show handler output')
+    parser.add_argument('--adaptive', nargs='?', const='', metavar='STATS',
+                        help='Use one AdaptiveDebounce for all fixtures (optionally seeded from / saved to STATS)')
+    parser.add_argument('--target-false-rate', type=float, default=DEFAULT_TARGET_FALSE_RATE)
+    parser.add_argument('--rounds', type=int, default=1, help='Replay the fixture list this many times')
+    parser.add_argument('--stream-segments', action='store_true',
+                        help='Run "then"-terminated segments before the final (as speech_control)')
+    parser.add_argument('--stable-partials', type=int, default=sc.DEFAULT_STABLE_PARTIALS, metavar='N',
+                        help=f'With --stream-segments: partials a group must stay unchanged '
+                             f'(default {sc.DEFAULT_STABLE_PARTIALS})')
+    args = parser.parse_args()
+
+    debounce = None
+    if args.adaptive is not None:
+        debounce = AdaptiveDebounce(sc.PARTIAL_DEBOUNCE_SECS, sc.AND_COMMAND_TIMEOUT_SECS,
+                                    args.target_false_rate, args.adaptive or None)
+
+    expected = load_expected(args.expected)
+    stream_segments = args.stable_partials if args.stream_segments else None
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for round_no in range(1, args.rounds + 1):
+            if args.rounds > 1:
+                print(f"\nRound {round_no}")
+            print(f"{'fixture':<28}{'utt':>4}{'tgt':>5}{'onset ms':>9}{'final ms':>9}"
+                  f"{'dup':>5}{'missed':>7}{'mismatch':>9}{'wait ms':>9}")
+            for path in args.fixtures:
+                r = replay_fixture(path, workdir, args.verbose, debounce, stream_segments)
+                print(f"{r['fixture']:<28}{r['utterances']:>4}{r['targets']:>5}"
+                      f"{fmt_ms(r['onset_latency']):>9}{fmt_ms(r['final_latency']):>9}"
+                      f"{r['duplicates']:>5}{r['missed_combinations']:>7}{len(r['mismatches']):>9}"
+                      f"{fmt_ms(r['waits']):>9}")
+                for text, expected, actual in r["mismatches"]:
+                    print(f"    [WARN] '{text}': expected {expected}, published {actual}")
+                worse = regressions(r, expected)
+                if worse:
+                    print(f"    [WARN] worse than expected: {', '.join(worse)}")
+                    failed = True
+
+    if debounce is not None:
+        print(f"\n{'timer':<13}{'shape':<22}{'n':>4}{'unsafe':>8}{'wait ms':>9}{'false rate':>12}")
+        for kind, shape, n, unsafe, delay, rate in debounce.summary():
+            rate_text = "-" if rate is None else f"{rate:.2f}"
+            print(f"{kind:<13}{shape:<22}{n:>4}{unsafe:>8}{delay * 1000:>9.0f}{rate_text:>12}")
+        debounce.close()
+
+    sc.disk_writer.close()
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
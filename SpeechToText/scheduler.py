@@ -0,0 +1,92 @@
+"""
+Timer Scheduler
+===============
+One long-lived thread for deferred callbacks, replacing a threading.Timer
+(and so a new OS thread) per debounce / and-timeout.
+
+  scheduler = TimerScheduler()
+  handle = scheduler.call_later(0.3, fn, arg)
+  handle.cancel()          # no-op if it already ran
+  scheduler.close()
+
+Pending calls live in a heap ordered by due time (time.monotonic()).
+Cancelled entries stay in the heap and are skipped when they come due.
+Callbacks run one at a time on the scheduler thread, so they should be
+short; an exception in one is printed and does not stop the others.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+
+class TimerHandle:
+    __slots__ = ("due", "callback", "args", "cancelled")
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerScheduler:
+    def __init__(self, name: str = "timer-scheduler"):
+        self._heap = []  # (due, seq, handle)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay: float, callback, *args) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + delay, callback, args)
+        with self._cond:
+            if self._closed:
+                handle.cancelled = True
+                return handle
+            heapq.heappush(self._heap, (handle.due, next(self._seq), handle))
+            # Only wake the thread if this is now the earliest deadline
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        handle = heapq.heappop(self._heap)[2]
+                        break
+                    self._cond.wait(wait)
+
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                print("[WARN] Scheduled callback failed:")
+                traceback.print_exc()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, h in self._heap if not h.cancelled)
+
+    def close(self):
+        """Stop the thread; calls that have not fired yet are dropped."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
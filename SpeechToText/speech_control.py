@@ -10,10 +10,16 @@ Central implementation combining:
 - Qualitative distance handling in normal mode (new)
 - Duplicate execution prevention
 - Position persistence with Unity
+- One asyncio event loop coordinating recognizer events, timers, dispatch and acks (async_core.py)
 
 Usage:
   python speech_control.py              # Normal mode - assumes default measurements
   python speech_control.py --precise    # Precise mode - prompts for measurements if not given
+  python speech_control.py --replay replay_fixtures/and_combination.jsonl   # offline, no mic/Azure
+  python speech_control.py --waypoints --lookahead 1   # run every "then" step, paced by Unity acks
+  python speech_control.py --waypoints --simplify 0.005   # thin dense shapes before dispatch
+  python speech_control.py --stream-segments --waypoints   # run "X then ..." before the sentence ends
+  python speech_control.py --arbiter    # share the robot with cli_control.py via arbiter.py
 
 Commands:
   "move right"           -> moves 1.0 unit right (or prompts in --precise mode)
@@ -21,20 +27,20 @@ Commands:
   "move right 5"         -> moves 5 units right
   "move right and up"    -> diagonal movement (combines into single move)
   "move right then up"   -> sequential movements (two separate moves)
+  "draw a square 10 cm"  -> shape traced as waypoints (see path_generator.py; use --waypoints)
   "stop" / "halt"        -> emergency shutdown
 
 Note: gripper commands are not supported in this version.
 """
 
 import argparse
-import queue
+import asyncio
 import threading
 import time
 import sys
 import json
 import re
 import os
-from collections import deque
 from datetime import datetime
 
 # Global start time for relative timestamps
@@ -48,22 +54,37 @@ def get_timestamp():
     elapsed = time.time() - _start_time
     return f"[{elapsed:7.3f}s]"
 
-import numpy as np
-import sounddevice as sde
-import webrtcvad
-import azure.cognitiveservices.speech as speechsdk
 from dotenv import load_dotenv
 
+from ack_watcher import AckWatcher
+from arbiter import ArbiterClient, add_arbiter_args
+from adaptive_debounce import (AND_TIMEOUT, DEFAULT_TARGET_FALSE_RATE, DELAY_BOUNDS, PARTIAL,
+                               AdaptiveDebounce, FixedDebounce)
+from asr_log import AsrLogWriter
+from async_core import DispatchLane, LoopScheduler, LoopThread, threadsafe, wait_for_event
+from audio_ring import AudioRing, SpeechGate
+from coalescer import MoveCoalescer, add_coalesce_args
+from command_journal import CommandHistory, DiskWriter
+from command_parser import DIRECTIONS, DEFAULT_STABLE_PARTIALS, ParseCache, StreamingParser, normalize_command
+from path_generator import (DEFAULT_CHORD_TOLERANCE, is_shape_command, parse_shape, shape_records,
+                            split_shape_sentence)
+from path_simplify import PathSimplifier, add_simplify_args
+from position_state import PositionState, TimedLock
+from recognizers import NO_MATCH, RECOGNIZED, AzureRecognizer, ReplayRecognizer
+from tracing import DEBOUNCE_FIRE, FINAL, FIRST_PARTIAL, PARSE_DONE, Tracer
+from transport import FileTransport, add_transport_args, make_transport
+from waypoint_dispatcher import WaypointDispatcher, add_waypoint_args
+from workspace import WorkspaceValidator, add_workspace_args
+
+# Audio/Azure packages (sounddevice, webrtcvad, azure.cognitiveservices.speech)
+# are imported where they are used, so replay mode runs without them.
+
 load_dotenv()
 
 # CONFIG
-DISTANCE_SCALE = 0.1
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 
-if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION:
-    raise RuntimeError("Missing Azure Speech credentials. Check your .env file.")
-
 # Audio params
 SAMPLE_RATE = 16000
 CHANNELS = 1
@@ -75,6 +96,7 @@ BYTES_PER_SAMPLE = 2
 VAD_MODE = 2
 PRE_SPEECH_FRAMES = 10
 SILENCE_TIMEOUT_SECS = 0.6
+SILENCE_TIMEOUT_FRAMES = int(SILENCE_TIMEOUT_SECS * 1000 / FRAME_DURATION_MS)
 
 # Partial recognition debounce (wait for more text before executing)
 PARTIAL_DEBOUNCE_SECS = 0.5  # Wait 500ms to see if more text arrives
@@ -97,17 +119,40 @@ EMERGENCY_WORDS = ["stop", "halt", "emergency", "quit", "exit"]
 
 # Command queue file
 COMMAND_QUEUE_FILE = "../UnityProject/tcp_commands.json"
+JOURNAL_FILE = COMMAND_QUEUE_FILE.replace('.json', '_journal.jsonl')
+ACK_FILE = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
 LOG_FILE = "asr_log.jsonl"
+TRACE_FILE = "latency_trace.jsonl"
+DEBOUNCE_STATS_FILE = "debounce_stats.json"
 
 import pathlib
 pathlib.Path(COMMAND_QUEUE_FILE).parent.mkdir(parents=True, exist_ok=True)
 
 # Global state
-command_queue = []
-queue_lock = threading.Lock()
 emergency_halt = threading.Event()
-current_position = {"x": 0.0, "y": 0.567, "z": -0.24}
-position_lock = threading.Lock()
+# Commanded position: an immutable snapshot, read without a lock and
+# replaced by one compare-and-swap per command (position_state.py)
+position_state = PositionState({"x": 0.0, "y": 0.567, "z": -0.24})
+disk_writer = DiskWriter()
+# Recent commands in memory; the full history is in the journal segments
+command_history = CommandHistory(JOURNAL_FILE, disk_writer)
+asr_log = AsrLogWriter(LOG_FILE)
+tracer = Tracer()  # no-op unless --trace
+dispatcher = None  # WaypointDispatcher with --waypoints
+coalescer = None  # MoveCoalescer with --coalesce
+simplifier = None  # PathSimplifier with --simplify
+parse_cache = ParseCache()  # parsed ops per distinct phrase
+validator = None  # WorkspaceValidator unless --no-workspace-check
+arbiter = None  # ArbiterClient with --arbiter
+dispatch_lane = None  # DispatchLane while main() runs the event loop
+# Confirmed (acked) position next to the commanded position_state
+ack_watcher = None
+transport = FileTransport(COMMAND_QUEUE_FILE, disk_writer)
+
+# Targets are published outside every lock; the snapshot generation keeps
+# a stale target from overwriting a newer one
+publish_lock = TimedLock("publish")
+_published_generation = 0
 
 # Precise mode state (for --precise flag)
 PRECISE_MODE = False
@@ -118,8 +163,6 @@ pending_command_lock = threading.Lock()
 
 def load_current_position():
     """Load the current position from tcp_commands.json or tcp_ack.json."""
-    global current_position
-
     # Try tcp_commands.json first
     try:
         if os.path.exists(COMMAND_QUEUE_FILE):
@@ -128,166 +171,32 @@ def load_current_position():
                 if content:
                     pos = json.loads(content)
                     if 'x' in pos and 'y' in pos and 'z' in pos:
-                        with position_lock:
-                            current_position = {"x": pos["x"], "y": pos["y"], "z": pos["z"]}
-                        print(f"[OK] Loaded position from tcp_commands.json: {current_position}")
+                        position_state.set(pos)
+                        print(f"[OK] Loaded position from tcp_commands.json: {position_state.position.copy()}")
                         return True
     except Exception as e:
         print(f"[WARN] Could not load from tcp_commands.json: {e}")
 
     # Try tcp_ack.json as fallback
-    ack_file = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
     try:
-        if os.path.exists(ack_file):
-            with open(ack_file, 'r') as f:
+        if os.path.exists(ACK_FILE):
+            with open(ACK_FILE, 'r') as f:
                 content = f.read().strip()
                 if content:
                     ack = json.loads(content)
                     if 'position' in ack:
                         pos = ack['position']
                         if 'x' in pos and 'y' in pos and 'z' in pos:
-                            with position_lock:
-                                current_position = {"x": pos["x"], "y": pos["y"], "z": pos["z"]}
-                            print(f"[OK] Loaded position from tcp_ack.json: {current_position}")
+                            position_state.set(pos)
+                            print(f"[OK] Loaded position from tcp_ack.json: {position_state.position.copy()}")
                             return True
     except Exception as e:
         print(f"[WARN] Could not load from tcp_ack.json: {e}")
 
-    print(f"[INFO] Using default position: {current_position}")
+    print(f"[INFO] Using default position: {position_state.position.copy()}")
     return False
 
 
-def split_into_commands(text: str):
-    """
-    Split a sentence into multiple movement commands.
-    Returns a list of tuples: (command_text, combine_with_previous)
-    - 'and' -> combine with previous (blend movements into diagonal)
-    - 'then' -> execute sequentially (separate movements)
-    """
-    text = text.lower()
-
-    # First, split by 'then' separators (sequential execution)
-    sequential_separators = [
-        r'\s+and\s+then\s+',
-        r'\s+then\s+',
-        r',\s*then\s+',
-        r'\s+after\s+that\s+',
-        r'\s+next\s+'
-    ]
-
-    for sep in sequential_separators:
-        text = re.sub(sep, '|THEN|', text)
-
-    # Split by 'and' (combine movements)
-    text = re.sub(r'\s+and\s+', '|AND|', text)
-
-    # Handle commas (treat as sequential by default)
-    text = re.sub(r',\s*', '|THEN|', text)
-
-    # Split and parse
-    parts = [p.strip() for p in text.split('|') if p.strip()]
-    commands = []
-
-    for i, part in enumerate(parts):
-        if part in ['THEN', 'AND']:
-            continue
-
-        combine = False
-        if i > 0 and parts[i-1] == 'AND':
-            combine = True
-
-        commands.append((part, combine))
-
-    return commands
-
-
-def has_measurement(text: str) -> bool:
-    """Check if the text contains a measurement (number or qualitative)."""
-    text_lower = text.lower()
-
-    # Check for explicit numbers
-    if re.search(r'\d+(?:\.\d+)?', text_lower):
-        return True
-
-    # Check for qualitative measurements
-    qualitative = ["little bit", "slightly", "bit", "tiny", "teensy", "small", "large", "big", "lot"]
-    if any(word in text_lower for word in qualitative):
-        return True
-
-    return False
-
-
-def get_direction_from_text(text: str) -> str:
-    """Extract the direction from a movement command."""
-    text_lower = text.lower()
-
-    if "right" in text_lower:
-        return "right"
-    if "left" in text_lower:
-        return "left"
-    if "up" in text_lower or "upward" in text_lower:
-        return "up"
-    if "down" in text_lower or "downward" in text_lower:
-        return "down"
-    if "forward" in text_lower or "ahead" in text_lower:
-        return "forward"
-    if "backward" in text_lower or "back" in text_lower:
-        return "backward"
-
-    return None
-
-
-def parse_movement_command(text: str):
-    """Parse natural language movement commands and return delta values."""
-    text_lower = text.lower()
-    default_distance = 1.0
-
-    number_match = re.search(r'(\d+(?:\.\d+)?)', text_lower)
-    distance = float(number_match.group(1)) if number_match else default_distance
-
-    # Qualitative distances (only apply if no explicit number was given)
-    if not number_match:
-        if "tiny" in text_lower or "teensy" in text_lower or "small" in text_lower:
-            distance = 0.3
-        elif "little bit" in text_lower or "slightly" in text_lower or "bit" in text_lower:
-            distance = 0.5
-        elif "large" in text_lower or "big" in text_lower or "lot" in text_lower:
-            distance = 2.0
-
-    if "centimeter" in text_lower or "cm" in text_lower:
-        distance /= 10.0
-    elif "millimeter" in text_lower or "mm" in text_lower:
-        distance /= 100.0
-
-    delta = {"x": 0.0, "y": 0.0, "z": 0.0}
-    scaled_distance = round(distance * DISTANCE_SCALE, 4)
-
-    found_direction = False
-    if "right" in text_lower:
-        delta["x"] = scaled_distance
-        found_direction = True
-    if "left" in text_lower:
-        delta["x"] = -scaled_distance
-        found_direction = True
-    if "up" in text_lower or "upward" in text_lower:
-        delta["y"] = scaled_distance
-        found_direction = True
-    if "down" in text_lower or "downward" in text_lower:
-        delta["y"] = -scaled_distance
-        found_direction = True
-    if "forward" in text_lower or "ahead" in text_lower:
-        delta["z"] = scaled_distance
-        found_direction = True
-    if "backward" in text_lower or "back" in text_lower:
-        delta["z"] = -scaled_distance
-        found_direction = True
-
-    if not found_direction:
-        return None
-
-    return delta
-
-
 def apply_delta_to_position(position: dict, delta: dict) -> dict:
     """Apply a delta to a position and return the new position."""
     return {
@@ -297,11 +206,12 @@ def apply_delta_to_position(position: dict, delta: dict) -> dict:
     }
 
 
-def process_multi_command_sentence(text: str, skip_measurement_check: bool = False):
+def process_multi_command_sentence(text: str, skip_measurement_check: bool = False, start=None):
     """
     Process a sentence that may contain multiple movement commands.
     Handles 'and' (combine) and 'then' (sequential).
     In --precise mode, prompts for measurement if not given.
+    Moves start at the current position unless start is given.
     """
     global pending_command_direction
 
@@ -323,151 +233,298 @@ def process_multi_command_sentence(text: str, skip_measurement_check: bool = Fal
                     print(f"{get_timestamp()} [WARN] No number detected. Please say a number.")
                     return []
 
-    commands = split_into_commands(text)
+    shape = parse_shape(text)
+    if shape is not None:
+        pieces = split_shape_sentence(text)
+        if len(pieces) > 1:
+            return process_mixed_sentence(pieces)
+        return process_shape_command(shape, start)
+
+    commands = parse_cache.parse(text)
     positions = []
 
-    with position_lock:
-        temp_position = current_position.copy()
-        accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
-        accumulated_text = []
+    # Parsed against one snapshot; add_positions_to_queue rebases if it moves on
+    snap = position_state.snapshot
+    temp_position = (snap.position if start is None else start).copy()
+    accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
+    accumulated_text = []
 
-        for i, (cmd, combine) in enumerate(commands):
-            # Check for missing measurement in precise mode
-            if not skip_measurement_check and PRECISE_MODE and not has_measurement(cmd):
-                direction = get_direction_from_text(cmd)
-                if direction:
-                    print(f"\n{get_timestamp()} Command '{cmd}' is missing a measurement.")
-                    print(f"{get_timestamp()} How much? (Say a number like 5, 10, or 15)")
+    for i, (cmd, combine, delta, direction, measured) in enumerate(commands):
+        # Check for missing measurement in precise mode
+        if not skip_measurement_check and PRECISE_MODE and not measured:
+            if direction:
+                print(f"\n{get_timestamp()} Command '{cmd}' is missing a measurement.")
+                print(f"{get_timestamp()} How much? (Say a number like 5, 10, or 15)")
 
-                    with pending_command_lock:
-                        pending_command_direction = direction
-                        awaiting_measurement.set()
+                with pending_command_lock:
+                    pending_command_direction = direction
+                    awaiting_measurement.set()
 
-                    return []
+                return []
 
-            delta = parse_movement_command(cmd)
-            if not delta:
-                continue
+        if not delta:
+            continue
+
+        if combine:
+            # Combine with previous (diagonal movement)
+            accumulated_delta["x"] += delta["x"]
+            accumulated_delta["y"] += delta["y"]
+            accumulated_delta["z"] += delta["z"]
+            accumulated_text.append(cmd)
+            print(f"  Combining: '{cmd}' -> delta{delta}")
+
+            is_last = (i == len(commands) - 1)
+            next_is_separate = not is_last and not commands[i+1].combine
+
+            if is_last or next_is_separate:
+                temp_position = apply_delta_to_position(temp_position, accumulated_delta)
+                combined_text = " and ".join(accumulated_text)
+                positions.append({
+                    "position": temp_position.copy(),
+                    "command_text": combined_text,
+                    "delta": accumulated_delta.copy()
+                })
+                print(f"  [+] Combined movement: {accumulated_delta}")
+                print(f"     Position: x={temp_position['x']:.3f}, y={temp_position['y']:.3f}, z={temp_position['z']:.3f}")
+
+                accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
+                accumulated_text = []
+        else:
+            # Sequential command
+            if accumulated_text:
+                temp_position = apply_delta_to_position(temp_position, accumulated_delta)
+                combined_text = " and ".join(accumulated_text)
+                positions.append({
+                    "position": temp_position.copy(),
+                    "command_text": combined_text,
+                    "delta": accumulated_delta.copy()
+                })
+                print(f"  [+] Combined movement: {accumulated_delta}")
+                accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
+                accumulated_text = []
+
+            # Start new accumulator with this command
+            accumulated_delta = delta.copy()
+            accumulated_text = [cmd]
+
+            # If this is the last command, flush it
+            if i == len(commands) - 1:
+                temp_position = apply_delta_to_position(temp_position, accumulated_delta)
+                positions.append({
+                    "position": temp_position.copy(),
+                    "command_text": cmd,
+                    "delta": delta
+                })
+                print(f"  Sequential: '{cmd}' -> delta{delta}")
+                print(f"     Position: x={temp_position['x']:.3f}, y={temp_position['y']:.3f}, z={temp_position['z']:.3f}")
+
+    for p in positions:
+        p["generation"] = snap.generation
+
+    if not reachable(positions):
+        return []
+    if positions:
+        tracer.mark(PARSE_DONE, commands=len(positions))
+    return positions
+
+
+def process_shape_command(shape, start=None):
+    """Expand a drawing command into waypoints starting at the current position (or start)."""
+    snap = position_state.snapshot
+    positions = shape_records(shape, snap.position if start is None else start, DEFAULT_CHORD_TOLERANCE)
+    for p in positions:
+        p["generation"] = snap.generation
+    end = positions[-1]["position"]
+    print(f"  Shape: {shape.kind} ({shape.size:.3f} m) -> {len(positions)} waypoint(s)")
+    print(f"     End: x={end['x']:.3f}, y={end['y']:.3f}, z={end['z']:.3f}")
+    if not reachable(positions):
+        return []
+    if dispatcher is None:
+        print(f"{get_timestamp()} [WARN] Without --waypoints only the shape's end point is published")
+    tracer.mark(PARSE_DONE, commands=len(positions))
+    return positions
 
-            if combine:
-                # Combine with previous (diagonal movement)
-                accumulated_delta["x"] += delta["x"]
-                accumulated_delta["y"] += delta["y"]
-                accumulated_delta["z"] += delta["z"]
-                accumulated_text.append(cmd)
-                print(f"  Combining: '{cmd}' -> delta{delta}")
-
-                is_last = (i == len(commands) - 1)
-                next_is_separate = not is_last and not commands[i+1][1]
-
-                if is_last or next_is_separate:
-                    temp_position = apply_delta_to_position(temp_position, accumulated_delta)
-                    combined_text = " and ".join(accumulated_text)
-                    positions.append({
-                        "position": temp_position.copy(),
-                        "command_text": combined_text,
-                        "delta": accumulated_delta.copy()
-                    })
-                    print(f"  [+] Combined movement: {accumulated_delta}")
-                    print(f"     Position: x={temp_position['x']:.3f}, y={temp_position['y']:.3f}, z={temp_position['z']:.3f}")
-
-                    accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
-                    accumulated_text = []
-            else:
-                # Sequential command
-                if accumulated_text:
-                    temp_position = apply_delta_to_position(temp_position, accumulated_delta)
-                    combined_text = " and ".join(accumulated_text)
-                    positions.append({
-                        "position": temp_position.copy(),
-                        "command_text": combined_text,
-                        "delta": accumulated_delta.copy()
-                    })
-                    print(f"  [+] Combined movement: {accumulated_delta}")
-                    accumulated_delta = {"x": 0.0, "y": 0.0, "z": 0.0}
-                    accumulated_text = []
-
-                # Start new accumulator with this command
-                accumulated_delta = delta.copy()
-                accumulated_text = [cmd]
-
-                # If this is the last command, flush it
-                if i == len(commands) - 1:
-                    temp_position = apply_delta_to_position(temp_position, accumulated_delta)
-                    positions.append({
-                        "position": temp_position.copy(),
-                        "command_text": cmd,
-                        "delta": delta
-                    })
-                    print(f"  Sequential: '{cmd}' -> delta{delta}")
-                    print(f"     Position: x={temp_position['x']:.3f}, y={temp_position['y']:.3f}, z={temp_position['z']:.3f}")
 
+def process_mixed_sentence(pieces: list):
+    """Shapes and moves in one sentence: each piece starts where the previous one ended."""
+    snap = position_state.snapshot
+    start = snap.position
+    positions = []
+    for piece, shape in pieces:
+        if shape is not None:
+            records = process_shape_command(shape, start)
+        else:
+            # Measurement prompts (--precise) are for plain movement sentences
+            records = process_multi_command_sentence(piece, skip_measurement_check=True, start=start)
+        if not records:
+            # Every piece has a move, so this one was rejected: drop the whole sentence
+            return []
+        positions.extend(records)
+        start = records[-1]["position"]
+    for p in positions:
+        p["generation"] = snap.generation
     return positions
 
 
+def reachable(positions: list) -> bool:
+    """Check every target against the workspace grid; reject the whole command if one fails."""
+    if validator is None:
+        return True
+    for p in positions:
+        verdict = validator.check(p["position"])
+        if not verdict.ok:
+            pos = p["position"]
+            print(f"{get_timestamp()} [WARN] Rejected '{p['command_text']}': "
+                  f"({pos['x']:.3f}, {pos['y']:.3f}, {pos['z']:.3f}) is {verdict.reason}")
+            return False
+    return True
+
+
 def add_positions_to_queue(positions: list):
-    """Add multiple positions to the command queue and update current position."""
-    global command_queue, current_position
+    """Journal the commands, commit the new position and publish its target.
 
+    The commit is one compare-and-swap on position_state; the parse, the
+    journal records and the publish are all done outside the swap lock.
+    """
     if not positions:
         return
+    if arbiter is not None:
+        dispatch(submit_to_arbiter, positions)
+        return
+
+    while True:
+        snap = position_state.snapshot
+        if positions[0].get("generation", snap.generation) != snap.generation:
+            # Another commit landed since the parse: replay the steps from there
+            positions = rebase_positions(positions, snap)
+            if not reachable(positions):
+                return
+        timestamp = datetime.now().isoformat()
+        commands = [{
+            "timestamp": timestamp,
+            "command_type": "move",
+            "position": pos_data["position"],
+            "delta": pos_data["delta"],
+            "text": pos_data["command_text"]
+        } for pos_data in positions]
+        # Journal writes are only enqueued - the disk writer thread does the I/O
+        committed = position_state.commit(snap, positions[-1]["position"],
+                                          lambda _: command_history.extend(commands))
+        if committed is not None:
+            break
+    queue_total = len(command_history)
+
+    targets = [p["position"] for p in positions]
+    if simplifier is not None:
+        targets = simplifier.simplify(snap.position, targets)
+    if coalescer is not None:
+        coalescer.submit(targets, snap.position)
+    elif dispatcher is not None:
+        dispatcher.submit(targets)
+    else:
+        dispatch(save_command_queue, committed.position.copy(), committed.generation)
+    print(f"{get_timestamp()} [OK] Added {len(positions)} command(s) | Queue total: {queue_total}")
+
+
+def rebase_positions(positions: list, snap) -> list:
+    """Re-walk parsed records' deltas from a newer snapshot."""
+    position = snap.position.copy()
+    rebased = []
+    for pos_data in positions:
+        position = apply_delta_to_position(position, pos_data["delta"])
+        rebased.append(dict(pos_data, position=position, generation=snap.generation))
+    return rebased
 
-    with queue_lock:
-        with position_lock:
-            for pos_data in positions:
-                command = {
-                    "timestamp": datetime.now().isoformat(),
-                    "command_type": "move",
-                    "position": pos_data["position"],
-                    "delta": pos_data["delta"],
-                    "text": pos_data["command_text"]
-                }
-                command_queue.append(command)
-
-            current_position = positions[-1]["position"].copy()
-
-        save_command_queue()
-        print(f"{get_timestamp()} [OK] Added {len(positions)} command(s) | Queue total: {len(command_queue)}")
-
-
-def save_command_queue():
-    """Save only the latest command to JSON file (overwrites previous)."""
-    with open(COMMAND_QUEUE_FILE, 'w') as f:
-        if command_queue:
-            latest_move = None
-            for cmd in reversed(command_queue):
-                if cmd["command_type"] == "move":
-                    latest_move = cmd["position"]
-                    break
-
-            if latest_move:
-                output = {
-                    "x": latest_move["x"],
-                    "y": latest_move["y"],
-                    "z": latest_move["z"],
-                }
-                json.dump(output, f, indent=2)
-                print(f"{get_timestamp()}    Written to JSON: {output}")
-            else:
-                output = {
-                    "x": current_position["x"],
-                    "y": current_position["y"],
-                    "z": current_position["z"],
-                }
-                json.dump(output, f, indent=2)
-                print(f"{get_timestamp()}    Written to JSON: {output}")
-        else:
-            json.dump({}, f)
 
-    # Keep detailed log separately
-    detailed_file = COMMAND_QUEUE_FILE.replace('.json', '_detailed.json')
-    with open(detailed_file, 'w') as f:
-        json.dump({
-            "commands": command_queue,
-            "total_commands": len(command_queue),
-            "emergency_halt": emergency_halt.is_set(),
-            "current_position": current_position
-        }, f, indent=2)
+def dispatch(fn, *args):
+    """Run a publishing call on the dispatch task's worker, or inline without the event loop."""
+    if dispatch_lane is not None:
+        dispatch_lane.submit(fn, *args)
+    else:
+        fn(*args)
+
+
+def submit_to_arbiter(positions: list):
+    """Send the relative steps to the arbiter, which journals, validates and publishes."""
+    try:
+        reply = arbiter.submit(positions)
+    except OSError as e:
+        print(f"{get_timestamp()} [WARN] Arbiter unreachable: {e}")
+        return
+    if not reply.get("ok"):
+        print(f"{get_timestamp()} [WARN] Arbiter rejected: {reply.get('reason')}")
+        return
+    # Journaled locally too, with the targets the arbiter applied
+    timestamp = datetime.now().isoformat()
+    command_history.extend({
+        "timestamp": timestamp,
+        "command_type": "move",
+        "position": target,
+        "delta": pos_data["delta"],
+        "text": pos_data["command_text"],
+        "order": reply["order"],
+    } for pos_data, target in zip(positions, reply["positions"]))
+    position = position_state.set(reply["positions"][-1]).position.copy()
+    tracer.target_published(position)
+    print(f"{get_timestamp()} [OK] Added {len(positions)} command(s) as #{reply['order']} | "
+          f"Position: {position}")
+
+
+def save_command_queue(target: dict, generation: int):
+    """Publish the latest target (overwrites previous). No lock is held while it is sent."""
+    global _published_generation
+
+    with publish_lock:
+        # A newer target was already published, or is committed and queued to be
+        if generation <= _published_generation or generation < position_state.snapshot.generation:
+            return
+        _published_generation = generation
+
+    output = {
+        "x": target["x"],
+        "y": target["y"],
+        "z": target["z"],
+    }
+    transport.publish(output)
+    tracer.target_published(output)
+    if ack_watcher is not None:
+        ack_watcher.note_commanded(output)
+    print(f"{get_timestamp()}    Published via {transport.kind}: {output}")
+
+
+def publish_coalesced(targets: list):
+    """MoveCoalescer emit callback (on the loop): hand a merged burst to the publisher."""
+    if dispatcher is not None:
+        dispatcher.submit(targets)
+        return
+    # The burst ends at the newest committed position
+    dispatch(save_command_queue, targets[-1], position_state.snapshot.generation)
+
+
+def publish_waypoint(message: dict):
+    """WaypointDispatcher publish callback (on the loop): the write goes to the dispatch task."""
+    dispatch(send_waypoint, message)
+
+
+def send_waypoint(message: dict):
+    transport.publish(message)
+    tracer.target_published({a: message[a] for a in ("x", "y", "z")})
+    if ack_watcher is not None:
+        ack_watcher.note_commanded(message)
+    ahead = f" (+{len(message['waypoints'])} ahead)" if message.get("waypoints") else ""
+    print(f"{get_timestamp()}    Published waypoint via {transport.kind}: "
+          f"x={message['x']:.3f}, y={message['y']:.3f}, z={message['z']:.3f}{ahead}")
+
+
+async def watch_acks(acks: asyncio.Queue):
+    """Ack task: acks handed in from the watcher thread release the next waypoint in order."""
+    while True:
+        ack, detected_at = await acks.get()
+        # Queued ahead of the waypoint this ack releases, so the tracer
+        # attributes the ack before it sees the next target
+        dispatch(tracer.on_ack, ack, detected_at)
+        if dispatcher is not None:
+            dispatcher.on_ack(ack, detected_at)
 
 
 def check_for_emergency_words(text: str) -> bool:
@@ -484,128 +541,172 @@ def emergency_shutdown():
     print("\n" + "="*60)
     print("*** EMERGENCY SHUTDOWN TRIGGERED ***")
     print("="*60)
+    disk_writer.flush(timeout=0.5)
+    asr_log.flush(timeout=0.5)
+    tracer.close()
     os._exit(0)
 
 
 class MicToAzureStream:
-    def __init__(self, speech_key, region, stop_event):
+    def __init__(self, speech_key, region, stop_event, recognizer=None, debounce=None,
+                 stream_segments=None, loop=None):
         self.stop_event = stop_event
         self.last_partial_text = ""
         self.last_partial_time = 0
         self.pending_partial_timer = None
         self.pending_and_timer = None
         self.executed_in_partial = ""
-        self.partial_lock = threading.Lock()
-
-        self.push_stream = speechsdk.audio.PushAudioInputStream()
-        audio_format = speechsdk.audio.AudioStreamFormat(
-            samples_per_second=SAMPLE_RATE,
-            bits_per_sample=16,
-            channels=CHANNELS
-        )
-        audio_input = speechsdk.audio.AudioConfig(stream=self.push_stream)
-
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=region)
-        speech_config.output_format = speechsdk.OutputFormat.Simple
-        speech_config.speech_recognition_language = "en-US"
-
-        # Balanced endpoint detection
-        speech_config.set_property(
-            speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs, "500"
-        )
-        speech_config.set_property(
-            speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs, "500"
-        )
-        speech_config.set_property(
-            speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs, "3000"
-        )
-
-        self.recognizer = speechsdk.SpeechRecognizer(
-            speech_config=speech_config,
-            audio_config=audio_input
-        )
-
-        self.recognizer.recognizing.connect(self._on_recognizing)
-        self.recognizer.recognized.connect(self._on_recognized)
-        self.recognizer.canceled.connect(self._on_canceled)
-        self.recognizer.session_started.connect(lambda evt: print("[Session started]"))
-        self.recognizer.session_stopped.connect(lambda evt: print("[Session stopped]"))
-
-        self._apply_phrase_list(self.recognizer)
-        self.recognizer.start_continuous_recognition()
-        print("Azure recognizer started (continuous).")
-
-    def _apply_phrase_list(self, recognizer):
-        try:
-            plist = speechsdk.PhraseListGrammar.from_recognizer(recognizer)
-            for p in PHRASE_LIST:
-                plist.addPhrase(p)
-            print("Applied phrase list boosting:", PHRASE_LIST)
-        except Exception as e:
-            print("Could not apply phrase list:", e)
+        # Recognizer events and debounce / and-timeout timers all run on one
+        # asyncio loop, so the state above is never shared between threads.
+        # Without a loop (replay_harness.py) one is started on a thread.
+        self._loop_thread = None
+        if loop is None:
+            self._loop_thread = LoopThread("speech-loop")
+            loop = self._loop_thread.loop
+        self.loop = loop
+        self.scheduler = LoopScheduler(loop)
+        # Chooses each timer's delay (fixed constants unless --adaptive-debounce)
+        self.debounce = debounce or FixedDebounce(PARTIAL_DEBOUNCE_SECS, AND_COMMAND_TIMEOUT_SECS)
+        # With --stream-segments: groups finished by "then" run before the final
+        self.stream_parser = StreamingParser(stream_segments) if stream_segments else None
+        self.streamed = []
+        self.stream_blocked = False
+
+        # Per-utterance stats for the ASR log
+        self.partial_count = 0
+        self.first_partial_time = None
+        self.executions = []
+        self.missed_combinations = 0
+
+        if recognizer is None:
+            recognizer = AzureRecognizer(speech_key, region, SAMPLE_RATE, CHANNELS, PHRASE_LIST)
+        self.recognizer = recognizer
+        self._post_recognizing = threadsafe(loop, self._on_recognizing)
+        self._post_recognized = threadsafe(loop, self._on_recognized)
+        self.recognizer.connect(self._hand_off_recognizing, self._hand_off_recognized,
+                                threadsafe(loop, self._on_canceled))
+        self.recognizer.start()
 
     def write_audio(self, pcm_bytes: bytes):
-        try:
-            self.push_stream.write(pcm_bytes)
-        except Exception as e:
-            print("Error writing audio:", e)
+        self.recognizer.write_audio(pcm_bytes)
 
     def stop(self):
-        try:
-            self.recognizer.stop_continuous_recognition()
-        except Exception:
-            pass
-        try:
-            self.push_stream.close()
-        except Exception:
-            pass
-
-    def _execute_and_timeout(self, captured_text):
-        """Execute an 'and' command after timeout - we waited long enough for final."""
-        with self.partial_lock:
-            if self.executed_in_partial:
-                return
+        """Stop from a thread other than the loop's."""
+        self.recognizer.stop()
+        if self._loop_thread is not None:
+            self._loop_thread.call(self.scheduler.close)
+            self._loop_thread.close()
+        else:
+            threadsafe(self.loop, self.scheduler.close)()
+
+    async def aclose(self):
+        """Stop from the loop: the recognizer's blocking stop runs off the loop."""
+        await asyncio.to_thread(self.recognizer.stop)
+        self.scheduler.close()
+
+    # ── SDK threads -> loop ───────────────────────────────────────────────────
+    # The emergency check runs on the recognizer thread, before the hand-off,
+    # so a halt never waits behind events already queued on the loop.
+    def _hand_off_recognizing(self, evt):
+        if check_for_emergency_words(evt.result.text):
+            print(f"\n*** [EMERGENCY HALT] - TERMINATING NOW! ***")
+            emergency_shutdown()
+        self._post_recognizing(evt)
 
-            if not captured_text or len(captured_text.strip()) < 3:
+    def _hand_off_recognized(self, evt):
+        if evt.result.reason == RECOGNIZED and check_for_emergency_words(evt.result.text):
+            print(f"*** [EMERGENCY HALT] - TERMINATING! ***")
+            emergency_shutdown()
+        self._post_recognized(evt)
+
+    def _record_execution(self, text, source):
+        """Note an executed command for this utterance's log record."""
+        started = self.first_partial_time or time.time()
+        self.executions.append({
+            "text": text,
+            "source": source,
+            "after_first_partial_secs": round(time.time() - started, 3),
+        })
+
+    def _reset_utterance_stats(self):
+        self.partial_count = 0
+        self.first_partial_time = None
+        self.executions = []
+        self.streamed = []
+        self.stream_blocked = False
+        if self.stream_parser is not None:
+            self.stream_parser.reset()
+
+    def _stream_stable_groups(self, text):
+        """Run command groups the streaming parser reports finished and stable."""
+        for group in self.stream_parser.feed(text):
+            if self.stream_blocked:
                 return
-
+            if self.executed_in_partial and not self.streamed:
+                # A debounced partial already ran; adopt it only if it is this group
+                if normalize_command(self.executed_in_partial) != group.text:
+                    self.stream_blocked = True
+                    return
+                self.streamed.append(group)
+                continue
             print()
-            print(f"{get_timestamp()} AND TIMEOUT: Executing after {AND_COMMAND_TIMEOUT_SECS}s wait")
-            print(f"{get_timestamp()} EXEC (timeout): '{captured_text}'")
-
-            positions = process_multi_command_sentence(captured_text)
+            print(f"{get_timestamp()} EXEC STREAM: '{group.text}'")
+            positions = process_multi_command_sentence(group.text)
             if positions:
                 add_positions_to_queue(positions)
-                print(f"{get_timestamp()} -> Robot executing (and-timeout)!\n")
-                self.executed_in_partial = captured_text
+                print(f"{get_timestamp()} -> Robot executing streamed segment!\n")
+                self._record_execution(group.text, "stream")
+            self.streamed.append(group)
+            self.executed_in_partial = text[:group.end]
 
-    def _execute_partial_command(self, captured_text):
-        """Execute a partial command after debounce delay."""
-        with self.partial_lock:
-            # Don't execute if text NOW contains connectors
-            current_partial = self.last_partial_text.lower()
-            has_connector_current = ' and ' in current_partial or ' then ' in current_partial
-            if has_connector_current:
-                return
+    def _execute_and_timeout(self, captured_text, waited=AND_COMMAND_TIMEOUT_SECS):
+        """Execute an 'and' command after timeout - we waited long enough for final."""
+        tracer.mark(DEBOUNCE_FIRE, timer="and_timeout")
+        if self.executed_in_partial:
+            return
 
-            captured_lower = captured_text.lower()
-            has_connector_captured = ' and ' in captured_lower or ' then ' in captured_lower
-            if has_connector_captured:
-                return
+        if not captured_text or len(captured_text.strip()) < 3:
+            return
 
-            if captured_text == self.executed_in_partial:
-                return
+        print()
+        print(f"{get_timestamp()} AND TIMEOUT: Executing after {waited:.2f}s wait")
+        print(f"{get_timestamp()} EXEC (timeout): '{captured_text}'")
 
-            if self.executed_in_partial and captured_text.lower().strip() in self.executed_in_partial.lower():
-                return
+        positions = process_multi_command_sentence(captured_text)
+        if positions:
+            add_positions_to_queue(positions)
+            print(f"{get_timestamp()} -> Robot executing (and-timeout)!\n")
+            self.executed_in_partial = captured_text
+            self._record_execution(captured_text, "and_timeout")
 
-            positions = process_multi_command_sentence(captured_text)
-            if positions:
-                print()
-                print(f"{get_timestamp()} EXEC PARTIAL: '{captured_text}'")
-                add_positions_to_queue(positions)
-                print(f"{get_timestamp()} -> Robot executing partial command!\n")
-                self.executed_in_partial = captured_text
+    def _execute_partial_command(self, captured_text):
+        """Execute a partial command after debounce delay."""
+        tracer.mark(DEBOUNCE_FIRE, timer="partial")
+        # Don't execute if text NOW contains connectors
+        current_partial = self.last_partial_text.lower()
+        has_connector_current = ' and ' in current_partial or ' then ' in current_partial
+        if has_connector_current:
+            return
+
+        captured_lower = captured_text.lower()
+        has_connector_captured = ' and ' in captured_lower or ' then ' in captured_lower
+        if has_connector_captured:
+            return
+
+        if captured_text == self.executed_in_partial:
+            return
+
+        if self.executed_in_partial and captured_text.lower().strip() in self.executed_in_partial.lower():
+            return
+
+        positions = process_multi_command_sentence(captured_text)
+        if positions:
+            print()
+            print(f"{get_timestamp()} EXEC PARTIAL: '{captured_text}'")
+            add_positions_to_queue(positions)
+            print(f"{get_timestamp()} -> Robot executing partial command!\n")
+            self.executed_in_partial = captured_text
+            self._record_execution(captured_text, "partial")
 
     def _on_recognizing(self, evt):
         """Handle partial recognition with debouncing to avoid duplicate execution."""
@@ -614,139 +715,179 @@ class MicToAzureStream:
         if len(text) > 0:
             print(f"\r{get_timestamp()} [Partial] {text}", end='', flush=True)
 
-        if check_for_emergency_words(text):
-            print(f"\n*** [EMERGENCY HALT] - TERMINATING NOW! ***")
-            emergency_shutdown()
+        self.partial_count += 1
+        if self.first_partial_time is None:
+            self.first_partial_time = time.time()
+            tracer.mark(FIRST_PARTIAL)
+        now = time.monotonic()
+        self.debounce.observe_partial(text, now)
 
-        with self.partial_lock:
-            if self.pending_partial_timer:
-                self.pending_partial_timer.cancel()
-                self.pending_partial_timer = None
+        if self.pending_partial_timer:
+            self.pending_partial_timer.cancel()
+            self.pending_partial_timer = None
 
-            text_lower_check = text.lower()
-            has_connector = ' and ' in text_lower_check or ' then ' in text_lower_check
+        if self.stream_parser is not None:
+            self._stream_stable_groups(text)
 
-            if has_connector:
-                self.last_partial_text = text
+        # Drawing commands wait for the final result: "draw a circle
+        # radius 5" may still be followed by "cm" or "flat"
+        if is_shape_command(text):
+            self.last_partial_text = text
+            return
 
-                if self.pending_and_timer:
-                    self.pending_and_timer.cancel()
-                self.pending_and_timer = threading.Timer(
-                    AND_COMMAND_TIMEOUT_SECS,
-                    self._execute_and_timeout,
-                    args=[text]
-                )
-                self.pending_and_timer.start()
-                return
+        text_lower_check = text.lower()
+        has_connector = ' and ' in text_lower_check or ' then ' in text_lower_check
 
-            # Skip if text ends with incomplete words
-            text_lower = text.lower().strip()
-            incomplete_endings = [' and', ' then', ' and then', ' to', ' the', ' a', ' move', ' go']
-            for ending in incomplete_endings:
-                if text_lower.endswith(ending):
-                    self.last_partial_text = text
-                    return
+        if has_connector:
+            self.last_partial_text = text
 
-            # Skip partial execution if phrase ends with a direction word (wait for "and X")
-            direction_words = ['right', 'left', 'up', 'down', 'forward', 'forwards',
-                              'backward', 'backwards', 'back', 'upward', 'upwards',
-                              'downward', 'downwards']
-            words = text_lower.split()
-            if words and words[-1] in direction_words:
-                if len(words) <= 4:
-                    self.last_partial_text = text
-                    return
+            if self.pending_and_timer:
+                self.pending_and_timer.cancel()
+            delay = self.debounce.delay_for(text, AND_TIMEOUT, now)
+            self.pending_and_timer = self.scheduler.call_later(
+                delay, self._execute_and_timeout, text, delay
+            )
+            return
+
+        # Skip if text ends with incomplete words
+        text_lower = text.lower().strip()
+        incomplete_endings = [' and', ' then', ' and then', ' to', ' the', ' a', ' move', ' go']
+        for ending in incomplete_endings:
+            if text_lower.endswith(ending):
+                self.last_partial_text = text
+                return
 
-            # Process with debounce
-            if text != self.last_partial_text and len(text) > 3:
-                if text != self.executed_in_partial:
-                    self.pending_partial_timer = threading.Timer(
-                        PARTIAL_DEBOUNCE_SECS,
-                        self._execute_partial_command,
-                        args=[text]
-                    )
-                    self.pending_partial_timer.start()
+        # Skip partial execution if phrase ends with a direction word (wait for "and X")
+        direction_words = ['right', 'left', 'up', 'down', 'forward', 'forwards',
+                          'backward', 'backwards', 'back', 'upward', 'upwards',
+                          'downward', 'downwards']
+        words = text_lower.split()
+        if words and words[-1] in direction_words:
+            if len(words) <= 4:
+                self.last_partial_text = text
+                return
 
-            self.last_partial_text = text
+        # Process with debounce
+        if text != self.last_partial_text and len(text) > 3:
+            if text != self.executed_in_partial:
+                delay = self.debounce.delay_for(text, PARTIAL, now)
+                self.pending_partial_timer = self.scheduler.call_later(
+                    delay, self._execute_partial_command, text
+                )
+
+        self.last_partial_text = text
 
     def _on_recognized(self, evt):
-        if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
+        if evt.result.reason == RECOGNIZED:
             text = evt.result.text
             timestamp = time.time()
+            tracer.mark(FINAL)
             print(f"\n\n{get_timestamp()} [FINAL] {text}")
 
-            with self.partial_lock:
-                if self.pending_partial_timer:
-                    self.pending_partial_timer.cancel()
-                    self.pending_partial_timer = None
-                if self.pending_and_timer:
-                    self.pending_and_timer.cancel()
-                    self.pending_and_timer = None
-
-                if check_for_emergency_words(text):
-                    print(f"*** [EMERGENCY HALT] - TERMINATING! ***")
-                    emergency_shutdown()
-
-                executed = self.executed_in_partial.lower().strip() if self.executed_in_partial else ""
-                final_text = text.lower().strip().rstrip('.')
-
-                if executed:
-                    executed_clean = executed.rstrip('.')
-                    if final_text == executed_clean or final_text.startswith(executed_clean):
-                        remaining = final_text[len(executed_clean):].strip()
-
-                        was_and_command = remaining.startswith('and ')
-
-                        for prefix in ['and ', 'then ', 'and to the ', 'to the ']:
-                            if remaining.startswith(prefix):
-                                remaining = remaining[len(prefix):]
-
-                        if remaining and len(remaining) > 2:
-                            if was_and_command:
-                                print(f"{get_timestamp()}   Partial already executed: '{executed}'")
-                                print(f"{get_timestamp()}   [WARN] Missed combination! Executing remaining separately: '{remaining}'")
-                                positions = process_multi_command_sentence(remaining)
-                                if positions:
-                                    add_positions_to_queue(positions)
-                                    print(f"{get_timestamp()} -> Final (remaining) commands sent!\n")
-                            else:
-                                print(f"{get_timestamp()}   Partial already executed: '{executed}'")
-                                print(f"{get_timestamp()}   Processing remaining: '{remaining}'")
-                                positions = process_multi_command_sentence(remaining)
-                                if positions:
-                                    add_positions_to_queue(positions)
-                                    print(f"{get_timestamp()} -> Final (remaining) commands sent!\n")
+            if self.pending_partial_timer:
+                self.pending_partial_timer.cancel()
+                self.pending_partial_timer = None
+            if self.pending_and_timer:
+                self.pending_and_timer.cancel()
+                self.pending_and_timer = None
+            self.debounce.resolve(text, time.monotonic())
+
+            executed = self.executed_in_partial.lower().strip() if self.executed_in_partial else ""
+            final_text = text.lower().strip().rstrip('.')
+
+            # Streamed groups are matched by their moves, not their text
+            streamed_rest = self.stream_parser.remaining_after(text) if self.streamed else None
+            if self.streamed and streamed_rest is None:
+                print(f"{get_timestamp()}   [WARN] Final no longer matches the streamed segments")
+
+            if streamed_rest is not None:
+                print(f"{get_timestamp()}   Streamed already: {[g.text for g in self.streamed]}")
+                if streamed_rest:
+                    print(f"{get_timestamp()}   Processing remaining: '{streamed_rest}'")
+                    positions = process_multi_command_sentence(streamed_rest)
+                    if positions:
+                        add_positions_to_queue(positions)
+                        self._record_execution(streamed_rest, "final_remaining")
+                        print(f"{get_timestamp()} -> Final (remaining) commands sent!\n")
+                else:
+                    print(f"{get_timestamp()}   Skipping (already streamed)\n")
+            elif executed:
+                executed_clean = executed.rstrip('.')
+                if final_text == executed_clean or final_text.startswith(executed_clean):
+                    remaining = final_text[len(executed_clean):].strip()
+
+                    was_and_command = remaining.startswith('and ')
+
+                    for prefix in ['and ', 'then ', 'and to the ', 'to the ']:
+                        if remaining.startswith(prefix):
+                            remaining = remaining[len(prefix):]
+
+                    if remaining and (len(remaining) > 2 or remaining in DIRECTIONS):
+                        if was_and_command:
+                            print(f"{get_timestamp()}   Partial already executed: '{executed}'")
+                            print(f"{get_timestamp()}   [WARN] Missed combination! Executing remaining separately: '{remaining}'")
+                            self.missed_combinations += 1
+                            positions = process_multi_command_sentence(remaining)
+                            if positions:
+                                add_positions_to_queue(positions)
+                                self._record_execution(remaining, "final_remaining")
+                                print(f"{get_timestamp()} -> Final (remaining) commands sent!\n")
                         else:
-                            print(f"{get_timestamp()}   Skipping (already executed in partial)\n")
+                            print(f"{get_timestamp()}   Partial already executed: '{executed}'")
+                            print(f"{get_timestamp()}   Processing remaining: '{remaining}'")
+                            positions = process_multi_command_sentence(remaining)
+                            if positions:
+                                add_positions_to_queue(positions)
+                                self._record_execution(remaining, "final_remaining")
+                                print(f"{get_timestamp()} -> Final (remaining) commands sent!\n")
                     else:
-                        print(f"{get_timestamp()} EXEC FINAL (different): '{text}'")
-                        positions = process_multi_command_sentence(text)
-                        if positions:
-                            add_positions_to_queue(positions)
-                            print(f"{get_timestamp()} -> Final commands sent!\n")
+                        print(f"{get_timestamp()}   Skipping (already executed in partial)\n")
                 else:
-                    print(f"{get_timestamp()} EXEC FINAL: '{text}'")
+                    print(f"{get_timestamp()} EXEC FINAL (different): '{text}'")
                     positions = process_multi_command_sentence(text)
                     if positions:
                         add_positions_to_queue(positions)
+                        self._record_execution(text, "final")
                         print(f"{get_timestamp()} -> Final commands sent!\n")
-
-                self.last_partial_text = ""
-                self.executed_in_partial = ""
-
-            with open(LOG_FILE, "a", encoding="utf-8") as fh:
-                record = {
-                    "timestamp": timestamp,
-                    "text": text,
-                    "command_queue_length": len(command_queue)
-                }
-                fh.write(json.dumps(record) + "\n")
-
-        elif evt.result.reason == speechsdk.ResultReason.NoMatch:
+            else:
+                print(f"{get_timestamp()} EXEC FINAL: '{text}'")
+                positions = process_multi_command_sentence(text)
+                if positions:
+                    add_positions_to_queue(positions)
+                    self._record_execution(text, "final")
+                    print(f"{get_timestamp()} -> Final commands sent!\n")
+
+            first_partial = self.first_partial_time
+            record = {
+                "timestamp": timestamp,
+                "text": text,
+                "command_queue_length": len(command_history),
+                "partial_count": self.partial_count,
+                "executed": self.executions,
+                # first partial -> final result, and -> first robot command
+                "final_latency_secs": round(timestamp - first_partial, 3) if first_partial else None,
+                "first_exec_latency_secs": self.executions[0]["after_first_partial_secs"] if self.executions else None,
+                "audio_offset_secs": evt.result.offset / 1e7,
+                "audio_duration_secs": evt.result.duration / 1e7,
+                "debounce": self.debounce.decisions_for_utterance(),
+            }
+
+            self.last_partial_text = ""
+            self.executed_in_partial = ""
+            self._reset_utterance_stats()
+            tracer.end_utterance()
+
+            # Enqueue only; the log writer thread does the file I/O
+            asr_log.log(record)
+
+        elif evt.result.reason == NO_MATCH:
             print("\n[No speech recognized]\n")
-            with self.partial_lock:
-                self.last_partial_text = ""
-                self.executed_in_partial = ""
+            self.debounce.resolve(None, time.monotonic())
+            self.debounce.decisions_for_utterance()
+            self.last_partial_text = ""
+            self.executed_in_partial = ""
+            self._reset_utterance_stats()
+            tracer.end_utterance()
 
     def _on_canceled(self, evt):
         print(f"[Canceled] Reason: {evt.reason}")
@@ -755,17 +896,24 @@ class MicToAzureStream:
 
 
 def mic_capture_thread(stream_writer: MicToAzureStream, stop_event):
-    q = queue.Queue()
+    import sounddevice as sde
+    import webrtcvad
+
+    ring = AudioRing(FRAME_SIZE * BYTES_PER_SAMPLE)
 
     def callback(indata, frames, time_info, status):
         if status:
             print(status)
-        q.put_nowait(bytes(indata))
+        ring.write(indata)
 
-    ring = deque(maxlen=PRE_SPEECH_FRAMES)
-    vad = webrtcvad.Vad(VAD_MODE)
-    voiced = False
-    silence_since = None
+    gate = SpeechGate(
+        webrtcvad.Vad(VAD_MODE),
+        SAMPLE_RATE,
+        PRE_SPEECH_FRAMES,
+        SILENCE_TIMEOUT_FRAMES,
+        stream_writer.write_audio,
+        on_onset=tracer.begin_utterance,
+    )
 
     with sde.RawInputStream(
         samplerate=SAMPLE_RATE,
@@ -779,53 +927,68 @@ def mic_capture_thread(stream_writer: MicToAzureStream, stop_event):
 
         try:
             while not stop_event.is_set():
-                try:
-                    pcm_bytes = q.get(timeout=0.1)
-                except queue.Empty:
-                    continue
-
-                if len(pcm_bytes) != FRAME_SIZE * BYTES_PER_SAMPLE:
-                    continue
-
-                is_speech = vad.is_speech(pcm_bytes, SAMPLE_RATE)
-                ring.append(pcm_bytes)
-
-                if is_speech:
-                    if not voiced:
-                        for pre in ring:
-                            stream_writer.write_audio(pre)
-                        voiced = True
-                        silence_since = None
-                    stream_writer.write_audio(pcm_bytes)
-                else:
-                    if voiced:
-                        if silence_since is None:
-                            silence_since = time.time()
-                        elif time.time() - silence_since > SILENCE_TIMEOUT_SECS:
-                            voiced = False
-                            silence_since = None
+                if ring.wait(0.1):
+                    gate.feed(ring)
 
         except KeyboardInterrupt:
             print("Mic capture interrupted.")
         except Exception as e:
             print("Exception in mic thread:", e)
 
+    if ring.overruns:
+        print(f"[WARN] Mic reader fell behind; dropped {ring.overruns} frames")
+
 
 def main():
-    global PRECISE_MODE
+    global PRECISE_MODE, transport, simplifier, validator, arbiter
 
     parser = argparse.ArgumentParser(description='Speech-to-Robot Control System')
     parser.add_argument('--precise', action='store_true',
                        help='Enable precise mode - prompts for measurements if not given')
+    parser.add_argument('--compress-logs', action='store_true',
+                       help='Gzip rotated ASR log files')
+    parser.add_argument('--replay', metavar='FIXTURE',
+                       help='Replay a recorded recognizer event timeline instead of mic + Azure')
+    parser.add_argument('--record-events', metavar='FILE',
+                       help='Record recognizer events to FILE (a replay fixture)')
+    parser.add_argument('--trace', nargs='?', const=TRACE_FILE, metavar='FILE',
+                       help=f'Write per-utterance latency spans (default {TRACE_FILE})')
+    parser.add_argument('--adaptive-debounce', nargs='?', const=DEBOUNCE_STATS_FILE, metavar='STATS',
+                       help=f'Tune debounce waits per command shape, keeping stats in STATS '
+                            f'(default {DEBOUNCE_STATS_FILE})')
+    parser.add_argument('--target-false-rate', type=float, default=DEFAULT_TARGET_FALSE_RATE,
+                       help='Adaptive debounce: acceptable rate of wrong early executions')
+    parser.add_argument('--stream-segments', action='store_true',
+                       help='Run segments finished by "then" once they stop changing, '
+                            'instead of waiting for the final')
+    parser.add_argument('--stable-partials', type=int, default=DEFAULT_STABLE_PARTIALS, metavar='N',
+                       help=f'With --stream-segments: partials a group must stay unchanged '
+                            f'(default {DEFAULT_STABLE_PARTIALS})')
+    add_transport_args(parser)
+    add_waypoint_args(parser)
+    add_coalesce_args(parser)
+    add_simplify_args(parser)
+    add_workspace_args(parser)
+    add_arbiter_args(parser)
     args = parser.parse_args()
 
+    if not args.replay and (not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION):
+        raise RuntimeError("Missing Azure Speech credentials. Check your .env file.")
+
     PRECISE_MODE = args.precise
+    asr_log.compress = args.compress_logs
+    transport = make_transport(args.transport, COMMAND_QUEUE_FILE, args.address, disk_writer)
 
     print("="*60)
     print("Speech-to-Robot Control System")
     print("="*60)
     print(f"Emergency words: {EMERGENCY_WORDS}")
     print(f"Command file: {COMMAND_QUEUE_FILE}")
+    print(f"Transport: {'arbiter ' + args.arbiter if args.arbiter else transport.kind}")
+    if args.waypoints:
+        print(f"Waypoints: ack-paced, lookahead {args.lookahead}")
+    if args.coalesce is not None:
+        print(f"Coalescing: {args.coalesce * 1000:.0f} ms window")
     if PRECISE_MODE:
         print("Mode: PRECISE (will prompt for measurements)")
     else:
@@ -835,44 +998,148 @@ def main():
         print("  - 'large/big' = 2.0 units")
         print("  - No qualifier = 1.0 unit")
 
-    load_current_position()
-    print(f"Start position: {current_position}\n")
+    if args.arbiter:
+        try:
+            arbiter = ArbiterClient(args.arbiter, "voice").connect()
+        except OSError as e:
+            parser.error(f"cannot reach the arbiter at {args.arbiter}: {e}")
+        position_state.set(arbiter.position())
+    else:
+        load_current_position()
+    print(f"Start position: {position_state.position.copy()}\n")
+
+    if args.trace:
+        tracer.enable(args.trace)
+    if args.simplify is not None:
+        simplifier = PathSimplifier(args.simplify)
+    if not args.no_workspace_check and arbiter is None:
+        validator = WorkspaceValidator(args.workspace_grid, args.min_manipulability)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
 
+
+async def serve(args):
+    """Event-loop side of main(): every handler, timer and dispatch runs here."""
+    global ack_watcher, dispatch_lane, dispatcher, coalescer
+
+    loop = asyncio.get_running_loop()
     stop_event = threading.Event()
     stream_writer = None
+    debounce = None
+    dispatch_lane = DispatchLane()
+    # Waypoint ack timeouts and coalescing windows are loop timers too, so
+    # the dispatcher and coalescer are only ever touched on the loop
+    scheduler = LoopScheduler(loop)
+    if args.waypoints:
+        dispatcher = WaypointDispatcher(publish_waypoint, args.lookahead, args.ack_timeout,
+                                        scheduler=scheduler)
+    if args.coalesce is not None:
+        coalescer = MoveCoalescer(publish_coalesced, args.coalesce, args.collinear_tolerance,
+                                  keep_waypoints=args.waypoints, scheduler=scheduler)
+    acks = asyncio.Queue()
+    tasks = [loop.create_task(dispatch_lane.run(), name="dispatch"),
+             loop.create_task(watch_acks(acks), name="acks")]
+    post_ack = threadsafe(loop, acks.put_nowait)
+    ack_watcher = AckWatcher(ACK_FILE, on_ack=lambda ack, detected_at: post_ack((ack, detected_at))).start()
+    print(f"Watching {ACK_FILE} ({ack_watcher.backend})")
 
     try:
+        if args.replay:
+            recognizer = ReplayRecognizer(args.replay, record_to=args.record_events)
+        else:
+            recognizer = AzureRecognizer(AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, SAMPLE_RATE,
+                                         CHANNELS, PHRASE_LIST, record_to=args.record_events)
+
+        if args.adaptive_debounce:
+            debounce = AdaptiveDebounce(PARTIAL_DEBOUNCE_SECS, AND_COMMAND_TIMEOUT_SECS,
+                                        args.target_false_rate, args.adaptive_debounce)
+
         stream_writer = MicToAzureStream(
             speech_key=AZURE_SPEECH_KEY,
             region=AZURE_SPEECH_REGION,
-            stop_event=stop_event
+            stop_event=stop_event,
+            recognizer=recognizer,
+            debounce=debounce,
+            stream_segments=args.stable_partials if args.stream_segments else None,
+            loop=loop,
         )
 
-        mic_thread = threading.Thread(
-            target=mic_capture_thread,
-            args=(stream_writer, stop_event),
-            daemon=True
-        )
-        mic_thread.start()
-
-        print("Ready! Speak your commands...\n")
-
-        while not stop_event.is_set():
-            time.sleep(0.1)
-    except KeyboardInterrupt:
+        if args.replay:
+            print(f"Replaying {args.replay}...\n")
+            await wait_for_event(recognizer.done)
+            # Let pending debounce / and-timeout timers fire
+            and_timeout = DELAY_BOUNDS[AND_TIMEOUT][1] if debounce else AND_COMMAND_TIMEOUT_SECS
+            await asyncio.sleep(and_timeout + 0.5)
+        else:
+            def capture():
+                try:
+                    mic_capture_thread(stream_writer, stop_event)
+                finally:
+                    stop_event.set()
+
+            threading.Thread(target=capture, name="mic-capture", daemon=True).start()
+            print("Ready! Speak your commands...\n")
+            await wait_for_event(stop_event)
+    except asyncio.CancelledError:
         print("\nKeyboard interrupt...")
     finally:
-        if not stop_event.is_set():
-            stop_event.set()
+        stop_event.set()
         if stream_writer:
-            stream_writer.stop()
-        time.sleep(0.5)
-        print("\n" + "="*60)
-        print("Program stopped.")
-        print(f"Commands sent: {len(command_queue)}")
-        print(f"Final position: {current_position}")
-        print("="*60)
-
+            await stream_writer.aclose()
+        # The last coalesced burst and publishes already handed to the
+        # dispatch task still go out
+        if coalescer:
+            coalescer.flush()
+        try:
+            await asyncio.wait_for(dispatch_lane.drain(), 1.0)
+        except asyncio.TimeoutError:
+            print("[WARN] Dispatch queue not drained on shutdown")
+        for task in tasks:
+            task.cancel()
+        if debounce:
+            debounce.close()
+        if coalescer:
+            coalescer.close()
+        ack_watcher.stop()
+        if dispatcher:
+            dispatcher.close()
+        scheduler.close()
+        if arbiter:
+            arbiter.close()
+        transport.close()
+        disk_writer.close()
+        asr_log.close()
+        tracer.close()
+        await asyncio.sleep(0.5)
+        print_summary(stream_writer)
+
+
+def print_summary(stream_writer):
+    print("\n" + "="*60)
+    print("Program stopped.")
+    print(f"Commands sent: {len(command_history)}")
+    print(f"Final position: {position_state.position.copy()}")
+    if coalescer:
+        print(f"Coalescing: {coalescer.stats()}")
+    if simplifier:
+        print(f"Simplification: {simplifier.stats()}")
+    print(f"Parse cache: {parse_cache.stats()}")
+    if dispatch_lane:
+        print(f"Dispatch: {dispatch_lane.stats()}")
+    print(f"Locks: {position_state.swap_lock.report()}, {position_state.conflicts} swap conflict(s)")
+    print(f"       {publish_lock.report()}")
+    if stream_writer and stream_writer.stream_parser:
+        sp = stream_writer.stream_parser
+        print(f"Streaming parser: {sp.tokens_scanned} tokens scanned, {sp.rescans} revised partials, "
+              f"{sp.revised_after_release} segments revised after running")
+    print(f"Confirmed position: {ack_watcher.confirmed_position()} ({ack_watcher.ack_count} acks)")
+    moves = sorted(c["move_secs"] for c in ack_watcher.completions if c["move_secs"] is not None)
+    if moves:
+        print(f"Move time (publish -> ack): median {moves[len(moves) // 2]:.3f}s, max {moves[-1]:.3f}s")
+    print("="*60)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+"""
+Stand-in Receiver
+=================
+Local stand-in for the Unity end of transport.py.  Lets the Python side be
+run and benchmarked without Unity.
+
+  socket mode -- accepts any number of connections, reads length-prefixed
+                 target frames and acks each one on the same connection
+  file mode   -- polls tcp_commands.json by modification time every
+                 poll interval, like TCPHotController.WatchFile
+
+Usage:
+  python standin_receiver.py --transport tcp
+  python standin_receiver.py --transport unix --address /tmp/gofa_tcp.sock
+  python standin_receiver.py --transport file --poll-interval 0.1
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+
+from transport import add_transport_args, parse_address, recv_frame, send_frame
+
+COMMAND_QUEUE_FILE = "../UnityProject/tcp_commands.json"
+
+
+class SocketReceiver:
+    """Serves the socket transport and acks every target frame."""
+
+    def __init__(self, kind: str, address=None, on_target=None):
+        self.kind = kind
+        self.family, self.address = parse_address(kind, address)
+        self.on_target = on_target
+        self.received = []  # (perf_counter at receipt, message)
+        self._stop = threading.Event()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self.family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+        server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.address)
+        server.listen()
+        server.settimeout(0.2)
+        self._server = server
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            if self.family == socket.AF_INET:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                while not self._stop.is_set():
+                    msg = recv_frame(conn)
+                    if msg is None:
+                        break
+                    self.received.append((time.perf_counter(), msg))
+                    send_frame(conn, {"seq": msg.get("seq"), "ack": True})
+                    if self.on_target:
+                        self.on_target(msg.get("target"))
+            except (OSError, ValueError):
+                pass
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self.family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class FileReceiver:
+    """Polls the command file by mtime, like TCPHotController.WatchFile."""
+
+    def __init__(self, path: str, poll_interval: float = 0.1, on_target=None):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.on_target = on_target
+        self.received = []  # (perf_counter at pickup, target)
+        self._last_modified = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._last_modified = self._mtime()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch(self):
+        last_modified = self._last_modified
+        while not self._stop.wait(self.poll_interval):
+            current = self._mtime()
+            if current is None or current == last_modified:
+                continue
+            last_modified = current
+            try:
+                with open(self.path, 'r') as f:
+                    content = f.read().strip()
+                if not content:
+                    continue
+                target = json.loads(content)
+            except (OSError, ValueError):
+                continue
+            self.received.append((time.perf_counter(), target))
+            if self.on_target:
+                self.on_target(target)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+def make_receiver(kind: str, file_path: str, address=None, poll_interval: float = 0.1, on_target=None):
+    if kind == "file":
+        return FileReceiver(file_path, poll_interval, on_target)
+    return SocketReceiver(kind, address, on_target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in receiver for the target transport')
+    add_transport_args(parser)
+    parser.add_argument('--file', default=COMMAND_QUEUE_FILE,
+                        help='Command file to watch in file mode')
+    parser.add_argument('--poll-interval', type=float, default=0.1,
+                        help='File mode poll interval in seconds (Unity default 0.1)')
+    args = parser.parse_args()
+
+    def show(target):
+        print(f"[RECV] {target}")
+
+    receiver = make_receiver(args.transport, args.file, args.address, args.poll_interval, show)
+    receiver.start()
+    print(f"Stand-in receiver listening ({args.transport}). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+        print(f"\nReceived {len(receiver.received)} target(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+is_safe_to_execute: which early executions the adaptive debounce learns
+were safe.
+
+  python -m pytest SpeechToText/tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_debounce import is_safe_to_execute  # noqa: E402
+
+
+@pytest.mark.parametrize("candidate, final, safe", [
+    ("move right 1", "Move right 1.", True),
+    ("move left", "Move left, then down 3.", True),
+    ("move right", "Move right and up.", False),
+    ("move right 1", "move right 15", False),
+    ("move right 1", "Move right 15 and up.", False),
+    ("move up 2", "Move up 2.5.", False),
+    ("move left", "Move right.", False),
+])
+def test_is_safe_to_execute(candidate, final, safe):
+    assert is_safe_to_execute(candidate, final) is safe
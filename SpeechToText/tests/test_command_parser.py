@@ -0,0 +1,152 @@
+"""
+command_parser: the one parser behind speech_control, cli_control and the
+arbiter clients.  The tables pin the command forms the old per-entry-point
+regex parsing accepted; StreamingParser and ParseCache must give the same
+ops as a full parse_ops of the same text.
+
+  python -m pytest SpeechToText/tests
+"""
+
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from command_parser import (  # noqa: E402
+    ParseCache, StreamingParser, has_measurement, parse_movement_command, parse_ops,
+    split_into_commands,
+)
+
+
+def ops_summary(ops):
+    """(text, combine, (dx, dy, dz) or None, measured) per op."""
+    return [(op.text, op.combine, None if op.delta is None else tuple(op.delta.values()), op.measured)
+            for op in ops]
+
+
+def moves(ops):
+    """What an op list does, without the segment text."""
+    return [(op.combine, None if op.delta is None else tuple(op.delta.values())) for op in ops]
+
+
+@pytest.mark.parametrize("text, expected", [
+    # bare direction: 1 unit = 0.1 m
+    ("move right", [("move right", False, (0.1, 0.0, 0.0), False)]),
+    ("move upward", [("move upward", False, (0.0, 0.1, 0.0), False)]),
+    ("go ahead 3", [("go ahead 3", False, (0.0, 0.0, 0.3), True)]),
+    # numbers, decimals and punctuation from the recognizer
+    ("Move right 5.", [("move right 5", False, (0.5, 0.0, 0.0), True)]),
+    ("move right 0.5", [("move right 0.5", False, (0.05, 0.0, 0.0), True)]),
+    # a minus sign is ignored; the direction gives the sign, as before
+    ("move left -2", [("move left -2", False, (-0.2, 0.0, 0.0), True)]),
+    # units
+    ("move up 20 cm", [("move up 20 cm", False, (0.0, 0.2, 0.0), True)]),
+    ("move down 20 mm", [("move down 20 mm", False, (0.0, -0.02, 0.0), True)]),
+    ("move forward 2.5 centimeters", [("move forward 2.5 centimeters", False, (0.0, 0.0, 0.025), True)]),
+    # qualitative distances
+    ("move back a tiny bit", [("move back a tiny bit", False, (0.0, 0.0, -0.03), True)]),
+    ("move up slightly", [("move up slightly", False, (0.0, 0.05, 0.0), True)]),
+    ("move left a lot", [("move left a lot", False, (-0.2, 0.0, 0.0), True)]),
+    # "and" combines, every sequential connector splits
+    ("move right and up", [("move right", False, (0.1, 0.0, 0.0), False),
+                           ("up", True, (0.0, 0.1, 0.0), False)]),
+    ("move right then up", [("move right", False, (0.1, 0.0, 0.0), False),
+                            ("up", False, (0.0, 0.1, 0.0), False)]),
+    ("move right, up", [("move right", False, (0.1, 0.0, 0.0), False),
+                        ("up", False, (0.0, 0.1, 0.0), False)]),
+    ("move right and then up", [("move right", False, (0.1, 0.0, 0.0), False),
+                                ("up", False, (0.0, 0.1, 0.0), False)]),
+    ("move right after that up", [("move right", False, (0.1, 0.0, 0.0), False),
+                                  ("up", False, (0.0, 0.1, 0.0), False)]),
+    ("move right next up", [("move right", False, (0.1, 0.0, 0.0), False),
+                            ("up", False, (0.0, 0.1, 0.0), False)]),
+    ("move right 5 and up then back a tiny bit", [("move right 5", False, (0.5, 0.0, 0.0), True),
+                                                  ("up", True, (0.0, 0.1, 0.0), False),
+                                                  ("back a tiny bit", False, (0.0, 0.0, -0.03), True)]),
+    # unknown words are carried along but never move anything
+    ("please wiggle", [("please wiggle", False, None, False)]),
+    ("hello robot move right", [("hello robot move right", False, (0.1, 0.0, 0.0), False)]),
+    ("", []),
+])
+def test_parse_ops(text, expected):
+    assert ops_summary(parse_ops(text)) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "move right", "Move right 5.", "move left -2", "move up 20 cm", "move down 20 mm",
+    "move back a tiny bit", "move left a lot", "please wiggle",
+])
+def test_compatibility_helpers_match_parse_ops(text):
+    ops = parse_ops(text)
+    assert parse_movement_command(text) == ops[0].delta
+    assert split_into_commands(text) == [(op.text, op.combine) for op in ops]
+    assert has_measurement(text) == ops[0].measured
+
+
+PARTIALS = [
+    "move",
+    "move right 1",
+    "move right 15",          # a number still growing
+    "move right to",          # revised by the recognizer...
+    "move right 2 then",      # ...and back
+    "move right 2 then up",
+    "move right 2 then up and forward",
+    "move right 2 then up and forward then",
+    "move right 2 then up and forward then left",
+]
+FINAL = "Move right 2, then up and forward, then left."
+
+
+@pytest.mark.parametrize("stable_partials", [1, 2, 3])
+def test_streaming_parser_matches_full_parse(stable_partials):
+    parser = StreamingParser(stable_partials)
+    released = []
+    for partial in PARTIALS:
+        for group in parser.feed(partial):
+            assert moves(group.ops) == moves(parse_ops(group.text))
+            released.append(group)
+    assert released == parser.stable
+
+    rest = parser.remaining_after(FINAL)
+    assert rest is not None
+    streamed = [op for group in released for op in group.ops]
+    assert moves(streamed + parse_ops(rest)) == moves(parse_ops(FINAL))
+
+
+def test_streaming_parser_flags_a_revised_release():
+    parser = StreamingParser(1)
+    for partial in ("move right 2 then", "move right 2 then up"):
+        parser.feed(partial)
+    assert [g.text for g in parser.stable] == ["move right 2"]
+    assert parser.remaining_after("Move right 3, then up.") is None
+
+
+def test_parse_cache_hits_on_normalized_text():
+    cache = ParseCache()
+    first = cache.parse("move right 5 and up")
+    assert (cache.hits, cache.misses) == (0, 1)
+    again = cache.parse("  Move right 5 and  up. ")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ops_summary(first) == ops_summary(again) == ops_summary(parse_ops("move right 5 and up"))
+
+
+def test_parse_cache_hands_out_copies():
+    cache = ParseCache()
+    cache.parse("move right")[0].delta["x"] = 99.0
+    assert cache.parse("move right")[0].delta == {"x": 0.1, "y": 0.0, "z": 0.0}
+
+
+def test_parse_cache_evicts_least_recently_used():
+    cache = ParseCache(maxsize=2)
+    cache.parse("move right")
+    cache.parse("move up")
+    cache.parse("move right")      # hit: "move up" is now the oldest
+    cache.parse("move left")       # evicts "move up"
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.parse("move right")
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert ops_summary(cache.parse("move up")) == ops_summary(parse_ops("move up"))
+    assert (cache.hits, cache.misses) == (2, 4)
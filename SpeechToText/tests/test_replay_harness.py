@@ -0,0 +1,33 @@
+"""
+Replay harness runs must not see each other's output: two fixtures replayed
+in one invocation report the same stats as each fixture replayed alone.
+
+  python -m pytest SpeechToText/tests
+"""
+
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import replay_harness  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(HERE), "replay_fixtures")
+STATS = ("utterances", "targets", "duplicates", "missed_combinations", "waits")
+
+
+def stats(report):
+    return {key: report[key] for key in STATS} | {"mismatches": len(report["mismatches"])}
+
+
+def run(paths):
+    with tempfile.TemporaryDirectory() as workdir:
+        return [stats(replay_harness.replay_fixture(path, workdir)) for path in paths]
+
+
+def test_batch_stats_match_solo_runs():
+    paths = [os.path.join(FIXTURES, name) for name in ("then_sequence.jsonl", "simple_move.jsonl")]
+    solo = [run([path])[0] for path in paths]
+    assert run(paths) == solo
@@ -0,0 +1,31 @@
+"""
+Timing
+======
+Small timing helpers shared by the replayer, the stand-ins, the lock
+statistics and the benchmarks.
+
+  sleep_until(deadline)     # perf_counter deadline; sleeps, then spins the last SPIN_SECS
+  percentile(samples, 95)   # nearest-rank percentile, NaN when there are no samples
+"""
+
+import time
+
+# Sleep until this close to a deadline, then spin
+SPIN_SECS = 0.0005
+
+
+def sleep_until(deadline: float) -> None:
+    """Sleep to just before deadline (perf_counter), then spin to it."""
+    remaining = deadline - time.perf_counter()
+    if remaining > SPIN_SECS:
+        time.sleep(remaining - SPIN_SECS)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
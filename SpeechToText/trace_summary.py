@@ -0,0 +1,60 @@
+"""
+Trace Summary
+=============
+Prints p50/p95/p99 latency per pipeline stage from a tracing.py span file.
+
+For each stage the first occurrence per utterance is used:
+  since onset -- utterance onset -> stage
+  stage gap   -- previous recorded stage -> stage
+
+Usage:
+  python trace_summary.py latency_trace.jsonl
+  python trace_summary.py latency_trace.jsonl latency_trace.jsonl.1
+"""
+
+import argparse
+
+from command_journal import iter_journal
+from timing import percentile
+from tracing import STAGES
+
+
+def summarize(paths):
+    since_onset = {stage: [] for stage in STAGES}
+    gaps = {stage: [] for stage in STAGES}
+    seen = set()
+    utterances = set()
+
+    for path in paths:
+        for span in iter_journal(path):
+            key = (span["corr"], span["stage"])
+            utterances.add(span["corr"])
+            if key in seen:
+                continue
+            seen.add(key)
+            since_onset.setdefault(span["stage"], []).append(span["since_onset_ms"])
+            gaps.setdefault(span["stage"], []).append(span["since_prev_ms"])
+
+    return len(utterances), since_onset, gaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize latency trace spans')
+    parser.add_argument('paths', nargs='+', help='Span files written by --trace')
+    args = parser.parse_args()
+
+    count, since_onset, gaps = summarize(args.paths)
+    print(f"Utterances: {count}\n")
+    print(f"{'stage':<18}{'n':>6}  {'since onset (ms)':^26}  {'stage gap (ms)':^26}")
+    print(f"{'':<18}{'':>6}  {'p50':>8}{'p95':>9}{'p99':>9}  {'p50':>8}{'p95':>9}{'p99':>9}")
+    for stage, values in since_onset.items():
+        if not values:
+            continue
+        g = gaps[stage]
+        print(f"{stage:<18}{len(values):>6}  "
+              f"{percentile(values, 50):>8.1f}{percentile(values, 95):>9.1f}{percentile(values, 99):>9.1f}  "
+              f"{percentile(g, 50):>8.1f}{percentile(g, 95):>9.1f}{percentile(g, 99):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Latency Tracing
+===============
+Structured per-utterance latency spans for speech_control.py.
+
+Every utterance gets a correlation id when it starts (VAD speech onset, or
+the first partial if there was no VAD, e.g. in replay mode).  Each pipeline
+stage then records a span from that onset to the moment the stage happened:
+
+  vad_onset        -> speech detected in mic_capture_thread
+  first_partial    -> first Azure partial for the utterance
+  debounce_fire    -> partial-debounce / and-timeout timer fired
+  final            -> final recognition result
+  parse_done       -> command text parsed into positions
+  target_published -> target handed to the transport
+  ack              -> tcp_ack.json reported the target reached
+
+Spans go to a JSONL file through the batched AsrLogWriter, one line each:
+  {"corr": "u0003-5f1c", "stage": "parse_done", "t": 1718000000.12,
+   "since_onset_ms": 812.4, "since_prev_ms": 0.3}
+
+Summarize a trace with:  python trace_summary.py latency_trace.jsonl
+Tracing is off unless speech_control.py is started with --trace.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+from ack_watcher import positions_match
+from asr_log import AsrLogWriter
+
+VAD_ONSET = "vad_onset"
+FIRST_PARTIAL = "first_partial"
+DEBOUNCE_FIRE = "debounce_fire"
+FINAL = "final"
+PARSE_DONE = "parse_done"
+TARGET_PUBLISHED = "target_published"
+ACK = "ack"
+
+STAGES = (VAD_ONSET, FIRST_PARTIAL, DEBOUNCE_FIRE, FINAL, PARSE_DONE, TARGET_PUBLISHED, ACK)
+
+# Targets awaiting an ack (bounded for sessions without Unity running)
+MAX_PENDING_ACKS = 64
+
+
+class _Utterance:
+    __slots__ = ("corr", "onset", "last", "closed")
+
+    def __init__(self, corr, onset):
+        self.corr = corr
+        self.onset = onset
+        self.last = onset
+        self.closed = False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self._exporter = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._current = None
+        self._pending_acks = []  # (utterance, target) in publish order
+
+    def enable(self, path: str):
+        self._exporter = AsrLogWriter(path)
+        self.enabled = True
+        print(f"[OK] Latency tracing -> {path}")
+
+    def close(self):
+        self.enabled = False
+        if self._exporter is not None:
+            self._exporter.close()
+
+    def _new_utterance(self, now):
+        corr = f"u{next(self._ids):04d}-{os.urandom(2).hex()}"
+        utt = _Utterance(corr, now)
+        self._current = utt
+        return utt
+
+    def begin_utterance(self, stage=VAD_ONSET):
+        """Open a new utterance unless one is still waiting for its final."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            utt = self._current
+            if utt is not None and not utt.closed:
+                return utt.corr
+            utt = self._new_utterance(now)
+            self._emit(utt, stage, now, {})
+            return utt.corr
+
+    def mark(self, stage: str, **attrs):
+        """Record a stage for the current utterance (opening one if needed)."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            utt = self._current
+            if utt is None or utt.closed:
+                utt = self._new_utterance(now)
+            self._emit(utt, stage, now, attrs)
+
+    def end_utterance(self):
+        """Close the current utterance; its published targets can still be acked."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._current is not None:
+                self._current.closed = True
+
+    def target_published(self, target: dict):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            utt = self._current
+            if utt is None:
+                utt = self._new_utterance(now)
+            self._pending_acks.append((utt, dict(target)))
+            if len(self._pending_acks) > MAX_PENDING_ACKS:
+                del self._pending_acks[0]
+            self._emit(utt, TARGET_PUBLISHED, now, {"target": target})
+
+    def on_ack(self, ack: dict, detected_at: float):
+        """AckWatcher callback: attribute the ack to the target it reports."""
+        if not self.enabled:
+            return
+        pos = ack["position"]
+        with self._lock:
+            for i, (utt, target) in enumerate(self._pending_acks):
+                if positions_match(pos, target):
+                    # Unity cancels superseded moves, so earlier targets never ack
+                    del self._pending_acks[:i + 1]
+                    self._emit(utt, ACK, detected_at, {"target": target})
+                    return
+
+    def _emit(self, utt, stage, now, attrs):
+        record = {
+            "corr": utt.corr,
+            "stage": stage,
+            "t": time.time() - (time.monotonic() - now),
+            "since_onset_ms": round((now - utt.onset) * 1000, 3),
+            "since_prev_ms": round((now - utt.last) * 1000, 3),
+        }
+        record.update(attrs)
+        utt.last = max(utt.last, now)
+        self._exporter.log(record)
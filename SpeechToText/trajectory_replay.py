@@ -0,0 +1,289 @@
+"""
+Trajectory Replay
+=================
+Streams a recorded trajectory to Unity with accurate timing.
+
+Large trajectories are read without loading them into RAM: .npy files are
+memory-mapped and read in blocks, CSV files are memory-mapped and parsed a
+line at a time.  Columns are x, y, z (Unity frame, metres) with an
+optional t (seconds).  A CSV needs a header naming its columns; a bare
+numeric CSV or an .npy array is read as x,y,z (3 columns) or t,x,y,z (4).
+
+Pacing modes:
+  --rate HZ      fixed rate; point i is due at start + i / HZ
+  --timed [K]    the recorded t column, played K times faster (default 1)
+  --ack-paced    publish the next point once Unity acks the previous one
+
+Fixed-rate and timed replay schedule every point against an absolute
+deadline, so a late tick never pushes the rest of the trajectory back the
+way sleep(period) after each write does.  The scheduler sleeps until just
+before the deadline and spins the last timing.SPIN_SECS for sub-millisecond jitter.
+Targets are written inline rather than through a DiskWriter, which keeps
+only the newest pending target per batch: every point reported as
+published has reached the transport, and its time is taken once it has.
+
+The report gives the achieved rate, lateness against the schedule (jitter)
+and, in ack-paced mode, the wait for each ack.
+
+Usage:
+  python trajectory_replay.py recording.npy --rate 50
+  python trajectory_replay.py recording.csv --timed 2
+  python trajectory_replay.py recording.csv --ack-paced --transport tcp
+  python trajectory_replay.py ../UnityProject/tcp_writer.py --rate 0.5 --no-workspace-check
+"""
+
+import argparse
+import mmap
+import os
+import pathlib
+import time
+
+import numpy as np
+
+from ack_watcher import AckWatcher
+from path_simplify import load_points
+from timing import percentile, sleep_until
+from transport import add_transport_args, make_transport
+from workspace import WorkspaceValidator, add_workspace_args
+
+COMMAND_QUEUE_FILE = "../UnityProject/tcp_commands.json"
+ACK_FILE = COMMAND_QUEUE_FILE.replace('tcp_commands.json', 'tcp_ack.json')
+
+DEFAULT_RATE_HZ = 10.0
+DEFAULT_ACK_TIMEOUT_SECS = 5.0
+# Rows copied out of a memory-mapped .npy per read
+NPY_BLOCK_ROWS = 4096
+# Delay before the first point so setup does not count as lateness
+START_DELAY_SECS = 0.05
+
+_AXES = ("x", "y", "z")
+_TIME_COLUMNS = ("t", "time", "timestamp")
+
+
+# ── trajectory files ───────────────────────────────────────────────────────────
+def _columns(width: int):
+    if width == 3:
+        return None, (0, 1, 2)
+    if width == 4:
+        return 0, (1, 2, 3)
+    raise ValueError(f"expected 3 (x,y,z) or 4 (t,x,y,z) columns, got {width}")
+
+
+def _iter_npy(path):
+    data = np.load(path, mmap_mode="r")
+    if data.ndim != 2:
+        raise ValueError(f"{path}: expected a 2-D array, got shape {data.shape}")
+    t_col, xyz = _columns(data.shape[1])
+    for first in range(0, len(data), NPY_BLOCK_ROWS):
+        for row in np.asarray(data[first:first + NPY_BLOCK_ROWS], dtype=float).tolist():
+            yield (None if t_col is None else row[t_col]), {a: row[c] for a, c in zip(_AXES, xyz)}
+
+
+def _iter_csv(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            t_col, xyz = None, None
+            for raw in iter(mm.readline, b""):
+                line = raw.decode("utf-8").strip()
+                if not line or line.startswith("#"):
+                    continue
+                cells = [c.strip() for c in line.split(",")]
+                if xyz is None:
+                    try:
+                        values = [float(c) for c in cells]
+                    except ValueError:
+                        names = [c.lower() for c in cells]
+                        missing = [a for a in _AXES if a not in names]
+                        if missing:
+                            raise ValueError(f"{path}: header has no {', '.join(missing)} column")
+                        t_col = next((names.index(n) for n in _TIME_COLUMNS if n in names), None)
+                        xyz = tuple(names.index(a) for a in _AXES)
+                        continue
+                    t_col, xyz = _columns(len(values))
+                else:
+                    values = [float(c) for c in cells]
+                yield (None if t_col is None else values[t_col]), {a: values[c] for a, c in zip(_AXES, xyz)}
+
+
+def iter_trajectory(path: str):
+    """Yield (t, position) for each row; t is None without a time column.
+
+    .npy and .csv are streamed from a memory map; other formats go through
+    path_simplify.load_points and have no time column.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return _iter_npy(path)
+    if ext == ".csv":
+        return _iter_csv(path)
+    return ((None, dict(zip(_AXES, p))) for p in np.asarray(load_points(path), dtype=float).tolist())
+
+
+# ── scheduling ─────────────────────────────────────────────────────────────────
+def wait_for_new_ack(ack_watcher, position, acks_before, deadline) -> bool:
+    """Block until an ack newer than acks_before confirms position.
+
+    Neighbouring points of a dense trajectory lie within the ack match
+    tolerance of each other, so the previous point's ack must not count.
+    """
+    remaining = deadline - time.perf_counter()
+    return remaining > 0 and ack_watcher.wait_for_position(position, remaining, after_count=acks_before)
+
+
+class ReplayStats:
+    def __init__(self, mode: str, target_rate=None):
+        self.mode = mode
+        self.target_rate = target_rate
+        self.sent_at = []
+        self.lateness = []
+        self.ack_waits = []
+        self.ack_timeouts = 0
+        self.stopped = None
+
+    def report(self) -> str:
+        n = len(self.sent_at)
+        lines = [f"Replay ({self.mode}): {n} point(s) published"]
+        if self.stopped:
+            lines.append(f"  stopped early: {self.stopped}")
+        if n < 2:
+            return "\n".join(lines)
+        span = self.sent_at[-1] - self.sent_at[0]
+        achieved = (n - 1) / span if span > 0 else float("inf")
+        target = f" (target {self.target_rate:.3f} Hz)" if self.target_rate else ""
+        lines.append(f"  achieved rate {achieved:.3f} Hz over {span:.3f}s{target}")
+        if self.lateness:
+            late_ms = [v * 1000 for v in self.lateness]
+            lines.append(f"  jitter (lateness vs schedule): p50 {percentile(late_ms, 50):.3f} ms, "
+                         f"p95 {percentile(late_ms, 95):.3f} ms, p99 {percentile(late_ms, 99):.3f} ms, "
+                         f"max {max(late_ms):.3f} ms")
+        intervals = np.diff(self.sent_at) * 1000
+        lines.append(f"  interval: mean {intervals.mean():.3f} ms, std {intervals.std():.3f} ms")
+        if self.mode == "ack-paced":
+            wait_ms = [v * 1000 for v in self.ack_waits]
+            lines.append(f"  ack wait: p50 {percentile(wait_ms, 50):.1f} ms, "
+                         f"p95 {percentile(wait_ms, 95):.1f} ms, timeouts {self.ack_timeouts}")
+        return "\n".join(lines)
+
+
+def replay(points, publish, rate=None, speed=None, ack_watcher=None,
+           ack_timeout=DEFAULT_ACK_TIMEOUT_SECS, validator=None, limit=None) -> ReplayStats:
+    """Publish (t, position) points on a schedule.
+
+    rate: fixed Hz.  speed: play the recorded t column speed times faster.
+    ack_watcher: pace by acks instead (rate/speed ignored).
+    """
+    if ack_watcher is not None:
+        stats = ReplayStats("ack-paced")
+    elif speed is not None:
+        stats = ReplayStats(f"timed x{speed:g}")
+    else:
+        stats = ReplayStats("fixed rate", rate)
+    period = None if rate is None else 1.0 / rate
+    start = time.perf_counter() + START_DELAY_SECS
+    t_first = None
+
+    for i, (t, position) in enumerate(points):
+        if limit is not None and i >= limit:
+            break
+        if validator is not None:
+            verdict = validator.check(position)
+            if not verdict.ok:
+                stats.stopped = f"point {i} {position} is {verdict.reason}"
+                print(f"[WARN] Stopping replay: {stats.stopped}")
+                break
+
+        if ack_watcher is not None:
+            due = None
+        elif speed is not None:
+            if t is None:
+                raise ValueError("timed replay needs a t column")
+            if t_first is None:
+                t_first = t
+            due = start + (t - t_first) / speed
+        else:
+            due = start + i * period
+
+        if due is not None:
+            sleep_until(due)
+        else:
+            acks_before = ack_watcher.ack_count
+        publish(position)
+        sent = time.perf_counter()
+        stats.sent_at.append(sent)
+        if due is not None:
+            stats.lateness.append(sent - due)
+            continue
+
+        ack_watcher.note_commanded(position)
+        if not wait_for_new_ack(ack_watcher, position, acks_before, sent + ack_timeout):
+            stats.ack_timeouts += 1
+            stats.stopped = f"no ack for point {i} within {ack_timeout:.1f}s"
+            print(f"[WARN] Stopping replay: {stats.stopped}")
+            break
+        stats.ack_waits.append(time.perf_counter() - sent)
+    return stats
+
+
+# ── main ───────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded TCP trajectory with accurate timing')
+    parser.add_argument('path', help='Trajectory (.npy or .csv, streamed; .json/.jsonl/positions script loaded)')
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument('--rate', type=float, metavar='HZ',
+                        help=f'Fixed publish rate (default {DEFAULT_RATE_HZ:g} Hz)')
+    pacing.add_argument('--timed', type=float, nargs='?', const=1.0, metavar='SPEED',
+                        help='Follow the recorded t column, SPEED times faster (default 1)')
+    pacing.add_argument('--ack-paced', action='store_true',
+                        help="Publish each point once Unity acks the previous one")
+    parser.add_argument('--ack-timeout', type=float, default=DEFAULT_ACK_TIMEOUT_SECS, metavar='SECS',
+                        help='With --ack-paced: give up after SECS without an ack')
+    parser.add_argument('--limit', type=int, metavar='N', help='Publish at most N points')
+    parser.add_argument('--output', default=COMMAND_QUEUE_FILE, metavar='FILE',
+                        help='Command file for the file transport (and fallback)')
+    add_transport_args(parser)
+    add_workspace_args(parser)
+    args = parser.parse_args()
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.timed is not None and args.timed <= 0:
+        parser.error("--timed speed must be positive")
+
+    pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    transport = make_transport(args.transport, args.output, args.address)
+    validator = None
+    if not args.no_workspace_check:
+        validator = WorkspaceValidator(args.workspace_grid, args.min_manipulability)
+    ack_watcher = None
+    if args.ack_paced:
+        ack_file = os.path.join(os.path.dirname(args.output), os.path.basename(ACK_FILE))
+        ack_watcher = AckWatcher(ack_file).start()
+        print(f"Acks: {ack_watcher.backend} on {ack_file}")
+
+    def publish(position):
+        transport.publish({a: round(position[a], 4) for a in _AXES})
+
+    rate = None
+    if args.timed is None and not args.ack_paced:
+        rate = args.rate if args.rate is not None else DEFAULT_RATE_HZ
+    print(f"Replaying {args.path} via {transport.kind}")
+    try:
+        stats = replay(iter_trajectory(args.path), publish, rate=rate, speed=args.timed,
+                       ack_watcher=ack_watcher, ack_timeout=args.ack_timeout,
+                       validator=validator, limit=args.limit)
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted")
+        stats = None
+    finally:
+        if ack_watcher is not None:
+            ack_watcher.stop()
+        transport.close()
+    if stats is not None:
+        print(stats.report())
+    if validator is not None:
+        print(f"Workspace: {validator.stats()}")
+
+
+if __name__ == "__main__":
+    main()
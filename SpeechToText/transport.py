@@ -0,0 +1,245 @@
+"""
+Target Transport
+================
+Pluggable channel for publishing TCP targets to the Unity side.
+
+  file  -- atomically replace tcp_commands.json; Unity polls it (default)
+  tcp   -- length-prefixed JSON frames over a local TCP socket
+  unix  -- the same framing over a Unix-domain socket
+  egm   -- no Unity hop: stream EGM corrections to the controller (egm.py)
+
+Frame format: 4-byte big-endian payload length followed by a UTF-8 JSON
+payload.  Every target frame carries a sequence number and the receiver
+answers on the same connection with an ack frame:
+
+  -> {"seq": 7, "target": {"x": 0.1, "y": 0.567, "z": -0.24}}
+  <- {"seq": 7, "ack": true}
+
+If a socket transport cannot reach its receiver it falls back to the file
+transport, so a session never loses its output channel.
+"""
+
+import json
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from command_journal import atomic_write_json
+
+DEFAULT_TCP_ADDRESS = "127.0.0.1:6601"
+DEFAULT_UNIX_ADDRESS = "/tmp/gofa_tcp.sock"
+TRANSPORT_KINDS = ("file", "tcp", "unix", "egm")
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 1 << 20
+# Send times / round trips kept for wait_ack(); speech_control never waits,
+# so older sequence numbers are dropped rather than kept for the session
+ACK_HISTORY = 256
+
+
+# ── framing ────────────────────────────────────────────────────────────────────
+def encode_frame(message: dict) -> bytes:
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _recv_exact(sock, size: int) -> Optional[bytes]:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:], size - got)
+        if n == 0:
+            return None
+        got += n
+    return bytes(buf)
+
+
+def recv_frame(sock) -> Optional[dict]:
+    """Read one frame; returns None when the peer closed the connection."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame too large: {length} bytes")
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def send_frame(sock, message: dict):
+    sock.sendall(encode_frame(message))
+
+
+def parse_address(kind: str, address: Optional[str]):
+    """Turn a CLI address string into a socket family and address."""
+    if kind == "tcp":
+        host, _, port = (address or DEFAULT_TCP_ADDRESS).rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    if kind == "unix":
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix-domain sockets are not available on this platform")
+        return socket.AF_UNIX, address or DEFAULT_UNIX_ADDRESS
+    raise ValueError(f"Not a socket transport: {kind}")
+
+
+# ── transports ─────────────────────────────────────────────────────────────────
+class FileTransport:
+    """Replaces the command file with each target (the original channel).
+
+    With a DiskWriter the write is queued to its background thread;
+    without one it is done inline.  Either way it is an atomic rename.
+    """
+
+    kind = "file"
+
+    def __init__(self, path: str, writer=None):
+        self.path = path
+        self.writer = writer
+        self.seq = 0
+
+    def publish(self, target: dict) -> int:
+        self.seq += 1
+        if self.writer is not None:
+            self.writer.write_json(self.path, target)
+        else:
+            atomic_write_json(self.path, target)
+        return self.seq
+
+    def wait_ack(self, seq: int, timeout: float = 1.0) -> Optional[float]:
+        """The file channel has no delivery ack; Unity only acks arrival."""
+        return None
+
+    def close(self):
+        pass
+
+
+class SocketTransport:
+    """Streams targets as length-prefixed frames and collects acks.
+
+    Acks are read by a background thread on the same connection;
+    wait_ack() blocks on a condition until the matching seq arrives and
+    returns its round-trip time in seconds.
+    """
+
+    def __init__(self, kind: str, address: Optional[str] = None,
+                 fallback: Optional[FileTransport] = None, connect_timeout: float = 1.0):
+        self.kind = kind
+        self.family, self.address = parse_address(kind, address)
+        self.fallback = fallback
+        self.connect_timeout = connect_timeout
+        self.seq = 0
+        self.sock = None
+        self._send_lock = threading.Lock()
+        self._ack_cond = threading.Condition()
+        self._sent_at = OrderedDict()
+        self._rtt = OrderedDict()
+        self._reader = None
+
+    def _connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        sock.connect(self.address)
+        sock.settimeout(None)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self._reader = threading.Thread(target=self._read_acks, args=(sock,), daemon=True)
+        self._reader.start()
+        print(f"[OK] Connected {self.kind} transport: {self.address}")
+
+    def _read_acks(self, sock):
+        try:
+            while True:
+                msg = recv_frame(sock)
+                if msg is None:
+                    break
+                now = time.perf_counter()
+                seq = msg.get("seq")
+                with self._ack_cond:
+                    sent = self._sent_at.pop(seq, None)
+                    if sent is not None:
+                        self._rtt[seq] = now - sent
+                        if len(self._rtt) > ACK_HISTORY:
+                            self._rtt.popitem(last=False)
+                    self._ack_cond.notify_all()
+        except (OSError, ValueError):
+            pass
+        with self._ack_cond:
+            if self.sock is sock:
+                self.sock = None
+            self._ack_cond.notify_all()
+
+    def publish(self, target: dict) -> int:
+        with self._send_lock:
+            self.seq += 1
+            seq = self.seq
+            frame = encode_frame({"seq": seq, "target": target})
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    with self._ack_cond:
+                        self._sent_at[seq] = time.perf_counter()
+                        if len(self._sent_at) > ACK_HISTORY:
+                            self._sent_at.popitem(last=False)
+                    self.sock.sendall(frame)
+                    return seq
+                except OSError as e:
+                    self._drop_connection()
+                    if attempt == 1:
+                        print(f"[WARN] {self.kind} transport unavailable ({e})")
+
+        with self._ack_cond:
+            self._sent_at.pop(seq, None)
+        if self.fallback is not None:
+            self.fallback.publish(target)
+        return seq
+
+    def wait_ack(self, seq: int, timeout: float = 1.0) -> Optional[float]:
+        deadline = time.monotonic() + timeout
+        with self._ack_cond:
+            while seq not in self._rtt:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (self.sock is None and seq not in self._sent_at):
+                    return None
+                self._ack_cond.wait(remaining)
+            return self._rtt.pop(seq)
+
+    def _drop_connection(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def close(self):
+        with self._send_lock:
+            self._drop_connection()
+
+
+def make_transport(kind: str, file_path: str, address: Optional[str] = None, writer=None):
+    """Build the transport selected on the command line."""
+    file_transport = FileTransport(file_path, writer)
+    if kind == "file":
+        return file_transport
+    if kind == "egm":
+        from egm import EgmTransport
+        return EgmTransport(address, file_path.replace("tcp_commands.json", "tcp_ack.json"), writer)
+    return SocketTransport(kind, address, fallback=file_transport)
+
+
+def add_transport_args(parser):
+    """Register --transport/--address on an argparse parser."""
+    parser.add_argument('--transport', choices=TRANSPORT_KINDS, default='file',
+                        help='How targets reach Unity (default: file)')
+    parser.add_argument('--address', default=None,
+                        help=f'Socket address: host:port for tcp (default {DEFAULT_TCP_ADDRESS}), '
+                             f'path for unix (default {DEFAULT_UNIX_ADDRESS}), '
+                             f'UDP bind host:port for egm (default 0.0.0.0:6510)')
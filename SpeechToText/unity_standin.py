@@ -0,0 +1,313 @@
+"""
+Unity Stand-in
+==============
+Headless stand-in for TCPHotController.cs, so the Python pipeline can be
+run end to end and benchmarked without launching Unity (e.g. in CI).
+
+It implements the controller's side of the file contract, frame by frame:
+
+  - on start, writes its position to tcp_commands.json (WriteCurrentPosition)
+  - every poll interval, reloads the file if its mtime changed (WatchFile)
+  - a command is a target plus optional "waypoints"; if the point being
+    approached is on the new route only the waypoints after it are
+    replaced, otherwise the move is cancelled and restarts (LoadAndMove)
+  - moves with Vector3.MoveTowards at move_speed units/s until within
+    0.01, snaps to the target, writes tcp_ack.json and continues with the
+    next queued waypoint in the same frame (MoveTo)
+
+Every target picked up and every ack written is recorded.  A route point
+is counted as dropped when a later command cancels or replaces it before
+it was reached.  Latency is measured from the command file's mtime (when
+Python published) to pickup and to the ack.
+
+Usage:
+  python unity_standin.py
+  python unity_standin.py --poll-interval 0.05 --move-speed 4 --frame-rate 120
+  python unity_standin.py --duration 30 --record standin.jsonl --quiet
+"""
+
+import argparse
+import json
+import math
+import os
+import signal
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from timing import percentile, sleep_until
+
+PROJECT_DIR = "../UnityProject"
+CONFIG_PATH = "tcp_commands.json"
+ACK_NAME = "tcp_ack.json"
+
+# TCPHotController defaults
+DEFAULT_POLL_INTERVAL = 0.1
+DEFAULT_MOVE_SPEED = 2.0
+DEFAULT_FRAME_RATE = 60.0
+ARRIVAL_DISTANCE = 0.01
+ROUTE_MATCH_DISTANCE = 0.001
+DEFAULT_GRIPPER = 0.11
+START_POSITION = {"x": 0.0, "y": 0.567, "z": -0.24}
+
+_AXES = ("x", "y", "z")
+
+
+def move_towards(current, target, max_delta):
+    """Vector3.MoveTowards."""
+    dist = math.dist(current, target)
+    if dist <= max_delta or dist == 0.0:
+        return tuple(target)
+    return tuple(c + (t - c) / dist * max_delta for c, t in zip(current, target))
+
+
+class UnityStandin:
+    """TCPHotController's WatchFile / LoadAndMove / MoveTo on a frame loop."""
+
+    def __init__(self, project_dir: str = PROJECT_DIR, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 move_speed: float = DEFAULT_MOVE_SPEED, frame_rate: float = DEFAULT_FRAME_RATE,
+                 start: dict = START_POSITION, write_on_start: bool = True,
+                 record_path: str = None, verbose: bool = False):
+        self.command_path = os.path.join(project_dir, CONFIG_PATH)
+        self.ack_path = os.path.join(project_dir, ACK_NAME)
+        self.poll_interval = poll_interval
+        self.move_speed = move_speed
+        self.frame_rate = frame_rate
+        self.write_on_start = write_on_start
+        self.verbose = verbose
+        self.position = tuple(start[a] for a in _AXES)
+        self.gripper = DEFAULT_GRIPPER
+
+        self._last_modified = None
+        self._moving = False
+        self._active_target = None
+        self._pending = deque()
+        self._dt = 1.0 / frame_rate
+        self._outstanding = []      # [point, pickup time, publish time] not yet reached
+        self._record = open(record_path, "a", encoding="utf-8") if record_path else None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.frames = 0
+        self.commands = 0
+        self.restarts = 0
+        self.acks = 0
+        self.dropped = 0
+        self.parse_errors = 0
+        self.first_ack_at = None
+        self.last_ack_at = None
+        self.last_event_at = None
+        self.targets = []           # (time, publish time, command) per pickup
+        self.ack_log = []           # (time, position) per ack
+        self.pickup_latency = []    # publish (file mtime) -> pickup
+        self.ack_latency = []       # publish -> ack, per reached route point
+
+    # ── contract ──────────────────────────────────────────────────────────────
+    def _write_current_position(self):
+        cmd = dict(zip(_AXES, self.position), gripper_position=self.gripper, waypoints=[])
+        with open(self.command_path, "w") as f:
+            json.dump(cmd, f, indent=4)
+
+    def _write_ack(self, target, now):
+        ack = {
+            "completed": True,
+            "position": dict(zip(_AXES, target), gripper_position=self.gripper, waypoints=[]),
+            "timestamp": datetime.now().astimezone().isoformat(),
+        }
+        # File.WriteAllText: not atomic, readers can see a partial file
+        with open(self.ack_path, "w") as f:
+            json.dump(ack, f, indent=4)
+        self.acks += 1
+        self.first_ack_at = self.first_ack_at or now
+        self.last_ack_at = self.last_event_at = now
+        self.ack_log.append((now, dict(zip(_AXES, target))))
+        reached = [o for o in self._outstanding if math.dist(o[0], target) < ROUTE_MATCH_DISTANCE]
+        self._outstanding = [o for o in self._outstanding if o not in reached]
+        for point, _, published in reached:
+            if published is not None:
+                self.ack_latency.append(now - published)
+        self._log({"event": "ack", "t": now, "position": dict(zip(_AXES, target))})
+        if self.verbose:
+            print(f"[ACK] {dict(zip(_AXES, (round(c, 4) for c in target)))}")
+
+    def _watch_file(self, now):
+        try:
+            modified = os.stat(self.command_path).st_mtime_ns
+        except OSError:
+            return
+        if modified != self._last_modified:
+            self._last_modified = modified
+            self._load_and_move(now, modified / 1e9)
+
+    def _load_and_move(self, now, published):
+        try:
+            with open(self.command_path, "r") as f:
+                content = f.read()
+            if not content.strip():
+                return
+            cmd = json.loads(content)
+        except (OSError, ValueError):
+            # Unity logs "will retry" but lastModified is already updated
+            self.parse_errors += 1
+            return
+        if not isinstance(cmd, dict):
+            self.parse_errors += 1
+            return
+
+        # JsonUtility leaves missing fields at 0
+        route = [tuple(float(cmd.get(a, 0.0)) for a in _AXES)]
+        for w in cmd.get("waypoints") or []:
+            route.append(tuple(float(w.get(a, 0.0)) for a in _AXES))
+        current = -1
+        if self._moving:
+            current = next((i for i, p in enumerate(route)
+                            if math.dist(p, self._active_target) < ROUTE_MATCH_DISTANCE), -1)
+
+        self.commands += 1
+        self.last_event_at = now
+        self.pickup_latency.append(now - published)
+        self.targets.append((now, published, cmd))
+        self._log({"event": "target", "t": now, "published": published, "command": cmd,
+                   "restart": current < 0})
+        if self.verbose:
+            print(f"[RECV] {cmd}")
+
+        live = route[max(current, 0):]
+        kept = []
+        for entry in self._outstanding:
+            if any(math.dist(entry[0], p) < ROUTE_MATCH_DISTANCE for p in live):
+                kept.append(entry)
+            else:
+                self.dropped += 1
+                self._log({"event": "dropped", "t": now, "position": dict(zip(_AXES, entry[0]))})
+        for p in live:
+            if not any(math.dist(e[0], p) < ROUTE_MATCH_DISTANCE for e in kept):
+                kept.append([p, now, published])
+        self._outstanding = kept
+
+        self._pending.clear()
+        self._pending.extend(route[max(current, 0) + 1:])
+        if current < 0:
+            if self._moving:
+                self.restarts += 1
+            self._start_move(route[0], now)
+
+    def _start_move(self, target, now):
+        """StartCoroutine(MoveTo(target)): runs to its first yield immediately."""
+        self._moving = True
+        self._active_target = target
+        self._move_step(now)
+
+    def _move_step(self, now):
+        if math.dist(self.position, self._active_target) > ARRIVAL_DISTANCE:
+            self.position = move_towards(self.position, self._active_target, self.move_speed * self._dt)
+            return
+        self.position = self._active_target
+        self._write_ack(self._active_target, now)
+        if self._pending:
+            self._start_move(self._pending.popleft(), now)
+        else:
+            self._moving = False
+
+    # ── frame loop ────────────────────────────────────────────────────────────
+    def start(self):
+        if self.write_on_start:
+            self._write_current_position()
+        self._thread = threading.Thread(target=self._run, name="unity-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        frame = 1.0 / self.frame_rate
+        begin = prev = time.perf_counter()
+        next_poll = begin + self.poll_interval
+        while not self._stop.is_set():
+            self.frames += 1
+            sleep_until(begin + self.frames * frame)
+            tick = time.perf_counter()
+            self._dt, prev = tick - prev, tick
+            now = time.time()
+            with self._lock:
+                resumed = self._active_target if self._moving else None
+                # coroutines resume in start order: WatchFile, then MoveTo; a
+                # move started by this poll has already taken its first step
+                if tick >= next_poll:
+                    next_poll = tick + self.poll_interval
+                    self._watch_file(now)
+                if self._moving and self._active_target is resumed:
+                    self._move_step(now)
+
+    def _log(self, record):
+        if self._record is not None:
+            self._record.write(json.dumps(record) + "\n")
+
+    def idle_for(self) -> float:
+        """Seconds since the last pickup or ack (0 while moving)."""
+        with self._lock:
+            if self._moving or self.last_event_at is None:
+                return 0.0
+            return time.time() - self.last_event_at
+
+    def stats(self) -> str:
+        with self._lock:
+            lines = [f"{self.commands} command(s) picked up, {self.restarts} cancelled move(s), "
+                     f"{self.acks} ack(s), {self.dropped} waypoint(s) dropped, "
+                     f"{len(self._outstanding)} unreached, {self.parse_errors} unreadable"]
+            if self.acks > 1 and self.last_ack_at > self.first_ack_at:
+                span = self.last_ack_at - self.first_ack_at
+                lines.append(f"  throughput: {(self.acks - 1) / span:.2f} acks/s over {span:.2f}s")
+            for name, values in (("publish -> pickup", self.pickup_latency),
+                                 ("publish -> ack", self.ack_latency)):
+                if values:
+                    ms = [v * 1000 for v in values]
+                    lines.append(f"  {name}: p50 {percentile(ms, 50):.1f} ms, p95 {percentile(ms, 95):.1f} ms, "
+                                 f"max {max(ms):.1f} ms")
+        return "\n".join(lines)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless stand-in for the Unity TCPHotController')
+    parser.add_argument('--project-dir', default=PROJECT_DIR,
+                        help=f'Directory holding {CONFIG_PATH} and {ACK_NAME} (default {PROJECT_DIR})')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help='Seconds between mtime checks (Unity default 0.1)')
+    parser.add_argument('--move-speed', type=float, default=DEFAULT_MOVE_SPEED,
+                        help='MoveTowards speed in units/s (Unity default 2)')
+    parser.add_argument('--frame-rate', type=float, default=DEFAULT_FRAME_RATE, help='Frames per second')
+    parser.add_argument('--no-write-on-start', action='store_true',
+                        help='Do not overwrite the command file with the start position')
+    parser.add_argument('--record', metavar='FILE', help='Append target/ack/dropped events as JSONL')
+    parser.add_argument('--duration', type=float, metavar='SECS', help='Exit after SECS')
+    parser.add_argument('--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+
+    standin = UnityStandin(args.project_dir, args.poll_interval, args.move_speed, args.frame_rate,
+                           write_on_start=not args.no_write_on_start, record_path=args.record,
+                           verbose=not args.quiet)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    standin.start()
+    print(f"Unity stand-in watching {standin.command_path} "
+          f"(poll {args.poll_interval}s, speed {args.move_speed}, {args.frame_rate:g} fps). Ctrl+C to stop.")
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        print()
+        print(standin.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Waypoint Dispatcher
+===================
+Ack-paced streaming of sequential targets.
+
+Publishing only the latest target loses the middle of "move right then up
+then left": TCPHotController restarts its move whenever the command file
+changes. WaypointDispatcher keeps a waypoint queue instead and releases the
+next target when tcp_ack.json reports that the previous one was reached.
+
+  lookahead = 0  -- one target in flight; the next is published on its ack
+  lookahead = N  -- the published command also lists the next N waypoints,
+                    so the controller can start the next leg without waiting
+                    for Python to see the ack and publish again:
+
+    {"x": 0.1, "y": 0.567, "z": -0.24,
+     "waypoints": [{"x": 0.1, "y": 0.667, "z": -0.24}]}
+
+An ack for any waypoint in the published window completes it and every
+waypoint before it (tcp_ack.json is overwritten, so a fast leg can hide
+the previous ack). If no ack arrives within ack_timeout the head is
+treated as reached, so a session without Unity does not stall.
+"""
+
+import threading
+from collections import deque
+
+from ack_watcher import positions_match
+from scheduler import TimerScheduler
+
+ACK_TIMEOUT_SECS = 5.0
+
+
+class WaypointDispatcher:
+    def __init__(self, publish, lookahead: int = 0, ack_timeout: float = ACK_TIMEOUT_SECS,
+                 scheduler=None):
+        """publish(message) sends one command dict; returns nothing useful.
+
+        scheduler runs the ack timeouts: speech_control passes its event
+        loop's LoopScheduler (and then calls every method on the loop);
+        by default the dispatcher starts its own TimerScheduler thread.
+        """
+        self.publish = publish
+        self.lookahead = max(0, lookahead)
+        self.ack_timeout = ack_timeout
+        self._queue = deque()   # (seq, target); head is the leg in motion
+        self._next_seq = 0
+        self._published = ()    # seqs in the last published window
+        self._cond = threading.Condition()
+        self._timer = None
+        self._owns_scheduler = scheduler is None
+        self._scheduler = scheduler or TimerScheduler(name="waypoint-timeout")
+
+        self.submitted = 0
+        self.completed = 0
+        self.timeouts = 0
+
+    def submit(self, targets) -> None:
+        """Queue waypoints in order behind anything still pending."""
+        with self._cond:
+            for target in targets:
+                self._next_seq += 1
+                self._queue.append((self._next_seq, {a: target[a] for a in ("x", "y", "z")}))
+                self.submitted += 1
+            self._publish_window()
+
+    def on_ack(self, ack: dict, detected_at: float = None) -> None:
+        """AckWatcher callback: complete the acked waypoint and its predecessors."""
+        position = ack["position"]
+        with self._cond:
+            window = min(len(self._queue), self.lookahead + 1)
+            for i in range(window):
+                if positions_match(position, self._queue[i][1]):
+                    for _ in range(i + 1):
+                        self._queue.popleft()
+                    self.completed += i + 1
+                    self._publish_window()
+                    self._cond.notify_all()
+                    return
+
+    def _publish_window(self):
+        """Publish head + lookahead if the window changed (lock held)."""
+        window = list(self._queue)[:self.lookahead + 1]
+        seqs = tuple(seq for seq, _ in window)
+        if not window or seqs == self._published:
+            return
+        head_changed = not self._published or self._published[0] != seqs[0]
+        self._published = seqs
+
+        message = dict(window[0][1])
+        if self.lookahead:
+            message["waypoints"] = [target for _, target in window[1:]]
+        self.publish(message)
+
+        if head_changed:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = self._scheduler.call_later(self.ack_timeout, self._on_timeout, seqs[0])
+
+    def _on_timeout(self, seq):
+        with self._cond:
+            if not self._queue or self._queue[0][0] != seq:
+                return
+            target = self._queue.popleft()[1]
+            self.timeouts += 1
+            print(f"[WARN] No ack for waypoint {target} after {self.ack_timeout:.1f}s; releasing next")
+            self._publish_window()
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def clear(self) -> None:
+        """Drop every waypoint that has not been reached."""
+        with self._cond:
+            self._queue.clear()
+            self._published = ()
+            if self._timer is not None:
+                self._timer.cancel()
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every submitted waypoint is reached (or timed out)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue, timeout)
+
+    def close(self) -> None:
+        if self._owns_scheduler:
+            self._scheduler.close()
+        elif self._timer is not None:
+            self._timer.cancel()
+
+
+def add_waypoint_args(parser) -> None:
+    """Add --waypoints / --lookahead / --ack-timeout to an argparse parser."""
+    parser.add_argument('--waypoints', action='store_true',
+                        help='Stream sequential targets one leg at a time, paced by tcp_ack.json')
+    parser.add_argument('--lookahead', type=int, default=0, metavar='N',
+                        help='With --waypoints: also send the next N waypoints ahead of each ack')
+    parser.add_argument('--ack-timeout', type=float, default=ACK_TIMEOUT_SECS, metavar='SECS',
+                        help='With --waypoints: release the next waypoint if no ack arrives in time')
@@ -0,0 +1,275 @@
+"""
+Workspace Validation
+====================
+Rejects targets the CRB 15000 cannot reach, or can only reach near a
+singularity, before they are published.
+
+A vectorized kinematic model of the arm (position-level inverse kinematics
+over all four shoulder/elbow branches, joint limits, and a Jacobian-based
+manipulability index) is evaluated once over a voxel grid covering the
+workspace. The result is saved as a memory-mappable .npy next to a JSON
+header describing the grid and model. At runtime each target costs one
+index computation and one array read:
+
+  NaN         -- unreachable (outside reach, joint limits or below the base)
+  0.0 .. 1.0  -- manipulability of the best IK branch; values near 0 are
+                 close to a wrist, elbow or shoulder singularity
+
+Manipulability is the Jacobian determinant of a spherical-wrist arm,
+normalized to 0..1: |sin(elbow)| * (wrist radius / reach) * |sin(q5)|.
+
+Frames: Unity (x right, y up, z forward, metres) maps to the robot base
+frame as X = -z, Y = x, Z = y, as in UDPCOMM.cs. The tool is assumed to
+point straight down, with TOOL_LENGTH from the wrist centre to the TCP.
+
+The link lengths below are the nominal CRB 15000-5/0.95 dimensions; the
+wrist is modelled as spherical. Treat the grid as a screen with margin,
+not an exact envelope. A grid whose header does not match the current
+model or bounds is rebuilt automatically.
+
+Usage:
+  validator = WorkspaceValidator()          # loads or builds workspace_grid.npy
+  verdict = validator.check({"x": 0.0, "y": 0.567, "z": -0.24})
+  verdict.ok, verdict.reason, verdict.manipulability
+
+  python workspace.py --rebuild             # build the grid and print coverage
+  python workspace.py 0.0 0.567 -0.24       # check one Unity position
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# ── CRB 15000-5/0.95 model (metres / degrees) ─────────────────────────────────
+BASE_HEIGHT = 0.265      # base plate -> axis 2
+UPPER_ARM = 0.444        # axis 2 -> axis 3
+ELBOW_OFFSET = 0.110     # axis 3 -> forearm line
+FOREARM = 0.470          # axis 3 -> wrist centre, along the forearm
+TOOL_LENGTH = 0.101      # wrist centre -> TCP (flange, no tool)
+JOINT_LIMITS_DEG = {
+    "q2": (-180.0, 180.0),
+    "q3": (-225.0, 85.0),
+    "q5": (-180.0, 180.0),
+}
+MIN_TCP_Z = 0.0          # metres above the base plate
+
+# ── grid ──────────────────────────────────────────────────────────────────────
+DEFAULT_GRID_FILE = "workspace_grid.npy"
+GRID_RESOLUTION = 0.02
+GRID_BOUNDS = ((-1.1, 1.1), (-1.1, 1.1), (-0.2, 1.4))  # robot X, Y, Z
+DEFAULT_MIN_MANIPULABILITY = 0.02
+GRID_VERSION = 1
+
+_REACH = UPPER_ARM + math.hypot(ELBOW_OFFSET, FOREARM)
+
+
+class Verdict(NamedTuple):
+    ok: bool
+    reason: Optional[str]
+    manipulability: float
+
+
+def unity_to_robot(position: dict):
+    """Unity metres (y up) -> robot base frame metres (Z up)."""
+    return -position["z"], position["x"], position["y"]
+
+
+def robot_to_unity(point) -> dict:
+    """Robot base frame metres -> Unity metres; inverse of unity_to_robot."""
+    x, y, z = point
+    return {"x": y, "y": z, "z": -x}
+
+
+def forward_kinematics(q1, q2, q3) -> np.ndarray:
+    """(N, 3) robot-frame TCP points for joint arrays in radians, tool down."""
+    q1, q2, q3 = np.broadcast_arrays(*(np.asarray(q, dtype=float) for q in (q1, q2, q3)))
+    theta = q2 + q3
+    # Shoulder -> elbow -> wrist in the arm plane (r outward, s up)
+    r = UPPER_ARM * np.sin(q2) + FOREARM * np.cos(theta) + ELBOW_OFFSET * np.sin(theta)
+    s = UPPER_ARM * np.cos(q2) - FOREARM * np.sin(theta) + ELBOW_OFFSET * np.cos(theta)
+    return np.column_stack([r * np.cos(q1), r * np.sin(q1), BASE_HEIGHT + s - TOOL_LENGTH])
+
+
+def _wrap(angle):
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+def inverse_kinematics(points):
+    """IK branches for (N, 3) robot-frame TCP points, tool down.
+
+    Yields (q1, q2, q3, q5, in_reach) joint arrays in radians for each of
+    the four shoulder (front/back) x elbow (up/down) branches.
+    """
+    p = np.asarray(points, dtype=float)
+    wx, wy = p[:, 0], p[:, 1]
+    radius = np.hypot(wx, wy)
+    s = p[:, 2] + TOOL_LENGTH - BASE_HEIGHT  # tool down: wrist centre is above the TCP
+    l2 = math.hypot(ELBOW_OFFSET, FOREARM)
+    beta = math.atan2(ELBOW_OFFSET, FOREARM)  # forearm line above horizontal at q3 = 0
+
+    cos_elbow = (radius ** 2 + s ** 2 - UPPER_ARM ** 2 - l2 ** 2) / (2 * UPPER_ARM * l2)
+    in_reach = np.abs(cos_elbow) <= 1.0
+    elbow = np.arccos(np.clip(cos_elbow, -1.0, 1.0))
+    heading = np.arctan2(wy, wx)
+
+    for reach_sign in (1.0, -1.0):          # in front of / behind axis 1
+        q1 = heading if reach_sign > 0 else _wrap(heading + math.pi)
+        psi = np.arctan2(reach_sign * radius, s)  # wrist direction, clockwise from vertical
+        for delta in (elbow, -elbow):        # elbow up / down
+            q2 = _wrap(psi - np.arctan2(l2 * np.sin(delta), UPPER_ARM + l2 * np.cos(delta)))
+            q3 = delta - math.pi / 2 + beta
+            q5 = _wrap(math.pi / 2 - q2 - q3)  # tool axis straight down
+            yield q1, q2, q3, q5, in_reach
+
+
+def manipulability(points) -> np.ndarray:
+    """Best manipulability over IK branches for (N, 3) robot-frame TCP points.
+
+    NaN where no branch satisfies reach, joint limits and the floor.
+    """
+    p = np.asarray(points, dtype=float)
+    radius = np.hypot(p[:, 0], p[:, 1])
+    beta = math.atan2(ELBOW_OFFSET, FOREARM)
+    lo2, hi2 = np.radians(JOINT_LIMITS_DEG["q2"])
+    lo3, hi3 = np.radians(JOINT_LIMITS_DEG["q3"])
+    lo5, hi5 = np.radians(JOINT_LIMITS_DEG["q5"])
+
+    best = np.full(len(p), np.nan)
+    for _q1, q2, q3, q5, in_reach in inverse_kinematics(p):
+        elbow_z = BASE_HEIGHT + UPPER_ARM * np.cos(q2)
+        ok = (in_reach
+              & (q2 >= lo2) & (q2 <= hi2)
+              & (q3 >= lo3) & (q3 <= hi3)
+              & (q5 >= lo5) & (q5 <= hi5)
+              & (elbow_z >= MIN_TCP_Z) & (p[:, 2] >= MIN_TCP_Z))
+        elbow = q3 + math.pi / 2 - beta
+        w = np.abs(np.sin(elbow)) * np.minimum(radius / _REACH, 1.0) * np.abs(np.sin(q5))
+        better = ok & ~(w <= best)  # also true where best is NaN
+        best = np.where(better, w, best)
+    return best
+
+
+def _grid_header(bounds, resolution):
+    return {
+        "version": GRID_VERSION,
+        "bounds": [list(b) for b in bounds],
+        "resolution": resolution,
+        "model": {
+            "base_height": BASE_HEIGHT, "upper_arm": UPPER_ARM, "elbow_offset": ELBOW_OFFSET,
+            "forearm": FOREARM, "tool_length": TOOL_LENGTH, "min_tcp_z": MIN_TCP_Z,
+            "joint_limits_deg": JOINT_LIMITS_DEG,
+        },
+    }
+
+
+def _header_path(grid_path):
+    return os.path.splitext(grid_path)[0] + ".json"
+
+
+def build_grid(grid_path: str = DEFAULT_GRID_FILE, bounds=GRID_BOUNDS, resolution=GRID_RESOLUTION):
+    """Evaluate the model at every voxel centre and write the grid to disk."""
+    axes = [np.arange(lo + resolution / 2, hi, resolution) for lo, hi in bounds]
+    shape = tuple(len(a) for a in axes)
+    tmp_path = grid_path + ".tmp.npy"
+    grid = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=shape)
+    gy, gz = np.meshgrid(axes[1], axes[2], indexing="ij")
+    plane = np.column_stack([np.zeros(gy.size), gy.ravel(), gz.ravel()])
+    for i, x in enumerate(axes[0]):  # one X slab at a time keeps memory flat
+        plane[:, 0] = x
+        grid[i] = manipulability(plane).reshape(shape[1:])
+    grid.flush()
+    del grid
+    os.replace(tmp_path, grid_path)
+    with open(_header_path(grid_path), "w") as f:
+        json.dump(_grid_header(bounds, resolution), f, indent=2)
+
+
+class WorkspaceValidator:
+    def __init__(self, grid_path: str = DEFAULT_GRID_FILE,
+                 min_manipulability: float = DEFAULT_MIN_MANIPULABILITY, rebuild: bool = False):
+        self.grid_path = grid_path
+        self.min_manipulability = min_manipulability
+        expected = json.loads(json.dumps(_grid_header(GRID_BOUNDS, GRID_RESOLUTION)))
+        if rebuild or self._stored_header() != expected:
+            print(f"[INFO] Building workspace grid {grid_path} (one-off)...")
+            started = time.monotonic()
+            build_grid(grid_path)
+            print(f"[OK] Workspace grid built in {time.monotonic() - started:.1f}s")
+        self.grid = np.load(grid_path, mmap_mode="r")
+        self._lo = tuple(b[0] for b in GRID_BOUNDS)
+        self._resolution = GRID_RESOLUTION
+        self.checked = 0
+        self.rejected = 0
+
+    def _stored_header(self):
+        try:
+            with open(_header_path(self.grid_path), "r") as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return header if os.path.exists(self.grid_path) else None
+
+    def lookup(self, robot_point) -> float:
+        """Grid value at a robot-frame point (NaN outside the grid)."""
+        idx = tuple(math.floor((c - lo) / self._resolution) for c, lo in zip(robot_point, self._lo))
+        if any(i < 0 or i >= n for i, n in zip(idx, self.grid.shape)):
+            return float("nan")
+        return float(self.grid[idx])
+
+    def check(self, position: dict) -> Verdict:
+        """Validate one Unity-frame target."""
+        w = self.lookup(unity_to_robot(position))
+        self.checked += 1
+        if math.isnan(w):
+            verdict = Verdict(False, "unreachable", w)
+        elif w < self.min_manipulability:
+            verdict = Verdict(False, f"near singularity (manipulability {w:.3f})", w)
+        else:
+            return Verdict(True, None, w)
+        self.rejected += 1
+        return verdict
+
+    def stats(self) -> str:
+        return f"{self.checked} targets checked, {self.rejected} rejected"
+
+
+def add_workspace_args(parser) -> None:
+    """Add --no-workspace-check / --workspace-grid / --min-manipulability to a parser."""
+    parser.add_argument('--no-workspace-check', action='store_true',
+                        help='Publish targets without checking reachability and singularity')
+    parser.add_argument('--workspace-grid', default=DEFAULT_GRID_FILE, metavar='FILE',
+                        help=f'Reachability grid (built on first use; default {DEFAULT_GRID_FILE})')
+    parser.add_argument('--min-manipulability', type=float, default=DEFAULT_MIN_MANIPULABILITY,
+                        metavar='W', help='Reject targets whose manipulability index is below W (0..1)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the CRB 15000 workspace grid')
+    parser.add_argument('position', nargs='*', type=float, metavar='X Y Z',
+                        help='Unity position to check')
+    parser.add_argument('--grid', default=DEFAULT_GRID_FILE, metavar='FILE')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the grid even if it is current')
+    parser.add_argument('--min-manipulability', type=float, default=DEFAULT_MIN_MANIPULABILITY)
+    args = parser.parse_args()
+
+    validator = WorkspaceValidator(args.grid, args.min_manipulability, rebuild=args.rebuild)
+    grid = np.asarray(validator.grid, dtype=np.float32)
+    reachable = ~np.isnan(grid)
+    print(f"Grid {grid.shape} at {GRID_RESOLUTION * 1000:.0f} mm: "
+          f"{reachable.mean() * 100:.1f}% reachable, "
+          f"{(grid[reachable] < args.min_manipulability).mean() * 100:.1f}% of those near-singular")
+    if len(args.position) == 3:
+        x, y, z = args.position
+        verdict = validator.check({"x": x, "y": y, "z": z})
+        status = "[OK]" if verdict.ok else "[WARN]"
+        print(f"{status} ({x}, {y}, {z}): manipulability {verdict.manipulability:.3f}"
+              f"{'' if verdict.ok else ' - ' + verdict.reason}")
+
+
+if __name__ == "__main__":
+    main()
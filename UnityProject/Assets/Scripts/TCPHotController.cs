@@ -1,6 +1,7 @@
 using System;
 using System.IO;
 using System.Collections;
+using System.Collections.Generic;
 using UnityEngine;
 
 public class TCPHotController : MonoBehaviour
@@ -14,6 +15,9 @@ public class TCPHotController : MonoBehaviour
 
     private DateTime lastModified;
     private Coroutine activeMove;
+    private Vector3 activeTarget;
+    // Waypoints listed after the current target ("waypoints" in the command)
+    private readonly Queue<Vector3> pendingWaypoints = new Queue<Vector3>();
     private string fullPath;
     private float currentGripperPosition = 0.11f;  // Start fully open (RG2: 110mm)
     
@@ -115,17 +119,42 @@ public class TCPHotController : MonoBehaviour
                 return;
             }
             
-            // Cancel current movement
-            if (activeMove != null)
+            // Route = target followed by any lookahead waypoints
+            List<Vector3> route = new List<Vector3> { new Vector3(cmd.x, cmd.y, cmd.z) };
+            if (cmd.waypoints != null)
             {
-                StopCoroutine(activeMove);
+                foreach (TCPWaypoint w in cmd.waypoints)
+                {
+                    route.Add(new Vector3(w.x, w.y, w.z));
+                }
+            }
+
+            // Already moving to a point on this route: keep going, just refresh what follows
+            int current = activeMove != null
+                ? route.FindIndex(p => Vector3.Distance(p, activeTarget) < 0.001f)
+                : -1;
+
+            pendingWaypoints.Clear();
+            for (int i = (current >= 0 ? current : 0) + 1; i < route.Count; i++)
+            {
+                pendingWaypoints.Enqueue(route[i]);
             }
 
-            // Start new movement
-            Vector3 targetPos = new Vector3(cmd.x, cmd.y, cmd.z);
-            activeMove = StartCoroutine(MoveTo(targetPos));
+            if (current < 0)
+            {
+                // Cancel current movement and start the new one
+                if (activeMove != null)
+                {
+                    StopCoroutine(activeMove);
+                }
+                activeMove = StartCoroutine(MoveTo(route[0]));
+                Debug.Log($"Moving TCP to: ({cmd.x}, {cmd.y}, {cmd.z})");
+            }
 
-            Debug.Log($"Moving TCP to: ({cmd.x}, {cmd.y}, {cmd.z})");
+            if (pendingWaypoints.Count > 0)
+            {
+                Debug.Log($"Queued {pendingWaypoints.Count} waypoint(s) after the current target");
+            }
 
             // Handle gripper position
             float newGripper = cmd.gripper_position;
@@ -155,6 +184,7 @@ public class TCPHotController : MonoBehaviour
     
     IEnumerator MoveTo(Vector3 target)
     {
+        activeTarget = target;
         while (Vector3.Distance(transform.position, target) > 0.01f)
         {
             transform.position = Vector3.MoveTowards(
@@ -170,6 +200,9 @@ public class TCPHotController : MonoBehaviour
 
         // Write acknowledgment for queue system
         WriteAcknowledgment(target);
+
+        // Continue along the route without waiting for the next command file
+        activeMove = pendingWaypoints.Count > 0 ? StartCoroutine(MoveTo(pendingWaypoints.Dequeue())) : null;
     }
 
     void WriteAcknowledgment(Vector3 position)
@@ -205,6 +238,15 @@ public class TCPCommand
     public float y;
     public float z;
     public float gripper_position;  // 0.0 = closed, 0.11 = fully open (RG2)
+    public TCPWaypoint[] waypoints;  // optional lookahead targets after x/y/z
+}
+
+[System.Serializable]
+public class TCPWaypoint
+{
+    public float x;
+    public float y;
+    public float z;
 }
 
 [System.Serializable]
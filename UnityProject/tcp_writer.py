@@ -1,5 +1,11 @@
-import json
-import time
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SpeechToText"))
+
+from command_journal import atomic_write_json  # noqa: E402
+from trajectory_replay import replay  # noqa: E402
 
 # Define a sequence of TCP positions
 positions = [
@@ -13,13 +19,17 @@ positions = [
 ]
 
 filepath = "tcp_commands.json"
+PERIOD_SECS = 2.0  # one command every 2 seconds, on an absolute schedule
+counter = itertools.count(1)
+
+
+def publish(pos):
+    atomic_write_json(filepath, pos)
+    print(f"Command {next(counter)}/{len(positions)}: x={pos['x']}, y={pos['y']}, z={pos['z']}")
+
 
+# For recorded trajectories use SpeechToText/trajectory_replay.py
 print("Starting TCP command sequence...")
-for i, pos in enumerate(positions):
-    with open(filepath, 'w') as f:
-        json.dump(pos, f, indent=2)
-    
-    print(f"Command {i+1}/{len(positions)}: x={pos['x']}, y={pos['y']}, z={pos['z']}")
-    time.sleep(2)  # Wait 2 seconds between commands
-
-print("Sequence complete!")
\ No newline at end of file
+stats = replay(((None, pos) for pos in positions), publish, rate=1.0 / PERIOD_SECS)
+print("Sequence complete!")
+print(stats.report())